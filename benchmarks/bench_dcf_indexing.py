@@ -0,0 +1,115 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Benchmark, DCF directories indexing, stat calls and time of the scandir fetcher against the previous one,
+#              and with a DCIM manifest.
+
+"""
+Build a fake DCIM folder (empty pictures) and fetch it with the scandir based fetcher and with the previous fetcher,
+which checked every picture with exists(). Then with a DCIM manifest : first run (walk and save), next runs (load).
+Stat calls (os.stat/os.lstat) are counted, fetcher initialization included.
+Usage:
+    python benchmarks/bench_dcf_indexing.py [<nb-folders>] [<files-per-folder>]
+
+opv_import needs to be installed (python setup.py develop).
+"""
+
+import os
+import sys
+import time
+import tempfile
+from unittest.mock import patch
+from path import Path
+
+from opv_import.services import CameraImageFetcher
+from opv_import.helpers.dcf_naming import DCF_FILE_ALPHADIGIT_LEN
+
+
+class PreviousCameraImageFetcher(CameraImageFetcher):
+    """ Fetcher before scandir indexing : a listing + a stat per file, an exists() per picture, list.remove """
+
+    def _fetch_pic_files_from_dcf_dir(self, dcf_dir, start_index):
+        files = self._order_dcf_files(dcf_dir.files())
+        pic_files = []
+        next_index = start_index
+        if len(files) == 0:
+            return (next_index, [])
+
+        start_at_first_pic_index = self._make_dcf_pic_filename(index=next_index) == files[0].basename()
+        while len(files) > 0:
+            next_file = dcf_dir / self._make_dcf_pic_filename(index=next_index)
+            while next_file.exists():
+                pic_files.append(next_index)
+                files.remove(next_file)
+                next_index += 1
+                next_file = dcf_dir / self._make_dcf_pic_filename(index=next_index)
+            if len(files):
+                if not start_at_first_pic_index:
+                    next_index = int(files[0].namebase[DCF_FILE_ALPHADIGIT_LEN:])
+                    start_at_first_pic_index = True
+                    continue
+                files = []
+        return (next_index, pic_files)
+
+    def _check_serie_continue_in_folder(self, next_index, next_dcf_folder_path):
+        next_file = next_dcf_folder_path / self._make_dcf_pic_filename(index=next_index)
+        prev_file = next_dcf_folder_path / self._make_dcf_pic_filename(index=next_index - 1)
+        return next_file.exists() and not prev_file.exists()
+
+
+def make_dcim(root: Path, nb_folders: int, files_per_folder: int) -> Path:
+    dcim = root / "DCIM"
+    index = 1
+    for f in range(0, nb_folders):
+        folder = dcim / "{}GOPRO".format(100 + f)
+        folder.makedirs_p()
+        for _ in range(0, files_per_folder):
+            (folder / "GOPR{}.JPG".format(str(index).zfill(4))).write_bytes(b"")
+            index = index % 9999 + 1
+    return dcim
+
+
+def run(fetcher_class, dcim: Path, **fetcher_kwargs):
+    counts = {'stat': 0}
+    real_stat, real_lstat = os.stat, os.lstat
+
+    def counting(real):
+        def f(*args, **kwargs):
+            counts['stat'] += 1
+            return real(*args, **kwargs)
+        return f
+
+    with patch("os.stat", counting(real_stat)), patch("os.lstat", counting(real_lstat)):
+        start = time.perf_counter()
+        pics = fetcher_class(dcim_folder=dcim, **fetcher_kwargs).fetch_images()
+        elapsed = time.perf_counter() - start
+
+    return len(pics), counts['stat'], elapsed
+
+
+if __name__ == "__main__":
+    nb_folders = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    files_per_folder = int(sys.argv[2]) if len(sys.argv) > 2 else 999
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dcim = make_dcim(Path(tmp), nb_folders, files_per_folder)
+        print("{} folders x {} pictures".format(nb_folders, files_per_folder))
+        runs = [("previous", PreviousCameraImageFetcher, {}), ("scandir", CameraImageFetcher, {}),
+                ("manifest first run", CameraImageFetcher, {'use_manifest': True}),
+                ("manifest next run", CameraImageFetcher, {'use_manifest': True})]
+        for name, fetcher_class, kwargs in runs:
+            nb_pics, nb_stats, elapsed = run(fetcher_class, dcim, **kwargs)
+            print("{:18s} {:6d} pictures {:7d} stat calls {:8.3f} s".format(name, nb_pics, nb_stats, elapsed))
@@ -0,0 +1,94 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Benchmark, DCF names parsing, ordering and making with DcfNaming against the previous fetcher code.
+
+"""
+Synthetic DCF names (no file is needed) : files names are parsed to indexes (listing), files and folders paths are
+ordered, and names are made back from indexes (pictures paths), with the previous fetcher code (Path per sort key,
+name made to check each parsed index, zfill) and with DcfNaming.
+Usage:
+    python benchmarks/bench_dcf_naming.py [<nb-names>]
+
+opv_import needs to be installed (python setup.py develop).
+"""
+
+import sys
+import time
+import random
+from path import Path
+
+from opv_import.helpers import DcfNaming
+from opv_import.helpers.dcf_naming import dcf_folder_number, dcf_file_number
+
+FILES_PER_FOLDER = 999
+NAMING = ("GOPR", 4, ".JPG")
+
+
+def previous_file_name(index: int) -> str:
+    prefix, digit_len, ext = NAMING
+    return prefix + str(index).zfill(digit_len) + ext
+
+
+def previous_index_of(name: str):
+    prefix, digit_len, ext = NAMING
+    if not name.startswith(prefix) or not name.endswith(ext):
+        return None
+    digits = name[len(prefix):len(name) - len(ext)]
+    if digits.isdigit() and previous_file_name(index=int(digits)) == name:
+        return int(digits)
+    return None
+
+
+def previous(names, files, folders, indexes):
+    return [
+        ("parse", lambda: [previous_index_of(name) for name in names]),
+        ("order files", lambda: sorted(files, key=lambda path: int(Path(path).namebase[4:]))),
+        ("order folders", lambda: sorted(folders, key=lambda path: int(Path(path).basename()[0:3]))),
+        ("make names", lambda: [previous_file_name(i) for i in indexes])]
+
+
+def compiled(names, files, folders, indexes):
+    naming = DcfNaming(*NAMING)
+    return [
+        ("parse", lambda: [naming.index_of(name) for name in names]),
+        ("order files", lambda: sorted(files, key=dcf_file_number)),
+        ("order folders", lambda: sorted(folders, key=dcf_folder_number)),
+        ("make names", lambda: [naming.file_name(i) for i in indexes])]
+
+
+if __name__ == "__main__":
+    nb_names = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rand = random.Random(0)
+
+    indexes = [rand.randint(1, 9999) for _ in range(0, nb_names)]
+    names = [previous_file_name(i) for i in indexes]
+    names[::10] = ["GOPR{}.LRV".format(str(i).zfill(4)) for i in indexes[::10]]  # other files of a GoPro folder
+    files = [Path("DCIM/100GOPRO") / name for name in names]
+    folders = [Path("DCIM/{}GOPRO".format(rand.randint(100, 999))) for _ in range(0, nb_names // FILES_PER_FOLDER + 1)]
+
+    results = []
+    print("{} names".format(nb_names))
+    for label, steps in [("previous", previous), ("DcfNaming", compiled)]:
+        results.append([])
+        timings = []
+        for step, run in steps(names, files, folders, indexes):
+            start = time.perf_counter()
+            results[-1].append(run())
+            timings.append("{} {:6.3f} s".format(step, time.perf_counter() - start))
+        print("{:10s} {}".format(label, ", ".join(timings)))
+
+    assert results[0] == results[1], "DcfNaming results differ from the previous code"
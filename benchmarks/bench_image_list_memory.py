@@ -0,0 +1,85 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Benchmark, memory used by a camera pictures list, one CameraImage per picture against CameraImageList.
+
+"""
+Campaign like camera pictures (999 per DCF folder, timestamps and exif tags known), kept as a list of CameraImage
+(previous fetcher) and as a CameraImageList. Memory is measured with tracemalloc, no file is needed.
+Usage:
+    python benchmarks/bench_image_list_memory.py [<nb-pictures>]
+
+opv_import needs to be installed (python setup.py develop).
+"""
+
+import sys
+import time
+import tracemalloc
+from path import Path
+
+from opv_import.model import CameraImage, CameraImageList
+
+FILES_PER_FOLDER = 999
+TAGS = {"make": "GoPro", "model": "HERO4 Black", "orientation": "1", "exposure_time": "1/240", "f_number": "14/5",
+        "iso": "100", "exposure_bias": "0", "white_balance": "0", "serial_number": None}
+
+
+def folders_indexes(nb_pictures: int):
+    return [(Path("APN0/DCIM/{}GOPRO".format(100 + f)),
+             list(range(f * FILES_PER_FOLDER + 1, min(nb_pictures, (f + 1) * FILES_PER_FOLDER) + 1)))
+            for f in range(0, (nb_pictures + FILES_PER_FOLDER - 1) // FILES_PER_FOLDER)]
+
+
+def objects_list(nb_pictures: int):
+    imgs = [CameraImage(path=folder / "GOPR{}.JPG".format(str(i).zfill(4)))
+            for folder, indexes in folders_indexes(nb_pictures) for i in indexes]
+    for ts, img in enumerate(imgs):
+        img._ts = 1500000000 + ts
+        img._exif_tags = dict(TAGS)  # each picture exif is read in its own dict
+    return imgs
+
+
+def array_list(nb_pictures: int):
+    imgs = CameraImageList.from_folders(naming=("GOPR", 4, ".JPG"), folders_indexes=folders_indexes(nb_pictures))
+    for ts, img in enumerate(imgs):
+        img._ts = 1500000000 + ts
+        img._exif_tags = dict(TAGS)
+    return imgs
+
+
+def measure(make, nb_pictures: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    imgs = make(nb_pictures)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    ts_sum = sum(imgs[i].get_timestamp() for i in range(0, len(imgs)))
+    access = time.perf_counter() - start
+    assert ts_sum == sum(range(1500000000, 1500000000 + nb_pictures))
+    return size, elapsed, access
+
+
+if __name__ == "__main__":
+    nb_pictures = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print("{} pictures".format(nb_pictures))
+    for name, make in [("CameraImage list", objects_list), ("CameraImageList", array_list)]:
+        size, elapsed, access = measure(make, nb_pictures)
+        print("{:16s} {:8.1f} MB, built in {:6.3f} s, all timestamps accessed in {:6.3f} s".format(
+            name, size / 2 ** 20, elapsed, access))
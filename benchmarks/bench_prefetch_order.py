@@ -0,0 +1,70 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Benchmark, pictures headers reads throughput depending on the read order and read-ahead hints.
+
+"""
+Read the exif timestamp of every picture of an import folder (APN*/DCIM) with each read order, with and without read-ahead.
+The page cache of the pictures is dropped (POSIX_FADV_DONTNEED) before each run so that reads hit the disk.
+Usage:
+    python benchmarks/bench_prefetch_order.py <import-folder>
+
+opv_import needs to be installed (python setup.py develop). Gains are only expected on rotational storage (HDD, USB disks),
+on SSD every order gives about the same throughput.
+"""
+
+import os
+import sys
+import time
+from path import Path
+
+from opv_import.helpers import pictures_utils, read_scheduler
+
+CHUNK_SIZE = 200  # same as lot_maker.PREFETCH_CHUNK_SIZE
+
+
+def drop_cache(paths):
+    for p in paths:
+        fd = os.open(p, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def run(paths, read_order, read_ahead) -> float:
+    drop_cache(paths)
+    start = time.perf_counter()
+    ordered = [paths[i] for i in read_scheduler.order_by_locality(paths, read_order=read_order)]
+    for i in range(0, len(ordered), CHUNK_SIZE):
+        chunk = ordered[i:i + CHUNK_SIZE]
+        if read_ahead:
+            read_scheduler.advise_will_need(chunk)
+        for p in chunk:
+            pictures_utils.read_exif_time(p)
+    return len(paths) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+
+    pictures = sorted(p for p in Path(sys.argv[1]).glob("APN*/DCIM/*/*") if p.ext.upper() == ".JPG")
+    print("{} pictures".format(len(pictures)))
+    for order in read_scheduler.READ_ORDERS:
+        for read_ahead in [False, True]:
+            print("order: {:7s} read-ahead: {:5s} {:8.1f} headers/s".format(order, str(read_ahead), run(pictures, order, read_ahead)))
@@ -0,0 +1,101 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Microbenchmark, fast exif DateTimeOriginal reader against exifread.
+
+"""
+Compare read_exif (fast APP1 reader, exifread fallback) to exifread on pictures headers.
+Usage:
+    python benchmarks/bench_read_exif_time.py [<pictures>...]
+
+opv_import needs to be installed (python setup.py develop). Without pictures a GoPro like header (IFD0 with Make/Model/Software, Exif IFD with exposure tags) is generated.
+"""
+
+import sys
+import struct
+import tempfile
+import timeit
+import exifread
+from path import Path
+
+from opv_import.helpers import pictures_utils
+
+NUMBER_OF_READS = 2000
+
+
+def make_gopro_like_header() -> bytes:
+    """
+    Build a JPEG header similar to GoPro ones : APP1 exif with IFD0, Exif IFD and a bit of padding (thumbnail).
+    """
+    e = '<'
+    ifd0_entries = [(0x010E, 2, 12, b'GoPro image\x00'), (0x010F, 2, 6, b'GoPro\x00'), (0x0110, 2, 13, b'HERO4 Black\x00\x00'),
+                    (0x011A, 5, 1, struct.pack(e + 'II', 72, 1)), (0x011B, 5, 1, struct.pack(e + 'II', 72, 1)),
+                    (0x0131, 2, 16, b'HD4.01.02.00.00\x00'), (0x0132, 2, 20, b'2017:10:28 08:11:03\x00')]
+    exif_entries = [(0x829A, 5, 1, struct.pack(e + 'II', 1, 240)), (0x829D, 5, 1, struct.pack(e + 'II', 28, 10)),
+                    (0x8827, 3, 1, 100), (0x9000, 7, 4, 0x30323230), (0x9003, 2, 20, b'2017:10:28 08:11:03\x00'),
+                    (0x9004, 2, 20, b'2017:10:28 08:11:03\x00'), (0x920A, 5, 1, struct.pack(e + 'II', 3, 1))]
+
+    def ifd(entries, offset):
+        data_offset = offset + 2 + 12 * len(entries) + 4
+        body = struct.pack(e + 'H', len(entries))
+        data = b''
+        for tag, typ, count, value in entries:
+            if isinstance(value, int):
+                body += struct.pack(e + 'HHII', tag, typ, count, value)
+            else:
+                body += struct.pack(e + 'HHII', tag, typ, count, data_offset + len(data))
+                data += value
+        return body + struct.pack(e + 'I', 0) + data
+
+    ifd0_size = len(ifd(ifd0_entries + [(0x8769, 4, 1, 0)], 8))
+    ifd0 = ifd(ifd0_entries + [(0x8769, 4, 1, 8 + ifd0_size)], 8)
+    tiff = b'II' + struct.pack(e + 'HI', 42, 8) + ifd0 + ifd(exif_entries, 8 + ifd0_size) + b'\x00' * 8000
+    app1 = b'\xff\xe1' + struct.pack('>H', len(tiff) + 8) + b'Exif\x00\x00' + tiff
+    return b'\xff\xd8' + app1 + b'\xff\xda\x00\x02' + b'\x00' * 1024 + b'\xff\xd9'
+
+
+def read_with_exifread(pic_path):
+    with open(pic_path, "rb") as f:
+        return exifread.process_file(f, stop_tag='EXIF DateTimeOriginal', details=False)
+
+
+def main():
+    pictures = [Path(p) for p in sys.argv[1:]]
+    tmp_dir = None
+    if len(pictures) == 0:
+        tmp_dir = tempfile.TemporaryDirectory()
+        pic = Path(tmp_dir.name) / "GOPR0001.JPG"
+        pic.write_bytes(make_gopro_like_header())
+        pictures = [pic]
+
+    undecided = [p for p in pictures if pictures_utils.read_exif_fast(p, tags={}) is None]
+    print("Pictures : {}, undecided by the fast reader : {}".format(len(pictures), len(undecided)))
+
+    n = max(NUMBER_OF_READS // len(pictures), 1)
+    t_fast = timeit.timeit(lambda: [pictures_utils.read_exif(p, tags={}) for p in pictures], number=n)
+    t_exifread = timeit.timeit(lambda: [read_with_exifread(p) for p in pictures], number=n)
+    nb_reads = n * len(pictures)
+
+    print("read_exif           : {:.1f} us/picture".format(t_fast / nb_reads * 1e6))
+    print("exifread            : {:.1f} us/picture".format(t_exifread / nb_reads * 1e6))
+    print("speedup             : x{:.1f}".format(t_exifread / t_fast))
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Benchmark, camera sets generation with LotMaker.cam_set_generator against the vectorized sets assignment.
+
+"""
+Synthetic 6 cameras campaign (timestamps known, a shot every 4 to 8 seconds, some pictures missing), no file is needed.
+Sets are generated from the same reference with cam_set_generator, with vectorized=True (sets assigned at once, image
+sets made while generated) and with assign_sets alone (index matrix only).
+Usage:
+    python benchmarks/bench_set_assignment.py [<nb-pictures-per-camera>]
+
+opv_import needs to be installed (python setup.py develop).
+"""
+
+import sys
+import time
+import random
+import numpy as np
+from path import Path
+
+from opv_import.model import CameraImage
+from opv_import.services import LotMaker
+from opv_import.services.lot_maker import TIME_MARGING
+from opv_import.helpers.set_assignment import assign_sets
+
+NB_CAMS = 6
+MISSING_RATE = 0.01  # rate of pictures missing on a camera
+
+
+class SyntheticFetcher:
+
+    def __init__(self, apn_no: int, shots: list, offset: int, rand: random.Random):
+        self.pics = []
+        for k, shot in enumerate(shots):
+            if rand.random() >= MISSING_RATE:
+                img = CameraImage(path=Path("APN{}/DCIM/100GOPRO/GOPR{:04d}.JPG".format(apn_no, k % 10000)))
+                img._ts = shot + offset + rand.randint(0, 1)
+                self.pics.append(img)
+        self.ts = np.array([img._ts for img in self.pics], dtype=np.int64)
+
+    def get_pic(self, index: int) -> CameraImage:
+        return self.pics[index]
+
+    def nb_pic(self) -> int:
+        return len(self.pics)
+
+    def get_timestamps(self) -> np.ndarray:
+        return self.ts
+
+
+if __name__ == "__main__":
+    nb_pictures = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rand = random.Random(0)
+
+    shots = np.cumsum([rand.randint(4, 8) for _ in range(0, nb_pictures)]).tolist()
+    lm = LotMaker(pictures_path=Path("pictures"), rederbro_csv_path=None, nb_cams=NB_CAMS)
+    lm.fetchers = [SyntheticFetcher(apn_no, shots, offset=1000 * apn_no, rand=rand) for apn_no in range(0, NB_CAMS)]
+    reference_set = lm.get_images([0] * NB_CAMS)
+    while not lm.is_equiv_ref(reference_set, lm.get_images([1] * NB_CAMS)):  # first pictures taken together
+        reference_set = lm.get_images([i + 1 for i in range(0, NB_CAMS)])
+
+    results = []
+    print("{} cameras, {} pictures per camera".format(NB_CAMS, nb_pictures))
+    for label, vectorized in [("generator", False), ("vectorized", True)]:
+        start = time.perf_counter()
+        results.append([(sorted(s.set.keys()), list(s.fetcher_next_indexes))
+                        for s in lm.cam_set_generator(reference_set=reference_set, vectorized=vectorized)])
+        print("{:12s} {:6.3f} s, {} sets".format(label, time.perf_counter() - start, len(results[-1])))
+
+    start = time.perf_counter()
+    assign_sets(timestamps=lm.timestamp_matrix(), ref_ts=[reference_set[c].get_timestamp() for c in range(0, NB_CAMS)],
+                start_indexes=[0] * NB_CAMS, margin=TIME_MARGING)
+    print("{:12s} {:6.3f} s".format("assign_sets", time.perf_counter() - start))
+
+    assert results[0] == results[1], "Vectorized sets differ from the generator ones"
@@ -1,2 +1,3 @@
 from opv_import.config.const import Const
-from opv_import.config.storage_dir_structure import APN_NUM_TO_APN_OUTPUT_DIR
+from opv_import.config.storage_dir_structure import APN_NUM_TO_APN_OUTPUT_DIR, TS_CACHE_FILE_NAME, PICTURES_INDEX_FILE_NAME, DCIM_MANIFEST_FILE_NAME, APN_ARCHIVE_EXTENSIONS
+from opv_import.config.exif_tags import EXIF_EXTRA_TAGS, EXIF_TAGS_FILE_NAME
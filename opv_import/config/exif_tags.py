@@ -0,0 +1,32 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Exif tags extracted along with the pictures timestamps and forwarded with the lots.
+
+# name -> (IFD, tag id), IFD is "Image" (IFD0) or "EXIF" (Exif IFD), same names as exifread
+EXIF_EXTRA_TAGS = {
+    "make": ("Image", 0x010F),
+    "model": ("Image", 0x0110),
+    "orientation": ("Image", 0x0112),
+    "exposure_time": ("EXIF", 0x829A),
+    "f_number": ("EXIF", 0x829D),
+    "iso": ("EXIF", 0x8827),
+    "exposure_bias": ("EXIF", 0x9204),
+    "white_balance": ("EXIF", 0xA403),
+    "serial_number": ("EXIF", 0xA431),
+}
+
+EXIF_TAGS_FILE_NAME = "exif_tags.json"  # tags of a lot pictures, written next to them in the directory manager
@@ -17,4 +17,16 @@
 # Description: Describe output device import storage directory structure.
 
 # Using in maklot to get input files and on the device import scripts
-APN_NUM_TO_APN_OUTPUT_DIR = "APN{}"
\ No newline at end of file
+APN_NUM_TO_APN_OUTPUT_DIR = "APN{}"
+
+# Persistent pictures timestamps cache, stored next to the APN folders
+TS_CACHE_FILE_NAME = "pictures_ts_cache.sqlite"
+
+# Pictures index (path, size, timestamp) written in each APN folder by the SD copier
+PICTURES_INDEX_FILE_NAME = "pictures_index.csv"
+
+# DCIM manifest (ordered pictures, folders mtimes) written in each APN folder by the camera images fetcher
+DCIM_MANIFEST_FILE_NAME = "dcim_manifest.json"
+
+# Camera archives (uncompressed tar or zip of an APN folder content), read in place of missing APN folders
+APN_ARCHIVE_EXTENSIONS = [".tar", ".zip"]
@@ -34,6 +34,24 @@ Options:
     --dm-file=<str>                 Enable file mode using this tmp folder.
     --number-of-devices=<int>       Number of devices to wait for. [default: 6]
     --id-malette=<int>              Malette ID. [Default: 42]
+    --fetch-workers=<int>           Fetch cameras DCIM folders with this number of threads. [Default: 1]
+    --prefetch-workers=<int>        Read all pictures timestamps with this number of threads before making lots.
+    --prefetch-order=<str>          Prefetch reading order : index, inode or extent (disk position). [Default: index]
+    --prefetch-read-ahead           Give read-ahead hints to the kernel during prefetch.
+    --prefetch-stream               Read timestamps while DCIM folders are listed (no effect with --mtime-ts-samples).
+    --watch-copies=<int>            With --prefetch-stream, follow DCIM folders still being copied, until no picture is
+                                    copied during this number of seconds.
+    --prefetch-backend=<str>        Prefetch workers : thread, process or auto (process if pictures are in page cache). [Default: auto]
+    --ts-cache                      Keep pictures timestamps in a cache file next to the APN folders, faster reruns.
+    --mtime-ts-samples=<int>        Use pictures modification time as timestamp, if this number of sampled exif agree.
+    --sparse-ts                     Don't read timestamps of pictures that are alone in their sets (binary search).
+    --vectorized-sets               Assign camera sets from all pictures timestamps at once (reads all timestamps).
+    --estimate-offsets              Search camera sets references from the estimated camera clocks offsets first.
+    --memoize-refs                  Don't try camera sets references equivalent to already rejected ones.
+    --ref-search-workers=<int>      Try camera sets references candidates with this number of processes. [Default: 1]
+    --split-back-in-time            Find cameras and metas back in time breaks first, make sets within monotonic segments.
+    --dcim-manifest                 Save DCIM folders listing in a manifest, unchanged folders aren't listed on next runs.
+    --fail-on-dropped               Stop before making lots if pictures of a camera weren't fetched (series breaks).
     --debug                         Enable debugging options.
 """
 
@@ -68,6 +86,24 @@ def parse_arguments(args):
     p['dm_file'] = args["--dm-file"]
     p['number_of_devices'] = int(args["--number-of-devices"]) if args["--number-of-devices"] else DEFAULT_NB_CAM
     p['id_malette'] = int(args["--id-malette"]) if args["--id-malette"] else None
+    p['fetch_workers'] = int(args["--fetch-workers"]) if args["--fetch-workers"] else 1
+    p['prefetch_workers'] = int(args["--prefetch-workers"]) if args["--prefetch-workers"] else None
+    p['prefetch_order'] = str(args["--prefetch-order"]) if args["--prefetch-order"] else "index"
+    p['prefetch_read_ahead'] = bool(args["--prefetch-read-ahead"])
+    p['mtime_ts_samples'] = int(args["--mtime-ts-samples"]) if args["--mtime-ts-samples"] else None
+    # modification times are checked on fetched cameras, streaming is only used for full prefetches
+    p['prefetch_stream'] = bool(args["--prefetch-stream"]) and p['prefetch_workers'] is not None and p['mtime_ts_samples'] is None
+    p['watch_copies'] = int(args["--watch-copies"]) if args["--watch-copies"] and p['prefetch_stream'] else None
+    p['prefetch_backend'] = str(args["--prefetch-backend"]) if args["--prefetch-backend"] else "auto"
+    p['ts_cache'] = bool(args["--ts-cache"])
+    p['sparse_ts'] = bool(args["--sparse-ts"])
+    p['vectorized_sets'] = bool(args["--vectorized-sets"])
+    p['estimate_offsets'] = bool(args["--estimate-offsets"])
+    p['memoize_references'] = bool(args["--memoize-refs"])
+    p['ref_search_workers'] = int(args["--ref-search-workers"]) if args["--ref-search-workers"] else 1
+    p['split_back_in_time'] = bool(args["--split-back-in-time"])
+    p['dcim_manifest'] = bool(args["--dcim-manifest"])
+    p['fail_on_dropped'] = bool(args["--fail-on-dropped"])
 
     return p
 
@@ -93,6 +129,13 @@ def main():
         """
         logger.info("Save all lot progress : %f", progression*100)
 
+    def on_prefetch_progress(progression: float):
+        """
+        Display pictures timestamps prefetch progression.
+        :param progression: Progression rate.
+        """
+        logger.info("Prefetch pictures timestamps progress : %f", progression*100)
+
     # DM arguments
     dm_client_args = {}
     dm_client_args['default_protocol'] = Protocol.FILE if p['dm_file'] else Protocol.FTP
@@ -107,39 +150,68 @@ def main():
         opv_api_client=OpvApiRestClient(p['api_uri']),
         opv_dm_client=DirectoryManagerClient(**dm_client_args),
         number_of_cameras=p['number_of_devices'],
-        csv_meta_path=p['csv_path']
+        csv_meta_path=p['csv_path'],
+        use_ts_cache=p['ts_cache'],
+        sparse_timestamps=p['sparse_ts'],
+        vectorized_sets=p['vectorized_sets'],
+        estimate_offsets=p['estimate_offsets'],
+        memoize_references=p['memoize_references'],
+        reference_search_workers=p['ref_search_workers'],
+        split_back_in_time=p['split_back_in_time'],
+        use_dcim_manifest=p['dcim_manifest']
     )
 
-    logger.info("Starting making lot, go take some coffee (it might be really long)")
-    treat.make_lot()
-
-    lot_complete = 0
-    lot_with_meta_only = 0
-    lot_with_cam_set_only = 0
-    lot_without_geopoint = 0
-
-    for lot in treat._lots:
-        if lot.meta is None and lot.cam_set is None:
-            logger.error("WTF")
-
-        if lot.meta is None:
-            lot_with_meta_only += 1
-        elif lot.meta is None:
-            lot_with_cam_set_only += 1
-        elif lot.meta.geopoint is None:
-            lot_without_geopoint += 0
-        else:
-            lot_complete += 1
-
-    logger.debug("Number of complete lot : %i", lot_complete)
-    logger.debug("Number of lot with meta only : %i", lot_with_meta_only)
-    logger.debug("Number of lot with cam_set only : %i", lot_with_cam_set_only)
-    logger.debug("Number of lot without geopoint : %i", lot_without_geopoint)
-
-    logger.info("Creating campaign ...")
-    treat.create_campaign(name=p['campaign_name'], id_rederbro=p['campaign_id_rederbro'], description=p['campaign_desc'])
-    logger.info("Saving lots int db (lucky you, you will know have a progression).")
-    treat.save_all_lot(on_progress_listener=on_lot_progress)
+    try:
+        if not p['prefetch_stream']:  # cameras are fetched by the prefetch otherwise
+            logger.info("Fetching cameras images with %i workers ...", p['fetch_workers'])
+            treat.load_cam_images(number_of_workers=p['fetch_workers'])
+
+        if p['mtime_ts_samples'] is not None:
+            logger.info("Checking pictures modification time against %i exif timestamps per camera ...", p['mtime_ts_samples'])
+            treat.load_timestamps_from_mtime(nb_samples=p['mtime_ts_samples'])
+
+        if p['prefetch_workers'] is not None:
+            logger.info("Prefetching pictures timestamps with %i workers ...", p['prefetch_workers'])
+            treat.prefetch_timestamps(number_of_workers=p['prefetch_workers'], on_progress_listener=on_prefetch_progress,
+                                      read_order=p['prefetch_order'], read_ahead=p['prefetch_read_ahead'],
+                                      backend=p['prefetch_backend'], stream=p['prefetch_stream'],
+                                      watch_idle_timeout=p['watch_copies'])
+
+        logger.info("Checking cameras fetch reports ...")
+        treat.check_cam_images(fail_on_dropped=p['fail_on_dropped'])
+
+        logger.info("Starting making lot, go take some coffee (it might be really long)")
+        treat.make_lot()
+
+        lot_complete = 0
+        lot_with_meta_only = 0
+        lot_with_cam_set_only = 0
+        lot_without_geopoint = 0
+
+        for lot in treat._lots:
+            if lot.meta is None and lot.cam_set is None:
+                logger.error("WTF")
+
+            if lot.meta is None:
+                lot_with_meta_only += 1
+            elif lot.meta is None:
+                lot_with_cam_set_only += 1
+            elif lot.meta.geopoint is None:
+                lot_without_geopoint += 0
+            else:
+                lot_complete += 1
+
+        logger.debug("Number of complete lot : %i", lot_complete)
+        logger.debug("Number of lot with meta only : %i", lot_with_meta_only)
+        logger.debug("Number of lot with cam_set only : %i", lot_with_cam_set_only)
+        logger.debug("Number of lot without geopoint : %i", lot_without_geopoint)
+
+        logger.info("Creating campaign ...")
+        treat.create_campaign(name=p['campaign_name'], id_rederbro=p['campaign_id_rederbro'], description=p['campaign_desc'])
+        logger.info("Saving lots int db (lucky you, you will know have a progression).")
+        treat.save_all_lot(on_progress_listener=on_lot_progress)
+    finally:
+        treat.close()
 
     logger.info("Bye :)")
 
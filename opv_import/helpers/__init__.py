@@ -4,4 +4,12 @@ from opv_import.helpers.cam_indexes_walker import indexes_walk
 from opv_import.helpers.meta_csv_parser import MetaCsvParser
 from opv_import.helpers.udisk_device import UdiskDevice
 from opv_import.helpers.rsync_wrapper import RsyncWrapper
-from opv_import.helpers.thread_pool import ThreadPool
\ No newline at end of file
+from opv_import.helpers.thread_pool import ThreadPool
+from opv_import.helpers.timestamp_cache import TimestampCache
+from opv_import.helpers.pictures_index import PicturesIndex
+from opv_import.helpers.lazy_timestamps import LazyTimestamps
+from opv_import.helpers.dcim_manifest import DcimManifest
+from opv_import.helpers.inotify import Inotify
+from opv_import.helpers.picture_archive import PictureArchive
+from opv_import.helpers.dcf_naming import DcfNaming
+from opv_import.helpers.naming_profiles import NamingProfile, NameTable
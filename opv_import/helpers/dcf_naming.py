@@ -0,0 +1,113 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: DCF (Design rule for Camera File system) names, parsed once per camera : pictures are handled as
+#              integer indexes, names are only made to open files.
+
+import os
+import re
+from typing import Iterable, NamedTuple, Optional
+
+DCF_FILE_ALPHADIGIT_LEN = 4  # according to DCF specification DCF files have 4 alphadigit at the begining
+DCF_FOLDERS_DIGIT_LEN = 3    # according to DCF specification DCF directories (DCMI subdirectories) have 3 digit at the begining
+DCF_INDEX_DIGITS = re.compile("[0-9]+")  # ascii digits only, str.isdigit also accepts other unicode digits
+
+DcfNamingFields = NamedTuple('DcfNamingFields', [('prefix', str), ('digit_len', int), ('ext', str)])
+
+
+def dcf_folder_number(dcf_dir: str) -> int:
+    """
+    :param dcf_dir: DCF folder path or name, for instance "DCIM/100GOPRO".
+    :type dcf_dir: str
+    :return: The folder number, 100 for "100GOPRO".
+    :rtype: int
+    """
+    return int(os.path.basename(dcf_dir)[0:DCF_FOLDERS_DIGIT_LEN])
+
+
+def dcf_file_number(dcf_file: str) -> int:
+    """
+    :param dcf_file: DCF file path or name, for instance "100GOPRO/GOPR0042.JPG".
+    :type dcf_file: str
+    :return: The file index, 42 for "GOPR0042.JPG".
+    :rtype: int
+    """
+    return int(os.path.splitext(os.path.basename(dcf_file))[0][DCF_FILE_ALPHADIGIT_LEN:])
+
+
+class DcfNaming(DcfNamingFields):
+    """
+    Name formatting of a camera DCF files, for instance ("3D_L", 4, ".JPG") for "3D_L0000.JPG".
+    Still a (prefix, digit_len, ext) tuple, lengths are computed once.
+    """
+
+    def __new__(cls, prefix: str, digit_len: int, ext: str) -> 'DcfNaming':
+        naming = super().__new__(cls, prefix, digit_len, ext)
+        naming.max_index = 10 ** digit_len - 1  # last index before the camera rolls over (9999), in a new folder
+        naming._name_len = len(prefix) + digit_len + len(ext)
+        naming._ext_start = len(prefix) + digit_len
+        return naming
+
+    @classmethod
+    def _make(cls, iterable: Iterable) -> 'DcfNaming':
+        return cls(*iterable)
+
+    @classmethod
+    def from_file_name(cls, name: str) -> 'DcfNaming':
+        """
+        Parse the formatting of a DCF file name.
+
+        :param name: DCF file name (or path), for instance "3D_L0000.JPG".
+        :type name: str
+        :return: Its name formatting, ("3D_L", 4, ".JPG").
+        :rtype: DcfNaming
+        """
+        stem, ext = os.path.splitext(os.path.basename(name))
+        return cls(prefix=stem[0:DCF_FILE_ALPHADIGIT_LEN], digit_len=len(stem) - DCF_FILE_ALPHADIGIT_LEN, ext=ext)
+
+    def file_name(self, index: int) -> str:
+        """
+        :param index: File index.
+        :type index: int
+        :return: The DCF file name of the index, "3D_L0010.JPG" for 10.
+        :rtype: str
+        """
+        return self.prefix + str(index).zfill(self.digit_len) + self.ext
+
+    def index_of(self, name: str) -> Optional[int]:
+        """
+        Index of a file name, without making any name.
+
+        :param name: File name.
+        :type name: str
+        :return: The DCF file index, None if the name doesn't follow the formatting (other files, temporary copies,
+                 other digit length ...).
+        :rtype: int
+        """
+        if len(name) != self._name_len or not name.startswith(self.prefix) or not name.endswith(self.ext):
+            return None
+        digits = name[len(self.prefix):self._ext_start]
+        return int(digits) if DCF_INDEX_DIGITS.fullmatch(digits) else None
+
+    def is_rolled_over(self, next_index: int) -> bool:
+        """
+        :param next_index: Index following the last picture of a serie.
+        :type next_index: int
+        :return: True if the serie reached the last index (9999) : the camera goes on in a new folder, from its
+                 lowest index.
+        :rtype: bool
+        """
+        return next_index > self.max_index
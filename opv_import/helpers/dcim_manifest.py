@@ -0,0 +1,138 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Persistent DCIM manifest (pictures in series order, sizes, dropped files, folders modification times)
+#              stored in each APN folder, so that unchanged DCIM trees aren't walked again.
+
+import os
+import json
+import logging
+from path import Path
+from typing import Dict, List, Tuple
+
+DCIM_MANIFEST_VERSION = 2  # manifests with another version are ignored
+
+
+class DcimManifest:
+
+    def __init__(self, manifest_path: Path):
+        """
+        Initiate a DCIM manifest, use load() to read an existing manifest file.
+
+        :param manifest_path: Location of the manifest file.
+        :type manifest_path: Path
+        """
+        self.logger = logging.getLogger(self.__module__ + "." + self.__class__.__name__)
+        self.manifest_path = Path(manifest_path)
+        self.naming = None  # type: Tuple[str, int, str]  # DCF files prefix, digit len, extension
+        self.folders_mtime = {}  # type: Dict[str, int]  # folder path relative to the DCIM folder -> mtime (ns)
+        self.pictures = []  # type: List[Tuple[str, int]]  # (path relative to the DCIM folder, size) in series order
+        self.dropped_files = []  # type: List[str]  # files following the camera naming which weren't fetched, relative paths
+
+    @staticmethod
+    def folders_mtime_of(dcim_folder: Path, dcf_dirs: List[Path], dcim_mtime: int=None) -> Dict[str, int]:
+        """
+        Read the modification times of a DCIM folder and its DCF folders, they change when files are added,
+        removed or renamed.
+
+        :param dcim_folder: DCIM folder.
+        :param dcf_dirs: DCF folders in the DCIM folder.
+        :param dcim_mtime: DCIM folder mtime (ns) read before listing dcf_dirs, read now if not given.
+        :return: Folder path relative to the DCIM folder ("." for the DCIM folder) -> mtime (ns).
+        """
+        folders_mtime = {".": os.stat(dcim_folder).st_mtime_ns if dcim_mtime is None else dcim_mtime}
+        for dcf_dir in dcf_dirs:
+            folders_mtime[os.path.relpath(dcf_dir, dcim_folder)] = os.stat(dcf_dir).st_mtime_ns
+
+        return folders_mtime
+
+    def load(self) -> 'DcimManifest':
+        """
+        Read the manifest file, if it exists and has the current version.
+
+        :return: The manifest itself.
+        :rtype: DcimManifest
+        """
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r') as manifest_file:
+                    data = json.load(manifest_file)
+                if data.get("version") == DCIM_MANIFEST_VERSION:
+                    self.naming = tuple(data["naming"])
+                    self.folders_mtime = data["folders_mtime"]
+                    self.pictures = [tuple(p) for p in data["pictures"]]
+                    self.dropped_files = data["dropped_files"]
+            except (ValueError, KeyError, TypeError) as err:
+                self.logger.warning("Ignoring unreadable DCIM manifest %s : %r", self.manifest_path, err)
+
+            self.logger.debug("Loaded %i pictures from DCIM manifest %s", len(self.pictures), self.manifest_path)
+
+        return self
+
+    def is_up_to_date(self, dcim_folder: Path) -> bool:
+        """
+        Check the manifest against the folders modification times, costs one stat per folder.
+
+        :param dcim_folder: DCIM folder the manifest was made from.
+        :return: True if no folder changed since the manifest was made.
+        """
+        if self.naming is None or len(self.folders_mtime) == 0:
+            return False
+
+        dcim_folder = Path(dcim_folder)
+        for rel_folder, mtime in self.folders_mtime.items():
+            try:
+                if os.stat(dcim_folder / rel_folder).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+
+        return True
+
+    def save(self, naming: Tuple[str, int, str], folders_mtime: Dict[str, int], pictures: List[Tuple[str, int]],
+             dropped_files: List[str] = None):
+        """
+        Write the manifest file, errors are logged (read-only storage).
+
+        :param naming: DCF files prefix, digit len, extension.
+        :param folders_mtime: Folders modification times read before the DCIM folder was walked (see folders_mtime_of).
+        :param pictures: (path relative to the DCIM folder, size) in series order.
+        :param dropped_files: Paths relative to the DCIM folder of the files which weren't fetched, so that they are
+                              reported again while the manifest is used. Optional.
+        """
+        self.naming = tuple(naming)
+        self.folders_mtime = folders_mtime
+        self.pictures = pictures
+        self.dropped_files = [] if dropped_files is None else dropped_files
+
+        tmp_path = self.manifest_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as manifest_file:
+                json.dump({
+                    "version": DCIM_MANIFEST_VERSION,
+                    "naming": list(self.naming),
+                    "folders_mtime": self.folders_mtime,
+                    "pictures": [list(p) for p in self.pictures],
+                    "dropped_files": self.dropped_files}, manifest_file)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as err:
+            self.logger.warning("Can't save DCIM manifest %s : %r", self.manifest_path, err)
+            return
+
+        self.logger.debug("Saved %i pictures in DCIM manifest %s", len(self.pictures), self.manifest_path)
+
+    def __len__(self) -> int:
+        return len(self.pictures)
@@ -0,0 +1,118 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Minimal inotify (linux) binding, to follow directories being filled (SD copies).
+
+import os
+import errno
+import ctypes
+import ctypes.util
+import select
+import struct
+from typing import Dict, List, NamedTuple
+
+IN_CLOSE_WRITE = 0x00000008  # file opened for writing was closed
+IN_MOVED_TO = 0x00000080     # file moved into a watched directory (rsync renames its temporary files)
+IN_CREATE = 0x00000100       # file or directory created in a watched directory
+IN_Q_OVERFLOW = 0x00004000   # events queue overflowed, events were lost
+IN_ISDIR = 0x40000000        # subject of the event is a directory
+
+EVENT_HEADER = struct.Struct("iIII")  # struct inotify_event : wd, mask, cookie, len (followed by the name)
+EVENTS_READ_SIZE = 64 * 1024  # bytes read at once from the inotify file descriptor
+
+InotifyEvent = NamedTuple('InotifyEvent', [('path', str), ('mask', int)])
+
+
+class Inotify:
+
+    def __init__(self):
+        """
+        Open an inotify instance.
+
+        :raise OSError: When inotify isn't available (not linux, no more instances ...).
+        """
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify isn't available")
+
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._watched = {}  # type: Dict[int, str]  # watch descriptor -> watched directory
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """
+        Watch a directory.
+
+        :param path: Directory path.
+        :type path: str
+        :param mask: Watched events (IN_* flags).
+        :type mask: int
+        :return: The watch descriptor.
+        :rtype: int
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), ctypes.c_uint32(mask))
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+        self._watched[wd] = str(path)
+        return wd
+
+    def read_events(self, timeout: float=None) -> List[InotifyEvent]:
+        """
+        Wait for events and read them.
+
+        :param timeout: Maximum waiting time in seconds, None to wait until an event is received.
+        :type timeout: float
+        :return: Received events, their path is the watched directory joined with the event name. Empty on timeout.
+                 An IN_Q_OVERFLOW event (empty path) tells events were lost.
+        :rtype: List[InotifyEvent]
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if len(ready) == 0:
+            return []
+
+        try:
+            data = os.read(self.fd, EVENTS_READ_SIZE)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b'\x00'))
+            offset += name_len
+            if wd in self._watched:
+                events.append(InotifyEvent(path=os.path.join(self._watched[wd], name), mask=mask))
+            elif mask & IN_Q_OVERFLOW:  # not related to a watch, the watched directories should be listed again
+                events.append(InotifyEvent(path="", mask=mask))
+
+        return events
+
+    def close(self):
+        """ Release the inotify instance and its watches. """
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self) -> 'Inotify':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
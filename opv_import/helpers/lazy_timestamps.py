@@ -0,0 +1,72 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Camera timestamps read on demand, with binary search relying on timestamps monotonicity.
+
+from typing import Callable, Dict, Sized
+
+
+class LazyTimestamps:
+
+    def __init__(self, pictures: Sized, read_ts: Callable[[int], int]):
+        """
+        Initiate lazy timestamps of a camera.
+
+        :param pictures: Pictures of the camera, their number is read on each access (pictures can be appended).
+        :type pictures: Sized
+        :param read_ts: Returns the timestamp of the picture at an index.
+        :type read_ts: Callable[[int], int]
+        """
+        self._pictures = pictures
+        self._read_ts = read_ts
+        self._values = {}  # type: Dict[int, int]
+        self.nb_reads = 0  # number of timestamps read through this provider
+
+    def __len__(self) -> int:
+        return len(self._pictures)
+
+    def __getitem__(self, index: int) -> int:
+        if index not in self._values:
+            self._values[index] = self._read_ts(index)
+            self.nb_reads += 1
+        return self._values[index]
+
+    def bisect_right(self, ts: int, lo: int=0, hi: int=None) -> int:
+        """
+        Find the first index in [lo, hi[ with a timestamp greater than ts, assuming timestamps don't decrease.
+        Only O(log(hi - lo)) timestamps are read.
+
+        :param ts: Searched timestamp.
+        :param lo: Lower bound index.
+        :param hi: Upper bound index (excluded), default is the number of pictures.
+        :return: The index, None if the read timestamps show they aren't monotonic (back in time) on the range.
+        :rtype: int
+        """
+        hi = len(self._pictures) if hi is None else hi
+        probes = {}
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probes[mid] = self[mid]
+            if ts < probes[mid]:
+                hi = mid
+            else:
+                lo = mid + 1
+
+        probed_ts = [probes[i] for i in sorted(probes.keys())]
+        if any(a > b for a, b in zip(probed_ts, probed_ts[1:])):
+            return None
+
+        return lo
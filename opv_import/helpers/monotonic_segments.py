@@ -0,0 +1,68 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Back in time breaks of timestamps series (cameras pictures, metas). A clock going back in time makes
+#              a picture older than its previous one, it starts a new monotonic segment. Sets and lots are only made
+#              within a segment : they end at the first break after their start.
+
+import numpy as np
+from typing import List, Sequence
+
+
+def find_breaks(timestamps: Sequence[int]) -> np.ndarray:
+    """
+    :param timestamps: Timestamps of a series, in pictures (or metas) order.
+    :type timestamps: Sequence[int]
+    :return: Indexes of the timestamps older than their previous one, each one starts a monotonic segment.
+    :rtype: np.ndarray
+    """
+    ts = np.asarray(timestamps, dtype=np.int64)
+    return np.flatnonzero(np.diff(ts) < 0) + 1
+
+
+def segment_ends(breaks: Sequence[np.ndarray], start_indexes: Sequence[int], nb_elements: Sequence[int]) -> List[int]:
+    """
+    End of the monotonic segment of each series from its start : the first break after the start.
+
+    :param breaks: Breaks of each series (see find_breaks).
+    :type breaks: Sequence[np.ndarray]
+    :param start_indexes: Start index of each series.
+    :type start_indexes: Sequence[int]
+    :param nb_elements: Length of each series.
+    :type nb_elements: Sequence[int]
+    :return: Segments ends (excluded), the series length if there is no break after the start.
+    :rtype: List[int]
+    """
+    ends = []
+    for series_breaks, start, nb in zip(breaks, start_indexes, nb_elements):
+        pos = int(np.searchsorted(series_breaks, start, side="right"))
+        ends.append(int(series_breaks[pos]) if pos < len(series_breaks) else nb)
+
+    return ends
+
+
+def reached_ends(next_indexes: Sequence[int], end_indexes: Sequence[int], nb_elements: Sequence[int]) -> List[int]:
+    """
+    :param next_indexes: Next index of each series.
+    :type next_indexes: Sequence[int]
+    :param end_indexes: Segment end of each series (see segment_ends).
+    :type end_indexes: Sequence[int]
+    :param nb_elements: Length of each series.
+    :type nb_elements: Sequence[int]
+    :return: The series whose next element went back in time.
+    :rtype: List[int]
+    """
+    return [no for no, (index, end, nb) in enumerate(zip(next_indexes, end_indexes, nb_elements)) if end < nb and index >= end]
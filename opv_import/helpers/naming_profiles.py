@@ -0,0 +1,229 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Camera naming profiles (files and folders names, pictures order), detected per camera from a few
+#              sampled names before its DCIM folder is walked.
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple, Union
+from opv_import.helpers.dcf_naming import DcfNaming, dcf_folder_number
+
+PICTURE_EXTENSIONS = (".jpg", ".jpeg")  # sampled names are pictures names (lower case), videos and thumbnails are ignored
+NAMING_SAMPLE_SIZE = 16  # number of pictures names sampled in each sampled folder
+
+
+class NameTable:
+
+    def __init__(self, file_pattern: 're.Pattern'):
+        """
+        Naming of pictures whose names can't be made back from an index (timestamps names) : names are kept,
+        a picture index is its name position in the table. Same interface as DcfNaming.
+
+        :param file_pattern: Pictures names pattern, other names have no index.
+        :type file_pattern: re.Pattern
+        """
+        self.file_pattern = file_pattern
+        self.names = []  # type: List[str]
+        self._indexes = {}  # type: Dict[str, int]
+
+    def file_name(self, index: int) -> str:
+        """
+        :param index: Picture index.
+        :type index: int
+        :return: The picture name.
+        :rtype: str
+        """
+        return self.names[index]
+
+    def index_of(self, name: str) -> Optional[int]:
+        """
+        Index of a picture name, names are added to the table the first time they are seen.
+
+        :param name: File name.
+        :type name: str
+        :return: The picture index, None if the name doesn't follow the pattern.
+        :rtype: int
+        """
+        index = self._indexes.get(name)
+        if index is None and self.file_pattern.fullmatch(name) is not None:
+            index = self._indexes.setdefault(name, len(self.names))
+            if index == len(self.names):
+                self.names.append(name)
+        return index
+
+
+class NamingProfile:
+    """ Base naming profile, see DcfNamingProfile and TimestampNamingProfile """
+
+    name = None  # type: str  # profile name, for logs
+    dcf_series = False  # True if pictures are ordered following DCF series (see CameraImageFetcher), sorted by file_key otherwise
+    start_index = 0  # index of a camera first picture (DCF series)
+
+    def __init__(self, file_pattern: str, folder_pattern: str):
+        """
+        :param file_pattern: Regular expression matching whole pictures names.
+        :type file_pattern: str
+        :param folder_pattern: Regular expression matching the beginning of folders names.
+        :type folder_pattern: str
+        """
+        self.file_pattern = re.compile(file_pattern)
+        self.folder_pattern = re.compile(folder_pattern)
+
+    def is_folder(self, name: str) -> bool:
+        """
+        :param name: Folder name.
+        :type name: str
+        :return: True if the folder can hold the camera pictures.
+        :rtype: bool
+        """
+        return self.folder_pattern.match(name) is not None
+
+    def matches(self, folders_names: List[str], files_names: List[str]) -> bool:
+        """
+        Check sampled names against the profile.
+
+        :param folders_names: Sampled folders names.
+        :type folders_names: List[str]
+        :param files_names: Sampled pictures names, not empty.
+        :type files_names: List[str]
+        :return: True if all names follow the profile.
+        :rtype: bool
+        """
+        return all(self.is_folder(name) for name in folders_names) and \
+            all(self.file_pattern.fullmatch(name) is not None for name in files_names)
+
+    def make_naming(self, files_names: List[str]) -> Union[DcfNaming, NameTable]:
+        """
+        :param files_names: Sampled pictures names, matching the profile.
+        :type files_names: List[str]
+        :return: The naming used to list and make the camera pictures names.
+        :rtype: Union[DcfNaming, NameTable]
+        """
+        raise NotImplementedError()
+
+    def folder_key(self, folder: str):
+        """ Folders sort key, in pictures order """
+        raise NotImplementedError()
+
+    def file_key(self, name: str):
+        """ Pictures names sort key, when pictures aren't ordered following DCF series """
+        raise NotImplementedError()
+
+    def __repr__(self):
+        return "NamingProfile: {}".format(self.name)
+
+
+class DcfNamingProfile(NamingProfile):
+
+    dcf_series = True
+
+    def __init__(self, name: str, file_pattern: str, folder_pattern: str, start_index: int, several_series: bool = False):
+        """
+        Profile of DCF named cameras, the pictures of a camera are walked following one DcfNaming.
+
+        :param name: Profile name.
+        :type name: str
+        :param file_pattern: Regular expression matching whole pictures names.
+        :type file_pattern: str
+        :param folder_pattern: Regular expression matching the beginning of folders names.
+        :type folder_pattern: str
+        :param start_index: Index of the camera first picture, a serie is restarted from it.
+        :type start_index: int
+        :param several_series: True if the camera names pictures following several DcfNaming (GoPro bursts and
+                               time-lapses "G0010002.JPG" next to "GOPR0001.JPG"), only the main one is walked. If
+                               False, all sampled names must share a DcfNaming.
+        :type several_series: bool
+        """
+        super().__init__(file_pattern=file_pattern, folder_pattern=folder_pattern)
+        self.name = name
+        self.start_index = start_index
+        self.several_series = several_series
+
+    def matches(self, folders_names: List[str], files_names: List[str]) -> bool:
+        return super().matches(folders_names, files_names) and \
+            (self.several_series or len({DcfNaming.from_file_name(name) for name in files_names}) == 1)
+
+    def make_naming(self, files_names: List[str]) -> DcfNaming:
+        """ Naming of most sampled names (first sampled one on ties), pictures of the other series are dropped """
+        namings = [DcfNaming.from_file_name(name) for name in files_names]
+        return max(namings, key=lambda naming: (namings.count(naming), -namings.index(naming)))
+
+    def folder_key(self, folder: str) -> int:
+        return dcf_folder_number(folder)
+
+
+class TimestampNamingProfile(NamingProfile):
+
+    name = "timestamp"
+
+    def __init__(self):
+        """
+        Profile of cameras naming pictures after their capture time ("IMG_20171028_081103.jpg"), pictures are
+        sorted by the time in their name, in folders sorted by name.
+        """
+        super().__init__(file_pattern=r"\D*(\d{8})[_-]?(\d{6})[^.]*\.[jJ][pP][eE]?[gG]", folder_pattern=r"")
+
+    def make_naming(self, files_names: List[str]) -> NameTable:
+        return NameTable(file_pattern=self.file_pattern)
+
+    def folder_key(self, folder: str) -> str:
+        return os.path.basename(folder)
+
+    def file_key(self, name: str) -> Tuple[str, str]:
+        date, time = self.file_pattern.fullmatch(name).group(1, 2)
+        return date + time, name
+
+
+GOPRO_PROFILE = DcfNamingProfile(name="gopro", file_pattern=r"(GOPR|G\d{3})\d{4}\.JPG", folder_pattern=r"\d{3}GOPRO", start_index=1,
+                                 several_series=True)
+DCF_PROFILE = DcfNamingProfile(name="dcf", file_pattern=r"[A-Za-z0-9_]{4}\d{4}\.[jJ][pP][eE]?[gG]", folder_pattern=r"\d{3}", start_index=0)
+TIMESTAMP_PROFILE = TimestampNamingProfile()
+NAMING_PROFILES = [GOPRO_PROFILE, DCF_PROFILE, TIMESTAMP_PROFILE]  # detection order, most specific first
+
+
+def is_picture_name(name: str) -> bool:
+    """
+    :param name: File name.
+    :type name: str
+    :return: True if the file is a picture (PICTURE_EXTENSIONS).
+    :rtype: bool
+    """
+    return os.path.splitext(name)[1].lower() in PICTURE_EXTENSIONS
+
+
+def detect_naming_profile(folders_names: List[str], files_names: List[str],
+                          profiles: List[NamingProfile]=None) -> Optional[NamingProfile]:
+    """
+    Choose a camera naming profile from sampled names.
+
+    :param folders_names: Sampled folders names.
+    :type folders_names: List[str]
+    :param files_names: Sampled pictures names.
+    :type files_names: List[str]
+    :param profiles: Candidate profiles, in detection order, NAMING_PROFILES by default.
+    :type profiles: List[NamingProfile]
+    :return: The first profile all names follow, None if there is none (or no picture name).
+    :rtype: NamingProfile
+    """
+    if len(files_names) == 0:
+        return None
+
+    for profile in NAMING_PROFILES if profiles is None else profiles:
+        if profile.matches(folders_names, files_names):
+            return profile
+
+    return None
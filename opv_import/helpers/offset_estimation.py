@@ -0,0 +1,132 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Cameras clock offsets estimation, from the timestamps differences of pictures with close indexes.
+#              Pictures of a shot have close indexes on all cameras (a few missing pictures shift them), the
+#              difference of their timestamps is the offset : it is the most frequent difference.
+
+import numpy as np
+from typing import List, NamedTuple, Optional, Sequence
+
+OFFSET_INDEX_WINDOW = 32  # a picture is paired with the pictures of the other camera at the same index +/- this window
+OFFSET_MIN_SUPPORT_RATIO = 0.5  # minimum rate of pictures paired within the offset margin for an estimation
+OFFSET_REFERENCE_CANDIDATES = 16  # number of reference camera pictures tried as reference set
+
+OffsetEstimate = NamedTuple('OffsetEstimate', [
+    ('offset', int),  # timestamps difference, camera - reference camera
+    ('support', int),  # number of pairs of pictures within the margin of the offset
+    ('nb_pairs', int)])  # number of pairs of pictures compared
+
+
+def _pairwise_differences(ref_ts: np.ndarray, cam_ts: np.ndarray, index_window: int):
+    """
+    :return: Timestamps differences cam_ts[k + shift] - ref_ts[k] and their index shift, for shifts in
+             [-index_window, index_window].
+    """
+    diffs, shifts = [], []
+    for shift in range(-index_window, index_window + 1):
+        first, last = max(0, -shift), min(len(ref_ts), len(cam_ts) - shift)
+        if first < last:
+            diffs.append(cam_ts[first + shift:last + shift] - ref_ts[first:last])
+            shifts.append(np.full(last - first, abs(shift), dtype=np.int64))
+
+    if len(diffs) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    return np.concatenate(diffs), np.concatenate(shifts)
+
+
+def estimate_offset(ref_ts: Sequence[int], cam_ts: Sequence[int], margin: int,
+                    index_window: int=OFFSET_INDEX_WINDOW,
+                    min_support_ratio: float=OFFSET_MIN_SUPPORT_RATIO) -> Optional[OffsetEstimate]:
+    """
+    Estimate the clock offset of a camera, histogramming the timestamps differences of pictures with close indexes
+    (near-linear in the number of pictures). The most populated margin wide interval of differences holds the
+    offset, ties (regular shots) are won by the pairs with the closest indexes.
+
+    :param ref_ts: Timestamps of the reference camera pictures (a sample from the partition start).
+    :type ref_ts: Sequence[int]
+    :param cam_ts: Timestamps of the camera pictures, from the same start.
+    :type cam_ts: Sequence[int]
+    :param margin: Max accepted difference between leveled timestamps of a set (TIME_MARGING), > 0.
+    :type margin: int
+    :param index_window: Max index shift between paired pictures.
+    :type index_window: int
+    :param min_support_ratio: Minimum rate of the smallest sample paired within the offset margin.
+    :type min_support_ratio: float
+    :return: The estimate, None if there aren't enough pictures paired in any offset margin.
+    :rtype: OffsetEstimate
+    """
+    ref_ts, cam_ts = np.asarray(ref_ts, dtype=np.int64), np.asarray(cam_ts, dtype=np.int64)
+    diffs, shifts = _pairwise_differences(ref_ts, cam_ts, index_window)
+    if len(diffs) == 0:
+        return None
+
+    order = np.argsort(diffs, kind="mergesort")  # stable sort, "stable" kind needs numpy 1.15
+    diffs, shifts = diffs[order], shifts[order]
+    ends = np.searchsorted(diffs, diffs + margin, side="left")  # pairs in [diffs[i], diffs[i] + margin[
+    supports = ends - np.arange(len(diffs))
+    shifts_sums = np.concatenate(([0], np.cumsum(shifts)))
+    mean_shifts = (shifts_sums[ends] - shifts_sums[0:len(diffs)]) / supports
+
+    best = int(np.lexsort((mean_shifts, -supports))[0])
+    support = int(supports[best])
+    if support < min_support_ratio * min(len(ref_ts), len(cam_ts)):
+        return None
+
+    offset = int(np.round(np.median(diffs[best:ends[best]])))
+    return OffsetEstimate(offset=offset, support=support, nb_pairs=len(diffs))
+
+
+def choose_reference(timestamps: Sequence[Sequence[int]], offsets: Sequence[int], margin: int,
+                     nb_candidates: int=OFFSET_REFERENCE_CANDIDATES) -> Optional[List[int]]:
+    """
+    Choose a reference set matching estimated offsets : for the first pictures of the reference camera (camera 0),
+    each camera picture with the closest timestamp to the expected one. The candidate with the smallest max error is
+    kept, the first one on ties.
+
+    :param timestamps: Timestamps of each camera pictures (a sample from the partition start), camera 0 is the
+                       reference camera.
+    :type timestamps: Sequence[Sequence[int]]
+    :param offsets: Estimated offset of each camera (0 for camera 0).
+    :type offsets: Sequence[int]
+    :param margin: Max accepted difference between leveled timestamps of a set (TIME_MARGING), > 0.
+    :type margin: int
+    :param nb_candidates: Number of reference camera pictures tried.
+    :type nb_candidates: int
+    :return: Positions of the reference set pictures in the samples, None if no candidate is within the margin.
+    :rtype: List[int]
+    """
+    cams_ts = [np.asarray(ts, dtype=np.int64) for ts in timestamps]
+    if any(len(ts) == 0 for ts in cams_ts):
+        return None
+
+    candidates = cams_ts[0][0:nb_candidates]
+    positions, errors = [np.arange(len(candidates))], [np.zeros(len(candidates), dtype=np.int64)]
+    for ts, offset in zip(cams_ts[1:], offsets[1:]):
+        expected = candidates + offset
+        right = np.minimum(np.searchsorted(ts, expected), len(ts) - 1)
+        left = np.maximum(right - 1, 0)
+        closest = np.where(np.abs(ts[left] - expected) <= np.abs(ts[right] - expected), left, right)
+        positions.append(closest)
+        errors.append(np.abs(ts[closest] - expected))
+
+    max_errors = np.max(errors, axis=0)
+    best = int(np.argmin(max_errors))
+    if max_errors[best] >= margin:
+        return None
+
+    return [int(cam_positions[best]) for cam_positions in positions]
@@ -0,0 +1,367 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Pictures stored in an uncompressed tar or zip archive, read in place (member offsets are indexed once,
+#              pictures are read through a memory map of the archive), without extraction.
+
+import io
+import os
+import json
+import mmap
+import time
+import errno
+import struct
+import logging
+import tarfile
+import zipfile
+import posixpath
+import threading
+from path import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+ARCHIVE_INDEX_VERSION = 1  # indexes with another version are made again
+ARCHIVE_INDEX_SUFFIX = ".index.json"  # the members index is stored next to the archive, "APN0.tar.index.json"
+DCIM_FOLDER_NAME = "DCIM"
+
+ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")  # zip local file header, followed by the file name and extra field
+ZIP_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+ZIP_FLAG_ENCRYPTED = 0x1
+
+COPY_CHUNK_SIZE = 8 * 2 ** 20  # bytes copied at once when copy_file_range isn't available
+
+ArchiveMember = NamedTuple('ArchiveMember', [('offset', int), ('size', int), ('mtime', int)])
+
+
+class PictureArchive:
+
+    def __init__(self, archive_path: Path, use_index: bool=True):
+        """
+        Open a pictures archive and index its members : from the index file next to it if the archive didn't change,
+        by reading the archive headers otherwise (tar headers are spread in the archive, zip ones are at its end).
+        Members paths are the archive path joined with the member name, as if the archive was a folder.
+
+        :param archive_path: Location of the archive (.tar or .zip).
+        :type archive_path: Path
+        :param use_index: If True the members index is saved next to the archive and loaded from it.
+        :type use_index: bool
+        :raise ValueError: When the archive is compressed, encrypted or isn't a tar or zip archive.
+        """
+        self.logger = logging.getLogger(self.__module__ + "." + self.__class__.__name__)
+        self.archive_path = Path(archive_path)
+        self.index_path = Path(self.archive_path + ARCHIVE_INDEX_SUFFIX)
+        self.members = {}  # type: Dict[str, ArchiveMember]  # member name -> data position, in archive order
+        self._dir_files = {}  # type: Dict[str, List[str]]  # folder name ("" for the root) -> files names
+        self._dir_dirs = {}  # type: Dict[str, List[str]]  # folder name -> sub folders names
+        self._file = None
+        self._mmap = None
+        self._lock = threading.Lock()
+
+        stat = os.stat(self.archive_path)
+        if not (use_index and self._load_index(size=stat.st_size, mtime=stat.st_mtime_ns)):
+            self._index()
+            if use_index:
+                self._save_index(size=stat.st_size, mtime=stat.st_mtime_ns)
+        self._make_tree()
+
+    @staticmethod
+    def _normalize(name: str) -> Optional[str]:
+        """ Member name without "./" or leading "/", None for names out of the archive root """
+        name = posixpath.normpath(name).lstrip("/")
+        return None if name == "." or name.startswith("..") else name
+
+    def _index(self):
+        """
+        Read the archive headers and index its files members.
+
+        :raise ValueError: When the archive can't be read in place.
+        """
+        start = time.perf_counter()
+        if self.archive_path.ext.lower() == ".zip":
+            self._index_zip()
+        else:
+            self._index_tar()
+
+        self.logger.debug("Indexed %i members of %s in %.3f s", len(self.members), self.archive_path, time.perf_counter() - start)
+
+    def _index_tar(self):
+        try:
+            with tarfile.open(self.archive_path, "r:") as tar:  # "r:" refuses compressed archives
+                for member in tar:
+                    name = self._normalize(member.name)
+                    if member.isfile() and not member.issparse() and name is not None:
+                        self.members[name] = ArchiveMember(offset=member.offset_data, size=member.size, mtime=int(member.mtime))
+        except tarfile.ReadError as err:
+            raise ValueError("{} isn't an uncompressed tar or zip archive : {}".format(self.archive_path, err))
+
+    def _index_zip(self):
+        with open(self.archive_path, "rb") as f, zipfile.ZipFile(f) as archive:
+            for info in archive.infolist():
+                name = self._normalize(info.filename)
+                if info.filename.endswith('/') or name is None:  # folder member (ZipInfo.is_dir needs python 3.6)
+                    continue
+                if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & ZIP_FLAG_ENCRYPTED:
+                    raise ValueError("{} member {} is compressed or encrypted, it can't be read in place".format(
+                        self.archive_path, info.filename))
+
+                # the central directory doesn't give the data position, the local header extra field may differ
+                f.seek(info.header_offset)
+                header = ZIP_LOCAL_HEADER.unpack(f.read(ZIP_LOCAL_HEADER.size))
+                if header[0] != ZIP_LOCAL_HEADER_SIGNATURE:
+                    raise ValueError("{} member {} has a bad local header".format(self.archive_path, info.filename))
+                name_len, extra_len = header[9], header[10]
+                offset = info.header_offset + ZIP_LOCAL_HEADER.size + name_len + extra_len
+                mtime = int(time.mktime(info.date_time + (0, 0, -1)))  # zip times are local times
+                self.members[name] = ArchiveMember(offset=offset, size=info.file_size, mtime=mtime)
+
+    def _load_index(self, size: int, mtime: int) -> bool:
+        """
+        Load the members index file, if it was made from the same archive.
+
+        :param size: Archive size.
+        :param mtime: Archive modification time (ns).
+        :return: True if members were loaded.
+        """
+        if not self.index_path.exists():
+            return False
+
+        try:
+            with open(self.index_path, 'r') as index_file:
+                data = json.load(index_file)
+            if data.get("version") != ARCHIVE_INDEX_VERSION or data["archive_size"] != size or data["archive_mtime"] != mtime:
+                return False
+            self.members = {name: ArchiveMember(offset=offset, size=m_size, mtime=m_mtime)
+                            for name, offset, m_size, m_mtime in data["members"]}
+        except (ValueError, KeyError, TypeError) as err:
+            self.logger.warning("Ignoring unreadable archive index %s : %r", self.index_path, err)
+            self.members = {}
+            return False
+
+        self.logger.debug("Loaded %i members from archive index %s", len(self.members), self.index_path)
+        return True
+
+    def _save_index(self, size: int, mtime: int):
+        """
+        Write the members index file, errors are logged (read-only storage).
+
+        :param size: Archive size.
+        :param mtime: Archive modification time (ns).
+        """
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as index_file:
+                json.dump({
+                    "version": ARCHIVE_INDEX_VERSION,
+                    "archive_size": size,
+                    "archive_mtime": mtime,
+                    "members": [[name, m.offset, m.size, m.mtime] for name, m in self.members.items()]}, index_file)
+            os.replace(tmp_path, self.index_path)
+        except OSError as err:
+            self.logger.warning("Can't save archive index %s : %r", self.index_path, err)
+
+    def _make_tree(self):
+        """ Folders content from the members names, folders without file members are implied by their files """
+        self._dir_files = {"": []}
+        self._dir_dirs = {"": []}
+        for name in self.members:
+            folder, file_name = posixpath.split(name)
+            self._add_dir(folder)
+            self._dir_files[folder].append(file_name)
+
+    def _add_dir(self, folder: str):
+        if folder in self._dir_dirs:
+            return
+        parent, dir_name = posixpath.split(folder)
+        self._add_dir(parent)
+        self._dir_dirs[parent].append(dir_name)
+        self._dir_dirs[folder] = []
+        self._dir_files[folder] = []
+
+    def _name_of(self, path: Path) -> str:
+        """ Member name of a path in the archive """
+        return self._normalize(os.path.relpath(path, self.archive_path).replace(os.sep, "/")) or ""
+
+    def _member(self, path: Path) -> ArchiveMember:
+        try:
+            return self.members[self._name_of(path)]
+        except KeyError:
+            raise FileNotFoundError(errno.ENOENT, "No such member in {}".format(self.archive_path), str(path))
+
+    def find_dcim_folder(self) -> Optional[Path]:
+        """
+        Find the DCIM folder, the least deep one if there are several ("DCIM" or "APN0/DCIM" for instance).
+
+        :return: DCIM folder path, None if there isn't one.
+        :rtype: Path
+        """
+        folders = [f for f in self._dir_dirs if posixpath.basename(f) == DCIM_FOLDER_NAME]
+        if len(folders) == 0:
+            return None
+        return self.archive_path / min(folders, key=lambda f: f.count("/"))
+
+    def dirs(self, path: Path) -> List[Path]:
+        """
+        :param path: Folder path in the archive.
+        :type path: Path
+        :return: Sub folders paths, in archive order, empty if the folder doesn't exist.
+        :rtype: List[Path]
+        """
+        return [Path(path) / name for name in self._dir_dirs.get(self._name_of(path), [])]
+
+    def file_names(self, path: Path) -> List[str]:
+        """
+        :param path: Folder path in the archive.
+        :type path: Path
+        :return: Names of the folder files, in archive order, empty if the folder doesn't exist.
+        :rtype: List[str]
+        """
+        return list(self._dir_files.get(self._name_of(path), []))
+
+    def getmtime(self, path: Path) -> int:
+        """
+        :param path: File path in the archive.
+        :type path: Path
+        :return: File modification time stored in the archive.
+        :rtype: int
+        :raise FileNotFoundError: When the file isn't in the archive.
+        """
+        return self._member(path).mtime
+
+    def byte_range(self, path: Path) -> Tuple[int, int]:
+        """
+        Position of a file data in the archive, so that it can be copied without going through a file path.
+
+        :param path: File path in the archive.
+        :type path: Path
+        :return: Offset and size of the file data in the archive.
+        :rtype: Tuple[int, int]
+        :raise FileNotFoundError: When the file isn't in the archive.
+        """
+        member = self._member(path)
+        return member.offset, member.size
+
+    def _get_mmap(self) -> mmap.mmap:
+        with self._lock:
+            if self._mmap is None:
+                self._file = open(self.archive_path, "rb")
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._mmap
+
+    def open(self, path: Path) -> io.BufferedReader:
+        """
+        Open a file of the archive, reads are made through the archive memory map, only the read pages are loaded.
+
+        :param path: File path in the archive.
+        :type path: Path
+        :return: Seekable read-only file object, usable as a context manager.
+        :rtype: io.BufferedReader
+        :raise FileNotFoundError: When the file isn't in the archive.
+        """
+        member = self._member(path)
+        return io.BufferedReader(_MemberReader(self._get_mmap(), offset=member.offset, size=member.size))
+
+    def copy_range(self, offset: int, size: int, dest: Path):
+        """
+        Copy a byte range of the archive to a new file, in the kernel (copy_file_range) when possible.
+
+        :param offset: Start of the range in the archive.
+        :type offset: int
+        :param size: Length of the range.
+        :type size: int
+        :param dest: Destination file, overwritten.
+        :type dest: Path
+        """
+        with open(self.archive_path, "rb") as src, open(dest, "wb") as dst:
+            copied = 0
+            if hasattr(os, "copy_file_range"):
+                try:
+                    while copied < size:
+                        n = os.copy_file_range(src.fileno(), dst.fileno(), size - copied, offset + copied)
+                        if n == 0:
+                            break
+                        copied += n
+                except OSError as err:  # not supported by the kernel or between these file systems
+                    if err.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP):
+                        raise
+
+            dst.seek(copied)  # copy_file_range moved the descriptor position, not the file object one
+            src.seek(offset + copied)
+            while copied < size:
+                data = src.read(min(COPY_CHUNK_SIZE, size - copied))
+                if len(data) == 0:
+                    raise OSError(errno.EIO, "Unexpected end of archive {}".format(self.archive_path))
+                dst.write(data)
+                copied += len(data)
+
+    def close(self):
+        """ Release the archive memory map. """
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._file.close()
+                self._mmap = None
+                self._file = None
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __enter__(self) -> 'PictureArchive':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _MemberReader(io.RawIOBase):
+
+    def __init__(self, archive_map: mmap.mmap, offset: int, size: int):
+        """
+        Raw reader of an archive member, bounded to its data.
+
+        :param archive_map: Archive memory map.
+        :param offset: Member data offset in the archive.
+        :param size: Member size.
+        """
+        super().__init__()
+        self._map = archive_map
+        self._offset = offset
+        self._size = size
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = max(0, min(len(buffer), self._size - self._position))
+        start = self._offset + self._position
+        buffer[0:n] = self._map[start:start + n]
+        self._position += n
+        return n
+
+    def seek(self, position: int, whence: int=io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            position += self._position
+        elif whence == io.SEEK_END:
+            position += self._size
+        if position < 0:
+            raise ValueError("negative seek position {}".format(position))
+        self._position = position
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
@@ -0,0 +1,119 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Pictures index sidecar file (path, size, timestamp, exif tags) stored in each APN folder.
+
+import csv
+import json
+import logging
+from path import Path
+from typing import Dict, List, Optional, Tuple
+
+PICTURES_INDEX_CSV_DELIMITER = ';'
+PICTURES_INDEX_CSV_HEADER = ["path", "size", "timestamp", "exif_tags"]
+PICTURES_INDEX_CSV_V1_LEN = 3  # indexes written before exif tags were stored, no exif_tags column
+
+
+class PicturesIndex:
+
+    def __init__(self, index_path: Path):
+        """
+        Initiate a pictures index, use load() to read an existing index file.
+
+        :param index_path: Location of the index file, pictures paths are relative to its folder.
+        :type index_path: Path
+        """
+        self.logger = logging.getLogger(self.__module__ + "." + self.__class__.__name__)
+        self.index_path = Path(index_path)
+        self._entries = {}  # type: Dict[str, Tuple[int, int, Dict[str, str]]]  # relative path -> (size, timestamp, tags)
+
+    def load(self) -> 'PicturesIndex':
+        """
+        Read the index file, if it exists.
+
+        :return: The index itself.
+        :rtype: PicturesIndex
+        """
+        if self.index_path.exists():
+            with open(self.index_path, 'r') as index_file:
+                rows = csv.reader(index_file, delimiter=PICTURES_INDEX_CSV_DELIMITER)
+                next(rows, None)  # header
+                for row in rows:
+                    if len(row) == len(PICTURES_INDEX_CSV_HEADER):
+                        self._entries[row[0]] = (int(row[1]), int(row[2]), json.loads(row[3]) if row[3] else None)
+                    elif len(row) == PICTURES_INDEX_CSV_V1_LEN:
+                        self._entries[row[0]] = (int(row[1]), int(row[2]), None)
+
+            self.logger.debug("Loaded %i pictures from index %s", len(self._entries), self.index_path)
+
+        return self
+
+    def save(self):
+        """
+        Write the index file.
+        """
+        self.index_path.parent.makedirs_p()
+        with open(self.index_path, 'w') as index_file:
+            writer = csv.writer(index_file, delimiter=PICTURES_INDEX_CSV_DELIMITER)
+            writer.writerow(PICTURES_INDEX_CSV_HEADER)
+            for rel_path in sorted(self._entries.keys()):
+                size, ts, tags = self._entries[rel_path]
+                writer.writerow([rel_path, size, ts, "" if tags is None else json.dumps(tags, sort_keys=True)])
+
+        self.logger.debug("Saved %i pictures in index %s", len(self._entries), self.index_path)
+
+    def add(self, rel_path: str, size: int, ts: int, tags: Dict[str, Optional[str]]=None):
+        """
+        Add or replace a picture in the index.
+
+        :param rel_path: Picture path relative to the index folder, eg "DCIM/100GOPRO/GOPR0001.JPG".
+        :param size: Picture file size.
+        :param ts: Picture timestamp (DateTimeOriginal).
+        :param tags: Picture exif tags, optional.
+        """
+        self._entries[str(rel_path)] = (size, ts, tags)
+
+    def get_timestamp(self, rel_path: str, size: int) -> int:
+        """
+        Picture timestamp from the index.
+
+        :param rel_path: Picture path relative to the index folder.
+        :param size: Current picture size, entry is ignored if the size doesn't match.
+        :return: The picture timestamp or None if the picture isn't indexed.
+        :rtype: int
+        """
+        entry = self._entries.get(str(rel_path))
+        if entry is None or entry[0] != size:
+            return None
+        return entry[1]
+
+    def get_exif_tags(self, rel_path: str, size: int, names: List[str]) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Picture exif tags from the index.
+
+        :param rel_path: Picture path relative to the index folder.
+        :param size: Current picture size, entry is ignored if the size doesn't match.
+        :param names: Wanted tags names.
+        :return: The picture tags or None if the picture isn't indexed or some wanted tags weren't extracted.
+        :rtype: Dict[str, str]
+        """
+        entry = self._entries.get(str(rel_path))
+        if entry is None or entry[0] != size or entry[2] is None or not all(n in entry[2] for n in names):
+            return None
+        return entry[2]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -16,21 +16,306 @@
 # Email: team@openpathview.fr
 # Description: Utils functions for pictures managment.
 
+import struct
 import datetime
+import fractions
 import exifread
+from exifread.tags import DEFAULT_STOP_TAG
+from typing import BinaryIO, Dict, Optional, Tuple
 
-def read_exif_time(pic_path: str) -> int:
+EXIF_HEADER_READ_SIZE = 8192  # number of bytes read by the fast exif reader, DateTimeOriginal is near the file start
+
+JPEG_SOI = b'\xff\xd8'
+JPEG_MARKER_APP1 = 0xE1
+JPEG_MARKER_SOS = 0xDA
+EXIF_APP1_HEADER = b'Exif\x00\x00'
+TIFF_TAG_EXIF_IFD_POINTER = 0x8769
+TIFF_TAG_DATETIME_ORIGINAL = 0x9003
+TIFF_TYPE_ASCII = 2
+TIFF_TYPE_LONG = 4
+EXIF_DATETIME_LEN = 19  # "YYYY:MM:DD HH:MM:SS"
+EXIF_IFD0_NAME = "Image"  # IFD names, same as exifread tags prefixes
+EXIF_IFD_EXIF_NAME = "EXIF"
+
+# TIFF field type -> struct format of one value
+TIFF_TYPES_FORMATS = {1: 'B', 2: 's', 3: 'H', 4: 'I', 5: 'II', 6: 'b', 7: 'B', 8: 'h', 9: 'i', 10: 'ii', 11: 'f', 12: 'd'}
+TIFF_RATIONAL_TYPES = [5, 10]
+
+
+def _parse_exif_datetime(raw: bytes) -> int:
+    """
+    Convert an exif datetime ("YYYY:MM:DD HH:MM:SS") into a timestamp, same convention as _read_exif_exifread.
+
+    :param raw: Exif datetime bytes.
+    :return: Timestamp.
+    """
+    return int(datetime.datetime(
+        int(raw[0:4]), int(raw[5:7]), int(raw[8:10]), int(raw[11:13]), int(raw[14:16]), int(raw[17:19])).timestamp())
+
+
+def _find_tiff_header(header: bytes) -> Optional[Tuple[int, str, int]]:
+    """
+    Find the TIFF header of the exif APP1 segment.
+
+    :param header: Bytes read from the file start.
+    :return: (TIFF header position, struct byte order, IFD0 offset), None if not found.
+    """
+    if header[0:2] != JPEG_SOI:
+        return None
+
+    # searching the exif APP1 segment
+    pos = 2
+    tiff_start = None
+    while pos + 4 <= len(header) and header[pos] == 0xFF:
+        marker = header[pos + 1]
+        if marker == JPEG_MARKER_SOS:
+            return None
+        seg_len, = struct.unpack_from('>H', header, pos + 2)
+        if marker == JPEG_MARKER_APP1 and header[pos + 4:pos + 10] == EXIF_APP1_HEADER:
+            tiff_start = pos + 10
+            break
+        pos += 2 + seg_len
+
+    if tiff_start is None:
+        return None
+
+    byte_order = header[tiff_start:tiff_start + 2]
+    if byte_order == b'II':
+        endian = '<'
+    elif byte_order == b'MM':
+        endian = '>'
+    else:
+        return None
+
+    magic, ifd0_offset = struct.unpack_from(endian + 'HI', header, tiff_start + 2)
+    if magic != 42:
+        return None
+
+    return tiff_start, endian, ifd0_offset
+
+
+def _read_ifd_entries(header: bytes, tiff_start: int, ifd_offset: int, endian: str) -> Optional[Dict[int, tuple]]:
+    """
+    Read all the entries of a TIFF IFD.
+
+    :param header: Bytes read from the file.
+    :param tiff_start: Position of the TIFF header in header, IFD offsets are relative to it.
+    :param ifd_offset: IFD offset.
+    :param endian: struct byte order ('<' or '>').
+    :return: tag -> (type, count, value_or_offset), None if the IFD is outside header.
+    """
+    pos = tiff_start + ifd_offset
+    if pos + 2 > len(header):
+        return None
+
+    nb_entries, = struct.unpack_from(endian + 'H', header, pos)
+    if pos + 2 + 12 * nb_entries > len(header):
+        return None
+
+    entries = {}
+    for i in range(0, nb_entries):
+        entry_tag, entry_type, count, value = struct.unpack_from(endian + 'HHII', header, pos + 2 + 12 * i)
+        entries[entry_tag] = (entry_type, count, value)
+
+    return entries
+
+
+def _format_exif_values(values: list) -> str:
+    """
+    Format exif tag values the same way whatever the reader : rationals are reduced ("1/240", "72"),
+    multiple values are separated by spaces.
+
+    :param values: Tag values, a string or a list of numbers/rationals.
+    :return: Formatted values.
+    """
+    if isinstance(values, (str, bytes)):
+        values = values.decode('ascii', 'replace') if isinstance(values, bytes) else values
+        return values.split('\x00')[0].strip()
+
+    formatted = []
+    for v in values:
+        if isinstance(v, tuple):  # (numerator, denominator)
+            num, den = v
+        elif hasattr(v, 'den'):  # exifread < 3 Ratio
+            num, den = v.num, v.den
+        else:
+            num, den = v, 1
+        if den != 0 and isinstance(num, int):
+            formatted.append(str(fractions.Fraction(num, den)))
+        else:
+            formatted.append(str(num) if den == 1 else "{}/{}".format(num, den))
+
+    return " ".join(formatted)
+
+
+def _decode_ifd_entry(header: bytes, tiff_start: int, entry: tuple, endian: str) -> Optional[str]:
+    """
+    Decode a TIFF IFD entry value.
+
+    :param header: Bytes read from the file.
+    :param tiff_start: Position of the TIFF header in header.
+    :param entry: (type, count, value_or_offset) of the entry.
+    :param endian: struct byte order ('<' or '>').
+    :return: Formatted value (see _format_exif_values), None if the type is unknown or the value outside header.
+    """
+    entry_type, count, value = entry
+    fmt = TIFF_TYPES_FORMATS.get(entry_type)
+    if fmt is None:
+        return None
+
+    size = struct.calcsize(endian + fmt) * count
+    if size <= 4:  # value is stored in the entry itself
+        raw = struct.pack(endian + 'I', value)[:size]
+    else:
+        raw = header[tiff_start + value:tiff_start + value + size]
+        if len(raw) != size:
+            return None
+
+    if fmt == 's':
+        return _format_exif_values(raw)
+
+    values = struct.unpack(endian + fmt * count, raw)
+    if entry_type in TIFF_RATIONAL_TYPES:
+        values = list(zip(values[0::2], values[1::2]))
+
+    return _format_exif_values(list(values))
+
+
+def read_exif_fast(
+        pic_path: str,
+        tags: Dict[str, Tuple[str, int]],
+        read_size: int=EXIF_HEADER_READ_SIZE) -> Optional[Tuple[int, Dict[str, Optional[str]]]]:
     """
-    Read DateTimeOriginal tag from exif data.
+    Read DateTimeOriginal and other tags in one pass over the file header, walking the JPEG APP1 segment, IFD0 then the Exif IFD.
+
+    :param pic_path: Pictures location.
+    :param tags: Wanted tags, name -> (IFD name, tag id), IFD names are EXIF_IFD0_NAME or EXIF_IFD_EXIF_NAME.
+    :param read_size: Number of bytes read at the beginning of the file.
+    :return: Pictures taken time and tags values by name (None for tags not in the picture).
+             None if it can't be decided (not a JPEG, unexpected layout, IFD or value outside the read header ...).
+    """
+    with open(pic_path, "rb") as f:
+        header = f.read(read_size)
+
+    return parse_exif_header(header, tags=tags)
+
+
+def parse_exif_header(header: bytes, tags: Dict[str, Tuple[str, int]]) -> Optional[Tuple[int, Dict[str, Optional[str]]]]:
+    """
+    Read DateTimeOriginal and other tags from the first bytes of a picture, see read_exif_fast.
+
+    :param header: First bytes of the picture (EXIF_HEADER_READ_SIZE).
+    :param tags: Wanted tags, name -> (IFD name, tag id).
+    :return: Pictures taken time and tags values by name, None if it can't be decided from the header.
+    """
+    try:
+        tiff = _find_tiff_header(header)
+        if tiff is None:
+            return None
+        tiff_start, endian, ifd0_offset = tiff
+
+        ifds = {EXIF_IFD0_NAME: _read_ifd_entries(header, tiff_start, ifd0_offset, endian)}
+        if ifds[EXIF_IFD0_NAME] is None:
+            return None
+
+        exif_ptr = ifds[EXIF_IFD0_NAME].get(TIFF_TAG_EXIF_IFD_POINTER)
+        if exif_ptr is None or exif_ptr[0] != TIFF_TYPE_LONG:
+            return None
+        ifds[EXIF_IFD_EXIF_NAME] = _read_ifd_entries(header, tiff_start, exif_ptr[2], endian)
+        if ifds[EXIF_IFD_EXIF_NAME] is None:
+            return None
+
+        dt_entry = ifds[EXIF_IFD_EXIF_NAME].get(TIFF_TAG_DATETIME_ORIGINAL)
+        if dt_entry is None or dt_entry[0] != TIFF_TYPE_ASCII or dt_entry[1] < EXIF_DATETIME_LEN:
+            return None
+        raw = header[tiff_start + dt_entry[2]:tiff_start + dt_entry[2] + EXIF_DATETIME_LEN]
+        if len(raw) != EXIF_DATETIME_LEN:
+            return None
+
+        values = {}
+        for name, (ifd_name, tag) in tags.items():
+            entry = ifds.get(ifd_name, {}).get(tag)
+            if entry is None:
+                values[name] = None
+                continue
+            values[name] = _decode_ifd_entry(header, tiff_start, entry, endian)
+            if values[name] is None:
+                return None
+
+        return _parse_exif_datetime(raw), values
+    except (struct.error, ValueError):
+        return None
+
+
+def read_exif(pic_path: str, tags: Dict[str, Tuple[str, int]]) -> Tuple[int, Dict[str, Optional[str]]]:
+    """
+    Read DateTimeOriginal and other tags, opening the picture once.
+    Use the fast reader and fallback to exifread when it can't decide.
 
     :param pic_path: Pictures location.
     :type pic_path: str
-    :return: Pictures taken time, timestamp.
-    :rtype: int (timestamp)
+    :param tags: Wanted tags, name -> (IFD name, tag id), see read_exif_fast.
+    :type tags: Dict[str, Tuple[str, int]]
+    :return: Pictures taken time (timestamp) and tags values by name (None for tags not in the picture).
+    :rtype: Tuple[int, Dict[str, str]]
     """
+    result = read_exif_fast(pic_path, tags=tags)
+    if result is not None:
+        return result
+
     with open(pic_path, "rb") as f:
-        tags = exifread.process_file(f, stop_tag='EXIF DateTimeOriginal')
+        return _read_exif_exifread(f, tags=tags)
 
-    timestamp = int(datetime.datetime.strptime(tags['EXIF DateTimeOriginal'].values, "%Y:%m:%d %H:%M:%S").timestamp())
 
-    return timestamp
+def read_exif_file(f: BinaryIO, tags: Dict[str, Tuple[str, int]]) -> Tuple[int, Dict[str, Optional[str]]]:
+    """
+    Same as read_exif, from an opened picture (an archive member for instance).
+
+    :param f: Opened picture, positioned at its start, seekable.
+    :type f: BinaryIO
+    :param tags: Wanted tags, name -> (IFD name, tag id), see read_exif_fast.
+    :type tags: Dict[str, Tuple[str, int]]
+    :return: Pictures taken time (timestamp) and tags values by name (None for tags not in the picture).
+    :rtype: Tuple[int, Dict[str, str]]
+    """
+    result = parse_exif_header(f.read(EXIF_HEADER_READ_SIZE), tags=tags)
+    if result is not None:
+        return result
+
+    f.seek(0)
+    return _read_exif_exifread(f, tags=tags)
+
+
+def _read_exif_exifread(f: BinaryIO, tags: Dict[str, Tuple[str, int]]) -> Tuple[int, Dict[str, Optional[str]]]:
+    """
+    Read DateTimeOriginal and other tags with exifread (all layouts, slower).
+
+    :param f: Opened picture, positioned at its start.
+    :param tags: Wanted tags, name -> (IFD name, tag id).
+    :return: Pictures taken time (timestamp) and tags values by name (None for tags not in the picture).
+    """
+    # exifread matches stop_tag against the bare tag name, without its IFD prefix
+    stop_tag = 'DateTimeOriginal' if len(tags) == 0 else DEFAULT_STOP_TAG
+    exif_tags = exifread.process_file(f, stop_tag=stop_tag, details=False)
+
+    timestamp = int(datetime.datetime.strptime(exif_tags['EXIF DateTimeOriginal'].values, "%Y:%m:%d %H:%M:%S").timestamp())
+
+    by_id = {(key.split(" ", 1)[0], getattr(tag, "tag", None)): tag for key, tag in exif_tags.items()}
+    values = {}
+    for name, ifd_tag in tags.items():
+        tag = by_id.get(ifd_tag)
+        values[name] = None if tag is None else _format_exif_values(tag.values)
+
+    return timestamp, values
+
+
+def read_exif_time(pic_path: str) -> int:
+    """
+    Read DateTimeOriginal tag from exif data, see read_exif.
+
+    :param pic_path: Pictures location.
+    :type pic_path: str
+    :return: Pictures taken time, timestamp.
+    :rtype: int (timestamp)
+    """
+    return read_exif(pic_path, tags={})[0]
@@ -0,0 +1,211 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Order pictures header reads by disk locality and give read-ahead hints to the kernel.
+#              Reduce seeks on rotational storage (spinning disks, USB HDD).
+
+import os
+import mmap
+import errno
+import fcntl
+import ctypes
+import ctypes.util
+import random
+import struct
+import logging
+from typing import List, Optional
+
+READ_ORDER_INDEX = "index"    # keep the given order (camera index order)
+READ_ORDER_INODE = "inode"    # order by device and inode number
+READ_ORDER_EXTENT = "extent"  # order by physical position of the first extent (FIEMAP), inode order when not available
+READ_ORDERS = [READ_ORDER_INDEX, READ_ORDER_INODE, READ_ORDER_EXTENT]
+
+READ_AHEAD_SIZE = 8192  # header size hinted to the kernel, see pictures_utils.EXIF_HEADER_READ_SIZE
+CACHED_NB_SAMPLES = 20  # number of files checked to estimate if pictures are in the page cache
+
+FS_IOC_FIEMAP = 0xC020660B  # linux/fs.h _IOWR('f', 11, struct fiemap)
+FIEMAP_HEADER_FORMAT = "=QQIIII"  # fm_start, fm_length, fm_flags, fm_mapped_extents, fm_extent_count, fm_reserved
+FIEMAP_EXTENT_FORMAT = "=QQQQQIIII"  # fe_logical, fe_physical, fe_length, 2 reserved, fe_flags, 3 reserved
+
+logger = logging.getLogger(__name__)
+
+_libc = None  # C library with mmap/mincore argument types, see _get_libc
+
+
+def physical_offset(path: str, length: int=READ_AHEAD_SIZE) -> Optional[int]:
+    """
+    Physical position on the device of the first extent of a file, using the FIEMAP ioctl (linux).
+
+    :param path: File location.
+    :param length: Length of the mapped range from the file start.
+    :return: Physical offset in bytes, None when FIEMAP isn't available (file system, OS) or the file has no extent.
+    """
+    request = struct.pack(FIEMAP_HEADER_FORMAT, 0, length, 0, 0, 1, 0) + b'\x00' * struct.calcsize(FIEMAP_EXTENT_FORMAT)
+    try:
+        with open(path, "rb") as f:
+            result = fcntl.ioctl(f.fileno(), FS_IOC_FIEMAP, request)
+    except (OSError, IOError):
+        return None
+
+    mapped_extents = struct.unpack_from(FIEMAP_HEADER_FORMAT, result)[3]
+    if mapped_extents == 0:
+        return None
+
+    return struct.unpack_from(FIEMAP_EXTENT_FORMAT, result, struct.calcsize(FIEMAP_HEADER_FORMAT))[1]
+
+
+def order_by_locality(paths: List[str], read_order: str=READ_ORDER_INODE) -> List[int]:
+    """
+    Order files to read them with as few seeks as possible.
+
+    :param paths: Files locations.
+    :param read_order: One of READ_ORDERS.
+    :return: Positions of the paths in reading order.
+    :rtype: List[int]
+    """
+    if read_order not in READ_ORDERS:
+        raise ValueError("Unknown read order {}, should be one of {}".format(read_order, READ_ORDERS))
+
+    if read_order == READ_ORDER_INDEX:
+        return list(range(0, len(paths)))
+
+    if read_order == READ_ORDER_EXTENT:
+        offsets = [physical_offset(p) for p in paths]
+        if all(o is not None for o in offsets):
+            return sorted(range(0, len(paths)), key=lambda i: offsets[i])
+        logger.debug("FIEMAP isn't available for all files, using inode order")
+
+    stats = [os.stat(p) for p in paths]
+    return sorted(range(0, len(paths)), key=lambda i: (stats[i].st_dev, stats[i].st_ino))
+
+
+def advise_will_need(paths: List[str], length: int=READ_AHEAD_SIZE):
+    """
+    Tell the kernel the beginning of files will be read soon (posix_fadvise WILLNEED), so that reads can be queued
+    and reordered by the IO scheduler. Does nothing when posix_fadvise isn't available.
+
+    :param paths: Files locations.
+    :param length: Number of bytes that will be read from the file start.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+
+    for p in paths:
+        try:
+            fd = os.open(p, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, length, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+
+def _get_libc() -> Optional[ctypes.CDLL]:
+    """
+    :return: The C library, None when mmap/mincore aren't available.
+    """
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            libc.mmap.restype = ctypes.c_void_p
+            libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+            libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+            libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p]
+        except (OSError, AttributeError):
+            return None
+        _libc = libc
+    return _libc
+
+
+def _is_cached_mincore(path: str, length: int=READ_AHEAD_SIZE) -> Optional[bool]:
+    """
+    Tells if the beginning of a file is in the page cache by mapping it and asking which pages are resident (mincore),
+    nothing is read. Linux >= 5.2 only reports page cache pages of files the process owns or can write.
+
+    :param path: File location.
+    :param length: Number of bytes from the file start.
+    :return: True if cached, False if reading would hit the disk, None when it can't be known.
+    """
+    libc = _get_libc()
+    if libc is None:
+        return None
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        size = min(length, os.fstat(fd).st_size)
+        if size == 0:
+            return True  # nothing to read
+        addr = libc.mmap(None, size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+        if addr is None or addr == ctypes.c_void_p(-1).value:  # MAP_FAILED
+            return None
+        try:
+            pages = (ctypes.c_ubyte * ((size + mmap.PAGESIZE - 1) // mmap.PAGESIZE))()
+            if libc.mincore(addr, size, pages) != 0:
+                return None
+            return all(page & 1 for page in pages)
+        finally:
+            libc.munmap(addr, size)
+    finally:
+        os.close(fd)
+
+
+def is_cached(path: str, length: int=READ_AHEAD_SIZE) -> Optional[bool]:
+    """
+    Tells if the beginning of a file is in the page cache, with a non blocking read (preadv RWF_NOWAIT, python >= 3.7
+    and linux >= 4.14), with mincore otherwise.
+
+    :param path: File location.
+    :param length: Number of bytes from the file start.
+    :return: True if cached, False if reading would hit the disk, None when it can't be known.
+    """
+    if not hasattr(os, "RWF_NOWAIT"):
+        return _is_cached_mincore(path, length=length)
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        os.preadv(fd, [bytearray(length)], 0, os.RWF_NOWAIT)
+        return True
+    except OSError as err:
+        return False if err.errno == errno.EAGAIN else None
+    finally:
+        os.close(fd)
+
+
+def cached_ratio(paths: List[str], nb_samples: int=CACHED_NB_SAMPLES, length: int=READ_AHEAD_SIZE) -> Optional[float]:
+    """
+    Estimate the part of the files whose beginning is in the page cache, from a random sample.
+
+    :param paths: Files locations.
+    :param nb_samples: Number of checked files.
+    :param length: Number of bytes from the files start.
+    :return: Rate of cached files in [0, 1], None when it can't be known.
+    """
+    if len(paths) == 0:
+        return None
+
+    states = [is_cached(p, length=length) for p in random.sample(list(paths), min(nb_samples, len(paths)))]
+    if any(s is None for s in states):
+        return None
+
+    return sum(states) / len(states)
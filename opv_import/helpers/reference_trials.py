@@ -0,0 +1,94 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Memo of the camera sets reference candidates rejected during a partition search. Sets generation only
+#              depends on the cameras offsets of the reference (see LotMaker.cam_set_generator) : a candidate with the
+#              offsets of a rejected one, starting on its generation path, generates the end of its sets and is
+#              rejected the same way.
+
+from typing import Dict, List, Sequence, Set, Tuple
+
+
+class ReferenceTrials:
+
+    def __init__(self):
+        """
+        Rejected reference candidates of a partition search.
+        """
+        self._rejected = {}  # type: Dict[Tuple[int, ...], Set[Tuple[int, ...]]]  # offsets -> rejected start indexes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, ref_ts: Sequence[int]) -> Tuple[int, ...]:
+        """
+        :param ref_ts: Reference candidate timestamps (position 0 for APN0).
+        :type ref_ts: Sequence[int]
+        :return: Offsets of the cameras from camera 0.
+        :rtype: Tuple[int, ...]
+        """
+        return tuple(ts - ref_ts[0] for ts in ref_ts[1:])
+
+    def is_rejected(self, ref_ts: Sequence[int], indexes: Sequence[int]) -> bool:
+        """
+        Check if a candidate has the offsets of a rejected one and starts on its generation path, early enough to
+        reach the same rejection.
+
+        :param ref_ts: Candidate timestamps.
+        :type ref_ts: Sequence[int]
+        :param indexes: Candidate indexes.
+        :type indexes: Sequence[int]
+        :return: True if the candidate would be rejected, False if it needs to be tried.
+        :rtype: bool
+        """
+        if tuple(indexes) in self._rejected.get(self.key(ref_ts), ()):
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        return False
+
+    def add_rejection(self, ref_ts: Sequence[int], path_indexes: List[List[int]], nb_last_sets: int):
+        """
+        Record a rejected candidate.
+
+        :param ref_ts: Candidate timestamps.
+        :type ref_ts: Sequence[int]
+        :param path_indexes: Generator next indexes of the trial, from the candidate indexes and after each set.
+        :type path_indexes: List[List[int]]
+        :param nb_last_sets: Number of last sets a candidate must generate to be rejected too : the incomplete sets
+                             that stopped the trial, 0 if the generation ended.
+        :type nb_last_sets: int
+        """
+        self._rejected.setdefault(self.key(ref_ts), set()).update(
+            tuple(indexes) for indexes in path_indexes[0:len(path_indexes) - nb_last_sets])
+
+    def clear(self):
+        """
+        Forget the rejected candidates (new partition start), statistics are kept.
+        """
+        self._rejected = {}
+
+    def stats(self) -> Dict[str, float]:
+        """
+        :return: Dict with hits, misses, nb_entries (rejected start indexes) and hit_rate.
+        :rtype: Dict[str, float]
+        """
+        nb_lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'nb_entries': sum(len(indexes) for indexes in self._rejected.values()),
+            'hit_rate': self.hits / nb_lookups if nb_lookups > 0 else 0.0}
@@ -40,6 +40,7 @@ class RsyncWrapper():
         self._destination = destination_path
         self._progression_listeners = {}  # dict of listeners listener name/id => lambda to execute
         self._terminate_listeners = {}  # dict of listeners listener name/id => lambda to execute
+        self._file_transferred_listeners = {}  # dict of listeners listener name/id => lambda to execute
 
         self._current_proc = None  # popen returned object
         self._global_progress = 0  # Last global progress
@@ -94,6 +95,32 @@ class RsyncWrapper():
         for listener in self._terminate_listeners.values():
             listener()
 
+    def on_file_transferred(self, event_listener, even_listener_name: str = None) -> str:
+        """
+        Register a file transferred event. Lambda "event_listener" will be executed each time a file is completely
+        transfered, with the file path relative to the destination (eg "DCIM/100GOPRO/GOPR0001.JPG").
+
+        Your lambda should not return any value, you can set a name to your lambda if you want to override it
+        otherwise an id will be attributed. The name/id of the listener will be returned, you can't have 2 listeners
+        with the same id.
+        :param event_listener: Your lamabda listener will be called after each transfered file (Callable[Path])
+        :param even_listener_name: A listener unique name, can be used to override your listener. Optional.
+        :return: The listener unique name.
+        """
+        if even_listener_name is None:
+            even_listener_name = "file_transferred_{id}".format(id=len(self._file_transferred_listeners))
+
+        self._file_transferred_listeners[even_listener_name] = event_listener
+        return even_listener_name
+
+    def __fire_file_transferred_event(self, rel_path: Path):
+        """
+        Fire file transferred event.
+        :param rel_path: Transfered file path, relative to the destination.
+        """
+        for listener in self._file_transferred_listeners.values():
+            listener(rel_path)
+
     def _read_current_popen_stdout(self) -> Iterator[str]:
         """
         Consume the ouput of the rsync command and give lines.
@@ -131,9 +158,16 @@ class RsyncWrapper():
                                               stdout=subprocess.PIPE)
 
         # Consume the output
+        current_file = None  # with -v rsync prints the file name before its progress lines
         for line in self._read_current_popen_stdout():
             parts = line.split()
+            if len(line) > 0 and not line[0].isspace() and not line.endswith('/'):
+                current_file = line
             if len(parts) == 6 and parts[1].endswith('%') and parts[-1].startswith('to-chk='):
+                if parts[1] == '100%' and current_file is not None:
+                    self.__fire_file_transferred_event(rel_path=Path(current_file))
+                    current_file = None
+
                 # file progress -P
                 # file_progress = parts[1]
                 # file_speed = parts[2]
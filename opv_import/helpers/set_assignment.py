@@ -0,0 +1,190 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Cameras pictures sets assignment on timestamps arrays, same sets as LotMaker.cam_set_generator.
+#              Sets are made greedily : the oldest leveled timestamp opens a set, each camera next picture joins it if
+#              its leveled timestamp is in the margin. While a margin window holds at most one picture per camera,
+#              sets are just the windows of the merged (sorted) leveled timestamps, found with array operations.
+#              Windows holding two pictures of a camera are assigned one set at a time.
+
+import numpy as np
+from typing import List, NamedTuple, Optional, Sequence
+
+NO_PICTURE = -1  # index matrix value of a camera missing in a set
+WINDOWS_CHUNK_SIZE = 4096  # max number of merged pictures whose windows are found at once
+WINDOWS_CHUNK_MIN_SIZE = 32  # chunk size after sets assigned one at a time, doubled while windows are sets
+
+SetAssignment = NamedTuple('SetAssignment', [
+    ('indexes', np.ndarray),  # n_sets x nb_cams pictures indexes, NO_PICTURE for missing cameras
+    ('next_indexes', np.ndarray),  # n_sets x nb_cams next pictures indexes after each set
+    ('break_indexes', Optional[List[int]]),  # next indexes when a camera goes back in time, None if none does
+    ('break_cams', List[int])])  # cameras going back in time at break_indexes
+
+
+def _window_starts(next_starts: np.ndarray) -> np.ndarray:
+    """
+    Windows of sorted values : a window starts at the first value not in the previous window (value + margin).
+    Following the starts is sequential, it is done by pointer doubling (log(n) array passes).
+
+    :param next_starts: For each value, position of the first value not in its window (at most len(next_starts)).
+    :return: Positions of the windows starts.
+    """
+    nb = len(next_starts)
+    jump = np.append(next_starts, nb)  # next start, nb is the end
+    path = np.zeros(1, dtype=np.int64)
+    while path[-1] != nb:  # path holds the len(path) first starts, jump goes len(path) starts further
+        path = np.concatenate((path, jump[path]))
+        jump = jump[jump]
+
+    return path[0:np.searchsorted(path, nb)]
+
+
+def _first_duplicate_window(window_ids: np.ndarray, cams: np.ndarray, nb_cams: int) -> Optional[int]:
+    """
+    :return: The first window holding two pictures of a camera, None if there is none.
+    """
+    keys = np.sort(window_ids * nb_cams + cams)
+    duplicates = keys[1:][keys[1:] == keys[:-1]]
+    return int(duplicates[0] // nb_cams) if len(duplicates) > 0 else None
+
+
+def _is_lexico_less_equal(rows: np.ndarray, bound: np.ndarray) -> np.ndarray:
+    """
+    :return: For each row, True if row <= bound in lexicographic order (Python lists comparison).
+    """
+    diff = rows - bound
+    differs = diff != 0
+    first = np.argmax(differs, axis=1)
+    return ~differs.any(axis=1) | (diff[np.arange(len(rows)), first] < 0)
+
+
+def assign_sets(timestamps: Sequence[np.ndarray], ref_ts: Sequence[int], start_indexes: Sequence[int],
+                margin: int, end_indexes: Optional[Sequence[int]]=None) -> SetAssignment:
+    """
+    Assign cameras pictures to sets, like LotMaker.cam_set_generator without sparse timestamps : same sets, same next
+    indexes, generation ends when the next indexes are above the last indexes (lexicographic order, as the generator
+    does) or when a camera goes back in time.
+
+    :param timestamps: Pictures timestamps of each camera.
+    :type timestamps: Sequence[np.ndarray]
+    :param ref_ts: Reference set timestamp of each camera, timestamps are leveled with it.
+    :type ref_ts: Sequence[int]
+    :param start_indexes: First picture of each camera.
+    :type start_indexes: Sequence[int]
+    :param margin: Max accepted difference between leveled timestamps of a set (TIME_MARGING), > 0.
+    :type margin: int
+    :param end_indexes: First picture going back in time of each camera after its start, its number of pictures if
+                        none does (see monotonic_segments.segment_ends). Found from the timestamps if None.
+    :type end_indexes: Sequence[int]
+    :return: The sets assignment.
+    :rtype: SetAssignment
+    """
+    nb_cams = len(timestamps)
+    nb_pics = np.array([len(ts) for ts in timestamps], dtype=np.int64)
+    last_indexes = np.maximum(nb_pics - 1, 0)
+    start = np.array(start_indexes, dtype=np.int64)
+    empty = SetAssignment(indexes=np.zeros((0, nb_cams), dtype=np.int64), next_indexes=np.zeros((0, nb_cams), dtype=np.int64),
+                          break_indexes=None, break_cams=[])
+    if margin <= 0:
+        raise ValueError("Margin should be positive, got {}".format(margin))
+    if nb_cams == 0 or not _is_lexico_less_equal(start[np.newaxis, :], last_indexes)[0]:
+        return empty
+
+    # back in time : the first picture older than the previous one, cameras end there for the assignment
+    ends = nb_pics.copy() if end_indexes is None else np.array(end_indexes, dtype=np.int64)
+    leveled = []
+    for c in range(0, nb_cams):
+        ts = np.asarray(timestamps[c], dtype=np.int64)
+        if end_indexes is None:
+            backs = np.flatnonzero(np.diff(ts[start[c]:]) < 0)
+            if len(backs) > 0:
+                ends[c] = start[c] + backs[0] + 1
+        leveled.append(ts - ref_ts[c])
+
+    # merged leveled timestamps, cameras pictures in [start, end[
+    cams = np.concatenate([np.full(max(ends[c] - start[c], 0), c, dtype=np.int64) for c in range(0, nb_cams)])
+    pic_indexes = np.concatenate([np.arange(start[c], ends[c], dtype=np.int64) for c in range(0, nb_cams)])
+    values = np.concatenate([leveled[c][start[c]:ends[c]] for c in range(0, nb_cams)])
+    order = np.lexsort((cams, values))
+    cams, pic_indexes, values = cams[order], pic_indexes[order], values[order]
+    counts = np.zeros((len(values) + 1, nb_cams), dtype=np.int64)  # pictures of each camera in the merged prefixes
+    counts[1:][np.arange(len(values)), cams] = 1
+    np.cumsum(counts, axis=0, out=counts)
+
+    next_starts = np.searchsorted(values, values + margin, side="left")
+
+    rows = []  # type: List[np.ndarray]
+    heads = start.copy()
+    leveled_lists = [lvl.tolist() for lvl in leveled]
+    pos = 0
+    chunk_size = WINDOWS_CHUNK_SIZE
+    while pos < len(values):
+        chunk_end = min(pos + chunk_size, len(values))
+        starts = _window_starts(np.minimum(next_starts[pos:chunk_end], chunk_end) - pos)
+        is_start = np.zeros(chunk_end - pos, dtype=np.int64)
+        is_start[starts] = 1
+        window_ids = np.cumsum(is_start) - 1
+        nb_windows = len(starts) if chunk_end == len(values) else len(starts) - 1  # last one may go on in next chunk
+        duplicate = _first_duplicate_window(window_ids[window_ids < nb_windows], cams[pos:chunk_end][window_ids < nb_windows], nb_cams)
+        nb_windows = nb_windows if duplicate is None else duplicate
+
+        if nb_windows > 0:
+            nb_assigned = int(starts[nb_windows]) if nb_windows < len(starts) else chunk_end - pos
+            window_rows = np.full((nb_windows, nb_cams), NO_PICTURE, dtype=np.int64)
+            window_rows[window_ids[0:nb_assigned], cams[pos:pos + nb_assigned]] = pic_indexes[pos:pos + nb_assigned]
+            rows.append(window_rows)
+            pos += nb_assigned
+            heads = start + counts[pos]
+            chunk_size = chunk_size if duplicate is not None else min(2 * chunk_size, WINDOWS_CHUNK_SIZE)
+            continue
+
+        # a camera has two pictures in the window : one greedy set at a time, until sets are windows again
+        while True:
+            present = [c for c in range(0, nb_cams) if heads[c] < ends[c]]
+            oldest = min(leveled_lists[c][heads[c]] for c in present)
+            row = np.full((1, nb_cams), NO_PICTURE, dtype=np.int64)
+            for c in present:
+                if leveled_lists[c][heads[c]] - oldest < margin:
+                    row[0, c] = heads[c]
+                    heads[c] += 1
+            rows.append(row)
+            pos = int((heads - start).sum())
+            if np.array_equal(counts[pos], heads - start):  # assigned pictures are a merged prefix
+                break
+        chunk_size = WINDOWS_CHUNK_MIN_SIZE
+
+    if len(rows) == 0:
+        return empty
+
+    indexes = np.concatenate(rows)
+    next_indexes = start + np.cumsum(indexes != NO_PICTURE, axis=0)
+
+    # generation ends after the first set whose next indexes are above the last ones (checked first), or when the
+    # next picture of a camera is older than its previous one
+    above = np.flatnonzero(~_is_lexico_less_equal(next_indexes, last_indexes))
+    broken = ends < nb_pics
+    reached = np.flatnonzero((next_indexes[:, broken] >= ends[broken]).any(axis=1))
+
+    nb_sets, break_indexes, break_cams = len(indexes), None, []
+    if len(reached) > 0 and (len(above) == 0 or reached[0] < above[0]):
+        nb_sets = int(reached[0]) + 1
+        break_indexes = next_indexes[nb_sets - 1].tolist()
+        break_cams = [c for c in range(0, nb_cams) if broken[c] and break_indexes[c] == ends[c]]
+    elif len(above) > 0:
+        nb_sets = int(above[0]) + 1
+
+    return SetAssignment(indexes=indexes[0:nb_sets], next_indexes=next_indexes[0:nb_sets],
+                         break_indexes=break_indexes, break_cams=break_cams)
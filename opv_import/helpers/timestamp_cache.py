@@ -0,0 +1,196 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Persistent pictures timestamps cache (SQLite), entries are invalidated when the picture file changes.
+
+import os
+import json
+import logging
+import sqlite3
+import threading
+from path import Path
+from typing import Dict, List, Optional, Tuple
+
+from opv_import.helpers import pictures_utils
+from opv_import.config import EXIF_EXTRA_TAGS
+
+TS_CACHE_FLUSH_SIZE = 1000  # number of new entries kept in memory before being written in the database
+
+
+class TimestampCache:
+
+    def __init__(self, db_path: Path, exif_tags: Dict[str, Tuple[str, int]]=EXIF_EXTRA_TAGS):
+        """
+        Open (or create) a timestamps cache.
+        Pictures are keyed by their path relative to the cache file folder, their size and modification time.
+        Exif tags are read and stored along with the timestamps.
+
+        :param db_path: Location of the SQLite cache file.
+        :type db_path: Path
+        :param exif_tags: Exif tags read with the timestamp, see pictures_utils.read_exif.
+        :type exif_tags: Dict[str, Tuple[str, int]]
+        """
+        self.logger = logging.getLogger(self.__module__ + "." + self.__class__.__name__)
+
+        self.db_path = Path(db_path)
+        self.exif_tags = exif_tags
+        self._root = self.db_path.abspath().parent
+        self._lock = threading.Lock()
+        self._pending = []  # type: List[Tuple[str, int, int, int, str]]
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pictures_ts ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL, ts INTEGER NOT NULL, tags TEXT)")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(pictures_ts)")]
+        if "tags" not in columns:  # cache created before exif tags were stored
+            self._conn.execute("ALTER TABLE pictures_ts ADD COLUMN tags TEXT")
+        self._conn.commit()
+
+        # path -> (size, mtime, ts, tags), loaded once so that lookups don't hit the database
+        self._entries = {
+            row[0]: (row[1], row[2], row[3], None if row[4] is None else json.loads(row[4]))
+            for row in self._conn.execute("SELECT path, size, mtime, ts, tags FROM pictures_ts")
+        }  # type: Dict[str, Tuple[int, int, int, Dict[str, str]]]
+        self.logger.debug("Loaded %i cached timestamps from %s", len(self._entries), self.db_path)
+
+    def _key(self, pic_path: Path) -> str:
+        """
+        Cache key of a picture.
+
+        :param pic_path: Picture location.
+        :return: Path relative to the cache folder, so that the cache can be moved along with the pictures.
+        """
+        return os.path.relpath(Path(pic_path).abspath(), self._root)
+
+    def get_timestamp(self, pic_path: Path) -> int:
+        """
+        Return picture timestamp from cache, read it from the exif and save it if the picture isn't in the cache
+        or was modified.
+
+        :param pic_path: Picture location.
+        :type pic_path: Path
+        :return: Picture taken time, timestamp.
+        :rtype: int
+        """
+        st = os.stat(pic_path)
+        ts = self.lookup(pic_path=pic_path, st=st)
+        if ts is not None:
+            return ts
+
+        return self._read_and_put(pic_path=pic_path, st=st)[0]
+
+    def get_exif(self, pic_path: Path) -> Tuple[int, Dict[str, Optional[str]]]:
+        """
+        Return picture timestamp and exif tags from cache, read them and save them if the picture isn't in the
+        cache, was modified or its cached tags don't include all the wanted exif tags.
+
+        :param pic_path: Picture location.
+        :type pic_path: Path
+        :return: Picture taken time and exif tags values.
+        :rtype: Tuple[int, Dict[str, str]]
+        """
+        key = self._key(pic_path)
+        st = os.stat(pic_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns and \
+                    entry[3] is not None and all(name in entry[3] for name in self.exif_tags):
+                self.hits += 1
+                return entry[2], entry[3]
+            self.misses += 1
+
+        return self._read_and_put(pic_path=pic_path, st=st)
+
+    def _read_and_put(self, pic_path: Path, st: os.stat_result) -> Tuple[int, Dict[str, Optional[str]]]:
+        """
+        Read picture exif (timestamp and tags in one pass) and save it.
+
+        :param pic_path: Picture location.
+        :param st: Picture stat.
+        :return: Picture taken time and exif tags values.
+        """
+        ts, tags = pictures_utils.read_exif(pic_path, tags=self.exif_tags)
+        self.put(pic_path=pic_path, ts=ts, st=st, tags=tags)
+
+        return ts, tags
+
+    def lookup(self, pic_path: Path, st: os.stat_result=None) -> Optional[int]:
+        """
+        Return picture timestamp from cache only, without reading the exif.
+
+        :param pic_path: Picture location.
+        :param st: Picture stat, read if not given.
+        :return: Picture timestamp, None if the picture isn't in the cache or was modified.
+        :rtype: int
+        """
+        key = self._key(pic_path)
+        st = os.stat(pic_path) if st is None else st
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        return None
+
+    def put(self, pic_path: Path, ts: int, st: os.stat_result=None, tags: Dict[str, Optional[str]]=None):
+        """
+        Save a picture timestamp.
+
+        :param pic_path: Picture location.
+        :param ts: Picture timestamp.
+        :param st: Picture stat, used to invalidate the entry when the file changes. Read if not given.
+        :param tags: Picture exif tags, optional. If not given, tags already cached for the unchanged picture are kept.
+        """
+        st = os.stat(pic_path) if st is None else st
+        key = self._key(pic_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if tags is None and entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                tags = entry[3]
+            self._entries[key] = (st.st_size, st.st_mtime_ns, ts, tags)
+            self._pending.append((key, st.st_size, st.st_mtime_ns, ts, None if tags is None else json.dumps(tags)))
+            flush_needed = len(self._pending) >= TS_CACHE_FLUSH_SIZE
+
+        if flush_needed:
+            self.flush()
+
+    def flush(self):
+        """
+        Write new entries into the database.
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+            if len(pending) > 0:
+                self._conn.executemany("INSERT OR REPLACE INTO pictures_ts (path, size, mtime, ts, tags) VALUES (?, ?, ?, ?, ?)", pending)
+                self._conn.commit()
+
+        self.logger.debug("Timestamps cache flushed, %i new entries, hits: %i, misses: %i", len(pending), self.hits, self.misses)
+
+    def close(self):
+        """
+        Flush and close the database.
+        """
+        self.flush()
+        self._conn.close()
@@ -2,6 +2,7 @@ from opv_import.model.orientation_angle import OrientationAngle
 from opv_import.model.geo_point import GeoPoint
 from opv_import.model.rederbro_meta import RederbroMeta
 from opv_import.model.camera_image import CameraImage
+from opv_import.model.camera_image_list import CameraImageList
 from opv_import.model.image_set import ImageSet
 from opv_import.model.lot import Lot
 from opv_import.model.opv_import_error import OpvImportError
@@ -9,3 +10,4 @@ from opv_import.model.camera_set_partition import CameraSetPartition
 from opv_import.model.lot_partition import LotPartition
 from opv_import.model.apn_device import ApnDevice
 from opv_import.model.file_system import FileSystem
+from opv_import.model.fetch_report import FetchReport
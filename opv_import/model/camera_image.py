@@ -17,20 +17,45 @@
 # Description: Represent a camera image file.
 
 from path import Path
+from typing import Dict, Optional
 from opv_import.helpers import pictures_utils
+from opv_import.config import EXIF_EXTRA_TAGS
 
 class CameraImage:
-    def __init__(self, path: Path):
+
+    archive = None  # pictures archive the picture is read from, None for picture files
+
+    def __init__(self, path: Path, ts_cache: 'TimestampCache'=None):
         """
         Intentiate a camera image.
 
         :param path: picture path.
         :type path: Path (path.py)
+        :param ts_cache: Persistent timestamps cache, optional. Exif is read directly when None.
+        :type ts_cache: TimestampCache
         """
         self.path = path
         self._ts = None
+        self._exif_tags = None
+        self._ts_cache = ts_cache
         self.leveled_ts = None
 
+    def _read_exif(self):
+        """
+        Read picture timestamp and exif tags (config.EXIF_EXTRA_TAGS) in one pass.
+        An already known timestamp is kept (it might come from an index or the file modification time).
+        """
+        if self.archive is not None:
+            with self.archive.open(self.path) as f:
+                ts, self._exif_tags = pictures_utils.read_exif_file(f, tags=EXIF_EXTRA_TAGS)
+        elif self._ts_cache is not None:
+            ts, self._exif_tags = self._ts_cache.get_exif(self.path)
+        else:
+            ts, self._exif_tags = pictures_utils.read_exif(self.path, tags=EXIF_EXTRA_TAGS)
+
+        if self._ts is None:
+            self._ts = ts
+
     def get_timestamp(self):
         """
         Returns pictures timestamp.
@@ -38,10 +63,21 @@ class CameraImage:
         :return: return picture timestamp.
         """
         if self._ts is None:
-            self._ts = pictures_utils.read_exif_time(self.path)
+            self._read_exif()
 
         return self._ts
 
+    def get_exif_tags(self) -> Dict[str, Optional[str]]:
+        """
+        Returns pictures exif tags (config.EXIF_EXTRA_TAGS), read with the timestamp.
+
+        :return: Tags values by name, None for tags not in the picture.
+        """
+        if self._exif_tags is None:
+            self._read_exif()
+
+        return self._exif_tags
+
     def __eq__(ca, cb):
         """ 2 cam images are equal if they represent the same file"""
         print("__eq__")
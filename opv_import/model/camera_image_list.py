@@ -0,0 +1,274 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Ordered camera images of a DCIM folder, stored in arrays. Camera images are views created on demand.
+
+import threading
+import numpy as np
+from path import Path
+from collections.abc import Sequence
+from typing import Dict, List, Optional, Tuple
+from opv_import.model.camera_image import CameraImage
+from opv_import.helpers.dcf_naming import DcfNaming
+
+NO_TIMESTAMP = np.iinfo(np.int64).min  # timestamps array value of pictures whose timestamp isn't known yet
+NO_EXIF_TAGS = -1  # exif tags ids array value of pictures whose exif tags aren't known yet
+
+
+class CameraImageList(Sequence):
+
+    def __init__(self, naming: Tuple[str, int, str], folders: List[Path], folder_ids: np.ndarray, file_indexes: np.ndarray,
+                 ts_cache: 'TimestampCache'=None, archive: 'PictureArchive'=None):
+        """
+        Instantiate a camera images list. Pictures paths are rebuilt from their folder and DCF file index.
+
+        :param naming: DCF file names prefix, index digit length and extension, for instance ("3D_L", 4, ".JPG"), or the
+                       NameTable of pictures that aren't DCF named.
+        :type naming: Tuple[str, int, str]
+        :param folders: Folders table.
+        :type folders: List[Path]
+        :param folder_ids: Position of each picture folder in the folders table.
+        :type folder_ids: np.ndarray (int32)
+        :param file_indexes: DCF file index of each picture.
+        :type file_indexes: np.ndarray (int32)
+        :param ts_cache: Persistent timestamps cache given to the camera images, optional.
+        :type ts_cache: TimestampCache
+        :param archive: Pictures archive the pictures are read from, None for picture files.
+        :type archive: PictureArchive
+        """
+        self.naming = naming if hasattr(naming, "file_name") else DcfNaming(*naming)  # NameTable kept as is
+        self.folders = folders
+        self.ts_cache = ts_cache
+        self.archive = archive
+        self._folder_ids = folder_ids
+        self._file_indexes = file_indexes
+        self._timestamps = np.full(len(file_indexes), NO_TIMESTAMP, dtype=np.int64)
+        self._tags_ids = np.full(len(file_indexes), NO_EXIF_TAGS, dtype=np.int32)
+        self._tags_table = []  # type: List[Dict[str, Optional[str]]]  # distinct exif tags, mostly shared by a camera pictures
+        self._tags_table_ids = {}  # type: Dict[tuple, int]  # exif tags items -> position in the tags table
+        self._lock = threading.Lock()  # writes (prefetch threads) mustn't be lost while arrays are grown
+
+    @classmethod
+    def from_folders(cls, naming: Tuple[str, int, str], folders_indexes: List[Tuple[Path, List[int]]],
+                     ts_cache: 'TimestampCache'=None, archive: 'PictureArchive'=None) -> 'CameraImageList':
+        """
+        Make a camera images list from ordered pictures DCF file indexes, folder by folder.
+
+        :param naming: DCF file names prefix, index digit length and extension.
+        :type naming: Tuple[str, int, str]
+        :param folders_indexes: Folders and the DCF file indexes of their pictures, in pictures order.
+        :type folders_indexes: List[Tuple[Path, List[int]]]
+        :param ts_cache: Persistent timestamps cache given to the camera images, optional.
+        :type ts_cache: TimestampCache
+        :param archive: Pictures archive the pictures are read from, None for picture files.
+        :type archive: PictureArchive
+        :return: The camera images list.
+        :rtype: CameraImageList
+        """
+        folders = [folder for folder, _ in folders_indexes]
+        folder_ids = np.repeat(np.arange(len(folders), dtype=np.int32), [len(indexes) for _, indexes in folders_indexes])
+        file_indexes = np.fromiter((i for _, indexes in folders_indexes for i in indexes), dtype=np.int32, count=len(folder_ids))
+        return cls(naming=naming, folders=folders, folder_ids=folder_ids, file_indexes=file_indexes, ts_cache=ts_cache, archive=archive)
+
+    def add_folder(self, folder: Path, file_indexes: List[int]):
+        """
+        Append the pictures of a folder, views already made stay valid. Arrays are copied, folders are few.
+
+        :param folder: Pictures folder.
+        :type folder: Path
+        :param file_indexes: DCF file indexes of the folder pictures, in pictures order.
+        :type file_indexes: List[int]
+        """
+        nb = len(file_indexes)
+        with self._lock:
+            self.folders.append(folder)
+            self._folder_ids = np.concatenate((self._folder_ids, np.full(nb, len(self.folders) - 1, dtype=np.int32)))
+            self._file_indexes = np.concatenate((self._file_indexes, np.array(file_indexes, dtype=np.int32)))
+            self._timestamps = np.concatenate((self._timestamps, np.full(nb, NO_TIMESTAMP, dtype=np.int64)))
+            self._tags_ids = np.concatenate((self._tags_ids, np.full(nb, NO_EXIF_TAGS, dtype=np.int32)))
+
+    def segments(self) -> List[Tuple[Path, np.ndarray]]:
+        """
+        Folders of the pictures with their DCF file indexes, consecutive pictures of a same folder are merged.
+
+        :return: Folders and file indexes, in pictures order.
+        :rtype: List[Tuple[Path, np.ndarray]]
+        """
+        if len(self) == 0:
+            return []
+
+        bounds = np.flatnonzero(np.diff(self._folder_ids)) + 1
+        segments = []
+        for start, stop in zip([0] + bounds.tolist(), bounds.tolist() + [len(self)]):
+            folder = self.folders[self._folder_ids[start]]
+            if len(segments) > 0 and segments[-1][0] == folder:
+                segments[-1] = (folder, np.concatenate((segments[-1][1], self._file_indexes[start:stop])))
+            else:
+                segments.append((folder, self._file_indexes[start:stop]))
+        return segments
+
+    def __len__(self) -> int:
+        return len(self._file_indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("camera image index out of range")
+
+        return CameraImageView(images=self, position=index)
+
+    def __eq__(self, other) -> bool:
+        """ Same pictures in the same order, compared with any sequence of CameraImage (by path, as CameraImage does) """
+        if not isinstance(other, Sequence) or len(self) != len(other):
+            return False
+        if isinstance(other, CameraImageList):
+            return all(self.get_path(i) == other.get_path(i) for i in range(0, len(self)))
+        return all(self.get_path(i) == img.path for i, img in enumerate(other))
+
+    def __repr__(self):
+        return "CameraImageList: {} pictures in {} folders".format(len(self), len(self.folders))
+
+    @property
+    def nbytes(self) -> int:
+        """ Size of the pictures arrays, in bytes (folders and exif tags tables aren't counted) """
+        return self._folder_ids.nbytes + self._file_indexes.nbytes + self._timestamps.nbytes + self._tags_ids.nbytes
+
+    def get_path(self, position: int) -> Path:
+        """
+        Returns a picture path.
+
+        :param position: Picture position in the list.
+        :type position: int
+        :return: Picture path.
+        :rtype: Path
+        """
+        return self.folders[self._folder_ids[position]] / self.naming.file_name(int(self._file_indexes[position]))
+
+    def get_ts(self, position: int) -> Optional[int]:
+        """
+        Returns a picture known timestamp, nothing is read.
+
+        :param position: Picture position in the list.
+        :type position: int
+        :return: The timestamp, None if it isn't known.
+        :rtype: int
+        """
+        ts = self._timestamps[position]
+        return None if ts == NO_TIMESTAMP else int(ts)
+
+    def set_ts(self, position: int, ts: Optional[int]):
+        """
+        Set a picture timestamp.
+
+        :param position: Picture position in the list.
+        :type position: int
+        :param ts: The timestamp, None to forget it.
+        :type ts: int
+        """
+        with self._lock:
+            self._timestamps[position] = NO_TIMESTAMP if ts is None else ts
+
+    def get_exif_tags(self, position: int) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Returns a picture known exif tags, nothing is read.
+
+        :param position: Picture position in the list.
+        :type position: int
+        :return: A copy of the exif tags, None if they aren't known.
+        :rtype: Dict[str, Optional[str]]
+        """
+        tags_id = self._tags_ids[position]
+        return None if tags_id == NO_EXIF_TAGS else dict(self._tags_table[tags_id])
+
+    def set_exif_tags(self, position: int, tags: Optional[Dict[str, Optional[str]]]):
+        """
+        Set a picture exif tags. Identical tags are stored once.
+
+        :param position: Picture position in the list.
+        :type position: int
+        :param tags: Exif tags values by name, None to forget them.
+        :type tags: Dict[str, Optional[str]]
+        """
+        with self._lock:
+            if tags is None:
+                self._tags_ids[position] = NO_EXIF_TAGS
+                return
+
+            key = tuple(sorted(tags.items()))
+            if key not in self._tags_table_ids:
+                self._tags_table_ids[key] = len(self._tags_table)
+                self._tags_table.append(dict(tags))
+            self._tags_ids[position] = self._tags_table_ids[key]
+
+    def get_timestamps(self) -> np.ndarray:
+        """
+        Returns the timestamps of all pictures, unknown timestamps are read first.
+
+        :return: A copy of the timestamps array.
+        :rtype: np.ndarray (int64)
+        """
+        for position in np.flatnonzero(self._timestamps == NO_TIMESTAMP):
+            self[int(position)].get_timestamp()
+
+        return self._timestamps.copy()
+
+
+class CameraImageView(CameraImage):
+
+    def __init__(self, images: CameraImageList, position: int):
+        """
+        Camera image of a CameraImageList, its timestamp and exif tags are read from and written to the list arrays.
+
+        :param images: The list storing the picture.
+        :type images: CameraImageList
+        :param position: Picture position in the list.
+        :type position: int
+        """
+        self._images = images
+        self._position = position
+        self.leveled_ts = None
+
+    @property
+    def path(self) -> Path:
+        return self._images.get_path(self._position)
+
+    @property
+    def _ts_cache(self) -> 'TimestampCache':
+        return self._images.ts_cache
+
+    @property
+    def archive(self) -> 'PictureArchive':
+        return self._images.archive
+
+    @property
+    def _ts(self) -> Optional[int]:
+        return self._images.get_ts(self._position)
+
+    @_ts.setter
+    def _ts(self, ts: Optional[int]):
+        self._images.set_ts(self._position, ts)
+
+    @property
+    def _exif_tags(self) -> Optional[Dict[str, Optional[str]]]:
+        return self._images.get_exif_tags(self._position)
+
+    @_exif_tags.setter
+    def _exif_tags(self, tags: Optional[Dict[str, Optional[str]]]):
+        self._images.set_exif_tags(self._position, tags)
@@ -0,0 +1,112 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Fetch report of a camera, statistics and anomalies found while its DCIM folder was walked.
+
+from path import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+FolderRange = NamedTuple('FolderRange', [('folder', Path), ('nb_pictures', int), ('first_index', int), ('last_index', int)])
+SerieBreak = NamedTuple('SerieBreak', [('folder', Path), ('last_index', int), ('next_index', int)])
+
+
+class FetchReport:
+
+    def __init__(self, dcim_folder: Path, profile: str = None):
+        """
+        Report of a camera fetch, filled folder by folder while the pictures are ordered.
+
+        :param dcim_folder: Camera DCIM folder.
+        :type dcim_folder: Path
+        :param profile: Name of the camera naming profile.
+        :type profile: str
+        """
+        self.dcim_folder = dcim_folder
+        self.profile = profile
+        self.folders = []  # type: List[FolderRange]  # in pictures order, first and last file index of each folder
+        self.series_breaks = []  # type: List[SerieBreak]  # restarts of a serie in a folder (missing files)
+        self.dropped_files = []  # type: List[Path]  # files following the camera naming which aren't fetched
+        self.first_ts = None  # type: Optional[int]  # timestamp of the first picture, when known
+        self.last_ts = None  # type: Optional[int]  # timestamp of the last picture, when known
+
+    def add_folder(self, folder: Path, pics: List[int], scanned: Dict[int, str] = None, series: bool = True,
+                   others: List[str] = None):
+        """
+        Add a folder ordered pictures.
+
+        :param folder: DCF folder.
+        :type folder: Path
+        :param pics: Ordered pictures file indexes.
+        :type pics: List[int]
+        :param scanned: All the folder pictures names by file index (see CameraImageFetcher._scan_dcf_dir), files
+                        which aren't in pics are dropped files. Optional.
+        :type scanned: Dict[int, str]
+        :param series: True if pictures are ordered following DCF series, series breaks are looked for.
+        :type series: bool
+        :param others: Names of the folder pictures following another DCF naming than the camera one (other series),
+                       they are dropped files. Optional.
+        :type others: List[str]
+        """
+        if len(pics) > 0:
+            self.folders.append(FolderRange(folder=folder, nb_pictures=len(pics), first_index=int(pics[0]), last_index=int(pics[-1])))
+
+        if series:
+            for last_index, next_index in zip(pics[:-1], pics[1:]):
+                if next_index != last_index + 1:
+                    self.series_breaks.append(SerieBreak(folder=folder, last_index=int(last_index), next_index=int(next_index)))
+
+        if scanned is not None and len(scanned) > len(pics):
+            fetched = set(pics)
+            self.dropped_files.extend(Path(folder) / name for index, name in sorted(scanned.items()) if index not in fetched)
+
+        if others is not None:
+            self.dropped_files.extend(Path(folder) / name for name in others)
+
+    @property
+    def nb_pictures(self) -> int:
+        """
+        :return: Number of fetched pictures.
+        :rtype: int
+        """
+        return sum(folder.nb_pictures for folder in self.folders)
+
+    def has_anomalies(self) -> bool:
+        """
+        :return: True if some pictures of the camera weren't fetched.
+        :rtype: bool
+        """
+        return len(self.dropped_files) > 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        :return: The report as JSON serializable types.
+        :rtype: Dict[str, Any]
+        """
+        return {
+            "dcim_folder": str(self.dcim_folder),
+            "profile": self.profile,
+            "nb_pictures": self.nb_pictures,
+            "nb_folders": len(self.folders),
+            "folders": [[str(f.folder), f.nb_pictures, f.first_index, f.last_index] for f in self.folders],
+            "series_breaks": [[str(b.folder), b.last_index, b.next_index] for b in self.series_breaks],
+            "dropped_files": [str(path) for path in self.dropped_files],
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts}
+
+    def __repr__(self) -> str:
+        return "FetchReport of {} ({}) : {} pictures in {} folders, {} series breaks, {} dropped files, timestamps {} - {}".format(
+            self.dcim_folder, self.profile, self.nb_pictures, len(self.folders), len(self.series_breaks),
+            len(self.dropped_files), self.first_ts, self.last_ts)
@@ -1,4 +1,5 @@
 from opv_import.services.camera_image_fetcher import CameraImageFetcher
+from opv_import.services.archive_camera_image_fetcher import ArchiveCameraImageFetcher
 from opv_import.services.lot_maker import LotMaker, CameraBackInTimeError
 from opv_import.services.ressource_manager import RessourceManager
 from opv_import.services.abstract_apn_device_tasker import AbstractApnDeviceTasker
@@ -0,0 +1,63 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Fetch images in correct order from the DCIM folder of a camera archive (uncompressed tar or zip),
+#              without extracting it. Same ordering as CameraImageFetcher.
+
+from path import Path
+from typing import Dict, Iterator, List
+from opv_import.model import CameraImage
+from opv_import.helpers import PictureArchive
+from opv_import.services.camera_image_fetcher import CameraImageFetcher, MissingDcfFolderError, GORPRO_IMG_START_INDEX
+
+
+class ArchiveCameraImageFetcher(CameraImageFetcher):
+
+    def __init__(self, archive: PictureArchive, img_start_index: int = GORPRO_IMG_START_INDEX):
+        """
+        Initialize a fetcher of the pictures of a camera archive. Folders are listed from the archive members index,
+        pictures exif and modification times are read from the archive.
+        Timestamps cache, pictures index and DCIM manifest aren't used : they are kept by picture file, and the
+        archive members index already spares the archive walk.
+
+        :param archive: Opened camera archive.
+        :type archive: PictureArchive
+        :raise MissingDcfFolderError: When there is no DCIM folder in the archive.
+        """
+        self.archive = archive
+        dcim_folder = archive.find_dcim_folder()
+        if dcim_folder is None:
+            raise MissingDcfFolderError(archive.archive_path)
+
+        super().__init__(dcim_folder=dcim_folder, img_start_index=img_start_index)
+
+    def _list_dcf_dirs(self) -> List[Path]:
+        return self.archive.dirs(self.dcim_folder)
+
+    def _list_file_names(self, dcf_dir: Path) -> List[str]:
+        return self.archive.file_names(dcf_dir)
+
+    def _list_file_mtimes(self, dcf_dir: Path) -> Dict[str, int]:
+        return {name: self.archive.getmtime(dcf_dir / name) for name in self.archive.file_names(dcf_dir)}
+
+    def watch_images(self, idle_timeout: float=None, poll_interval: float=None) -> Iterator[CameraImage]:
+        """
+        An archive isn't being filled, pictures are given as iter_images does.
+
+        :return: Iterator on ordered camera images.
+        :rtype: Iterator[CameraImage]
+        """
+        yield from self.iter_images()
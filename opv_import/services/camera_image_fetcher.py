@@ -18,33 +18,86 @@
 #              Based on standards DCF (Design rule for Camera File system) for fetching order.
 #              DCF rules are a bit customized as GoPro camera doesn't follow them strictly, should not impact other cameras
 
+import os
+import time
+import random
 import logging
+import numpy as np
 from path import Path
-from typing import List
-from opv_import.model import CameraImage
-from opv_import.model import OpvImportError
-
-DCF_FILE_ALPHADIGIT_LEN = 4  # according to DCF specification DCF files have 4 alphadigit at the begining
-DCF_FOLDERS_DIGIT_LEN = 3    # according to DCF specification DCF directories (DCMI subdirectories) have 3 digit at the begining
+from typing import Dict, Iterator, List, Optional, Tuple
+from opv_import.model import CameraImage, CameraImageList
+from opv_import.model import OpvImportError, FetchReport
+from opv_import.helpers import TimestampCache, PicturesIndex, DcimManifest, Inotify, DcfNaming
+from opv_import.helpers.dcf_naming import dcf_file_number
+from opv_import.helpers.naming_profiles import NamingProfile, NAMING_SAMPLE_SIZE, detect_naming_profile, \
+    is_picture_name
+from opv_import.helpers.inotify import IN_CLOSE_WRITE, IN_CREATE, IN_ISDIR, IN_MOVED_TO, IN_Q_OVERFLOW
+from opv_import.config import PICTURES_INDEX_FILE_NAME, DCIM_MANIFEST_FILE_NAME, EXIF_EXTRA_TAGS
 
 GORPRO_IMG_START_INDEX = 1   # GoPro start index for DCF/images files
 
+MTIME_TS_NB_SAMPLES = 20  # number of exif timestamps checked before trusting pictures modification time
+MTIME_TS_MAX_DIFF = 3     # max accepted difference (seconds) between exif and modification time
+
+WATCH_IDLE_TIMEOUT = 60   # seconds without newly completed picture before a DCIM folder watch ends
+WATCH_POLL_INTERVAL = 1   # seconds, completed pictures are appended by batches
+
 class CameraImageFetcher:
 
-    def __init__(self, dcim_folder: Path, img_start_index: int = GORPRO_IMG_START_INDEX):
+    archive = None  # pictures archive the DCIM folder is in, none (pictures files)
+
+    def __init__(
+            self, dcim_folder: Path, img_start_index: int = GORPRO_IMG_START_INDEX, ts_cache: TimestampCache = None,
+            use_manifest: bool = False, naming_profiles: List[NamingProfile] = None):
         """
         Initialize a CameraImageFetcher.
 
         :param dcim_folder: Path of the camera DCIM folder.
         :type dcim_folder: Path
+        :param ts_cache: Persistent timestamps cache given to the fetched camera images, optional.
+        :type ts_cache: TimestampCache
+        :param use_manifest: If True, fetched pictures are saved in a DCIM manifest in the APN folder, and loaded from it
+                             while the DCIM folders aren't modified.
+        :type use_manifest: bool
+        :param naming_profiles: Naming profiles the camera one is detected from, in detection order, optional.
+        :type naming_profiles: List[NamingProfile]
+        :raise UnknownNamingError: When the camera names don't follow one of the naming profiles.
         """
+        self.logger = logging.getLogger(self.__module__ + "." + self.__class__.__name__)
         self.dcim_folder = dcim_folder
+        self._naming_profiles = naming_profiles  # candidate naming profiles, default NAMING_PROFILES
         self._img_start_index = img_start_index
-        self._cache_camimg = None
-
-        self._extract_file_names_param()  # extract prefix, ext, digit len used after
-
-        self.logger = logging.getLogger(self.__module__ + "." + self.__class__.__name__)
+        self._ts_cache = ts_cache
+        self._pictures_index = None  # pictures index written by the SD copier in the APN folder
+        self._manifest = None  # DCIM manifest, none (not used)
+        self._profile = None  # naming profile of the camera, detected from sampled names
+        self._naming = None  # DCF name formatting of the camera files, parsed from a file name
+        self._dcf_dir_indexes = None  # DCF directories scans, dcf dir -> {index: file name}
+        self._dcf_dir_others = None  # names of the DCF directories scans following the profile but not the naming, dcf dir -> names
+        self.report = None  # report of the last fetch, see get_report
+        self._cache_camimg = None  # fetched pictures, see get_images
+        self._cache_ts = None  # pictures timestamps array, see get_timestamps
+
+        if use_manifest:
+            self._manifest = DcimManifest(manifest_path=Path(self.dcim_folder).abspath().parent / DCIM_MANIFEST_FILE_NAME).load()
+
+        naming = None
+        if self._manifest is not None and self._manifest.is_up_to_date(self.dcim_folder):
+            naming = DcfNaming(*self._manifest.naming)  # no need to list a DCF folder
+            self._profile = detect_naming_profile(
+                folders_names=[], files_names=[naming.file_name(naming.max_index)], profiles=self._naming_profiles)
+
+        if naming is not None and self._profile is not None:
+            self._naming = naming
+        else:
+            self._extract_file_names_param()  # detect the naming profile, extract prefix, ext, digit len used after
+        if not self._profile.dcf_series:
+            self._manifest = None  # manifests keep DCF names as indexes
+        self.logger.debug("%s pictures named following %r", self.dcim_folder, self._profile)
+
+        index_path = Path(self.dcim_folder).abspath().parent / PICTURES_INDEX_FILE_NAME
+        if index_path.exists():
+            self._pictures_index = PicturesIndex(index_path=index_path).load()
 
     def _order_dcf_dir(self, dcf_dirs: List[Path]) -> List[Path]:
         """
@@ -56,8 +109,8 @@ class CameraImageFetcher:
         :rtype: List[Path]
         """
         # According to the DCF specification DCMI subdirectories names begin by 3 digits and should be incremental
-        # we use these digits to order the folders
-        return sorted(dcf_dirs, key=lambda path: int(Path(path).basename()[0:DCF_FOLDERS_DIGIT_LEN]))
+        # we use these digits to order the folders (other profiles give their own key)
+        return sorted(dcf_dirs, key=self._profile.folder_key)
 
     def _order_dcf_files(self, dcf_files: List[Path]) -> List[Path]:
         """
@@ -70,32 +123,42 @@ class CameraImageFetcher:
         """
         # According to the DCF specification DCF files names begin by 4 alpha digit followed by there id (digits)
         # we use these digits to order the files
-        return sorted(dcf_files, key=lambda path: int(Path(path).namebase[DCF_FILE_ALPHADIGIT_LEN:]))
+        return sorted(dcf_files, key=dcf_file_number)
 
     def _extract_file_names_param(self, pic_path: Path = None):
         """
-        Extract file prefix, digit_len and extension.
+        Detect the camera naming profile and extract file prefix, digit_len and extension.
+        Pictures names are sampled in the first and last DCF folders (NAMING_SAMPLE_SIZE of each) before any walk,
+        so that a camera isn't walked following the wrong naming.
 
-        :param pic_path: Path to a picture file.
+        :param pic_path: Path to a picture file, sampled alone if given.
         :type pic_path: Path
+        :raise UnknownNamingError: When sampled names don't follow one of the naming profiles.
         """
-
-        # basing naming on the first file of the first dcf (sub DCIM ) folder
         if pic_path is None:
-            dirs = self.dcim_folder.dirs()
+            dirs = sorted(self._list_dcf_dirs(), key=os.path.basename)
 
             if len(dirs) == 0:
-                raise MissingDcfFolderError()
-            files = dirs[0].files()
-            if len(files) == 0:
-                raise MissingPictureFileError()
-
-            pic_path = files[0]
-
-        self._f_prefix = pic_path.namebase[0:DCF_FILE_ALPHADIGIT_LEN]  # the prefix of jpg files, for instance "3D_L" for "3D_L0000.JPG"
-        self._f_digit_len = len(pic_path.namebase) - DCF_FILE_ALPHADIGIT_LEN
-        # the len of the index part in the name, for instance 4 for "3D_L0000.JPG"
-        self._f_ext = pic_path.ext
+                raise MissingDcfFolderError(self.dcim_folder)
+            sampled_dirs = [dirs[0], dirs[-1]] if len(dirs) > 1 else dirs
+            folders_names = [os.path.basename(dcf_dir) for dcf_dir in sampled_dirs]
+            files_names = []
+            for dcf_dir in sampled_dirs:
+                files_names.extend([name for name in self._list_file_names(dcf_dir) if is_picture_name(name)][0:NAMING_SAMPLE_SIZE])
+            if len(files_names) == 0:
+                raise MissingPictureFileError(dirs[0])
+        else:
+            folders_names = [os.path.basename(os.path.dirname(pic_path))]
+            files_names = [os.path.basename(pic_path)]
+
+        self._profile = detect_naming_profile(folders_names=folders_names, files_names=files_names, profiles=self._naming_profiles)
+        if self._profile is None:
+            raise UnknownNamingError(
+                "Pictures of {} don't follow a known naming, sampled names : {}".format(
+                    self.dcim_folder, ", ".join(folders_names + sorted(files_names))))
+
+        # prefix, index digit len and extension, for instance ("3D_L", 4, ".JPG") for "3D_L0000.JPG"
+        self._naming = self._profile.make_naming(files_names)
 
     def _make_dcf_pic_filename(self, index: int):
         """
@@ -106,50 +169,111 @@ class CameraImageFetcher:
         :return: A DCF filename.
         :rtype: str
         """
-        return self._f_prefix + str(index).zfill(self._f_digit_len) + self._f_ext
+        return self._naming.file_name(index)
+
+    def _scan_dcf_dir(self, dcf_dir: Path) -> Dict[int, str]:
+        """
+        List a DCF directory once (scandir, no stat per file) and index its pictures following the current
+        DCF name formatting. Scans are kept until the next fetch_images.
+
+        :param dcf_dir: Should be a directory which is under the DCIM directory (full path).
+        :type dcf_dir: Path
+        :return: Pictures file names by index.
+        :rtype: Dict[int, str]
+        """
+        if self._dcf_dir_indexes is None:
+            self._dcf_dir_indexes = {}
+        if self._dcf_dir_others is None:
+            self._dcf_dir_others = {}
+
+        if dcf_dir not in self._dcf_dir_indexes:
+            pics = {}
+            others = []
+            for name in self._list_file_names(dcf_dir):
+                index = self._naming.index_of(name)
+                if index is not None:
+                    pics[index] = name
+                elif self._profile.file_pattern.fullmatch(name) is not None:  # another serie, can't be ordered with this one
+                    others.append(name)
+            self._dcf_dir_indexes[dcf_dir] = pics
+            if len(others) > 0:
+                self._dcf_dir_others[dcf_dir] = sorted(others)
+
+        return self._dcf_dir_indexes[dcf_dir]
+
+    def _list_dcf_dirs(self) -> List[Path]:
+        """
+        :return: Folders of the DCIM folder, not ordered.
+        :rtype: List[Path]
+        """
+        return self.dcim_folder.dirs()
+
+    def _list_file_names(self, dcf_dir: Path) -> List[str]:
+        """
+        List the files of a DCF directory (scandir, no stat per file).
+
+        :param dcf_dir: DCF directory.
+        :type dcf_dir: Path
+        :return: Files names, not ordered.
+        :rtype: List[str]
+        """
+        # iterated to the end the scandir iterator closes the directory (no context manager nor close before 3.6)
+        return [entry.name for entry in os.scandir(dcf_dir) if entry.is_file()]
+
+    def _list_file_mtimes(self, dcf_dir: Path) -> Dict[str, int]:
+        """
+        List the files of a DCF directory with their modification time, stat from the scandir entries.
+
+        :param dcf_dir: DCF directory.
+        :type dcf_dir: Path
+        :return: Files modification times (seconds) by name.
+        :rtype: Dict[str, int]
+        """
+        return {entry.name: int(entry.stat().st_mtime) for entry in os.scandir(dcf_dir) if entry.is_file()}
 
     def _fetch_pic_files_from_dcf_dir(
-            self, dcf_dir: Path, start_index: GORPRO_IMG_START_INDEX = int) -> (int, List[CameraImage]):
+            self, dcf_dir: Path, start_index: GORPRO_IMG_START_INDEX = int) -> (int, List[int]):
         """
         Get pictures in a DCIM folder from a start index using DCF standard name convention.
+        Series are detected on the directory index (see _scan_dcf_dir), files aren't checked one by one.
+        Pictures are returned as DCF file indexes (see _make_dcf_pic_filename), no object is made per file.
 
         :param dcf_dir: Should be a directory which is under the DCIM directory (full path).
         :type dcf_dir: Path
         :param start_index: Index of the picture we will start at. Might not be 0 if we are continuing a serie from an other folder.
         :type start_index: int
-        :return: The next index (to continue a serie in the next folder), the list of ordered CameraImage.
-        :rtype: (next_index, pic_list)
+        :return: The next index (to continue a serie in the next folder), the list of ordered pictures file indexes.
+        :rtype: (next_index, pic_indexes)
         """
-        files = self._order_dcf_files(dcf_dir.files())
+        pics = self._scan_dcf_dir(dcf_dir)
+        remaining = set(pics.keys())  # indexes of the files not treated yet
         pic_files = []    # Files that should be returned in the correct order
         next_index = start_index
 
-        if len(files) == 0:  # No files nothing to do
+        if len(remaining) == 0:  # No files nothing to do
             return (next_index, [])
 
-        start_at_first_pic_index = self._make_dcf_pic_filename(index=next_index) == files[0].basename()
-        while len(files) > 0:  # since all files aren't treated
+        start_at_first_pic_index = next_index == min(remaining)
+        while len(remaining) > 0:  # since all files aren't treated
 
-            next_file = dcf_dir / self._make_dcf_pic_filename(index=next_index)
-
-            while next_file.exists():
-                pic_files.append(CameraImage(path=next_file))
-                files.remove(next_file)
+            while next_index in remaining:
+                pic_files.append(next_index)
+                remaining.remove(next_index)
                 next_index += 1
-                next_file = dcf_dir / self._make_dcf_pic_filename(index=next_index)
 
-            self.logger.debug("This file {} doesn't exists".format(next_file))
+            self.logger.debug("This file %s doesn't exists", dcf_dir / self._naming.file_name(next_index))
 
-            if len(files):  # some files still need to be added
+            if len(remaining):  # some files still need to be added
                 if not start_at_first_pic_index:   # we didn't start with the lower index in the current directory
-                    next_index = int(files[0].namebase[DCF_FILE_ALPHADIGIT_LEN:])  # starting over a new serie using the lower index in directory
+                    next_index = min(remaining)  # starting over a new serie using the lower index in directory
                     start_at_first_pic_index = True
                     self.logger.debug("Some files missing resseting index to {} ".format(str(next_index)))
                     continue
                 else:  # break in file indexing serie, shouldn't happened, will not treat orther files
                     self.logger.error("Some files weren't added are they aren't part of the lower serie in the DCF directory :")
-                    self.logger.error("Latest added file is {} but file {} doesn't exists.".format(pic_files[-1], next_file))
-                    files = []
+                    self.logger.error("Latest added file is {} but file {} doesn't exists.".format(
+                        dcf_dir / pics[pic_files[-1]], dcf_dir / self._make_dcf_pic_filename(index=next_index)))
+                    remaining = set()
 
         return (next_index, pic_files)
 
@@ -166,55 +290,410 @@ class CameraImageFetcher:
         :return: True if the serie continu in the folder and isn't part of a new serie of that folder.
         :rtype: Boolean
         """
-        next_file = next_dcf_folder_path / self._make_dcf_pic_filename(index=next_index)
-        prev_file = next_dcf_folder_path / self._make_dcf_pic_filename(index=next_index - 1)
+        pics = self._scan_dcf_dir(next_dcf_folder_path)  # scanned once, used again to fetch the folder
 
-        return next_file.exists() and not prev_file.exists()
+        return next_index in pics and next_index - 1 not in pics
 
-    def fetch_images(self) -> List[CameraImage]:
+    def fetch_images(self) -> CameraImageList:
         """
         Return a list of pictures ordered by their names using DCF standard and GoPro logic.
         No cache used.
 
         :param dcim_folder: Path to dcmi folder.
-        :return: ordered list of pictures path.
+        :return: ordered list of pictures, camera images are made on access.
+        """
+        pic_files = self._new_image_list()
+        for _ in self._fetch_folders(pic_files):
+            pass
+
+        return pic_files
+
+    def iter_images(self) -> Iterator[CameraImage]:
+        """
+        Fetch pictures like fetch_images but yield them in the same order folder by folder, as soon as a folder is
+        listed. Next folders aren't listed until the yielded pictures are consumed, so treatments of the oldest
+        pictures overlap with the listing. Once all are yielded pictures are kept, as get_images does.
+
+        :return: Iterator on ordered camera images.
+        :rtype: Iterator[CameraImage]
+        """
+        if self._cache_camimg is not None:
+            yield from self._cache_camimg
+            return
+
+        pic_files = self._new_image_list()
+        for start in self._fetch_folders(pic_files):
+            for position in range(start, len(pic_files)):
+                yield pic_files[position]
+
+        self._cache_camimg = pic_files
+
+    def watch_images(self, idle_timeout: float=WATCH_IDLE_TIMEOUT, poll_interval: float=WATCH_POLL_INTERVAL) -> Iterator[CameraImage]:
+        """
+        Fetch pictures of a DCIM folder still being filled (opv-sd-copier running) and follow it with inotify.
+        Pictures are yielded like iter_images does, then newly completed ones (closed after writing, or renamed by
+        rsync) are appended to the ordered series and yielded, until no picture is completed during idle_timeout.
+        Folders aren't listed again, the DCF order is kept up to date from the events.
+        If a completed picture changes the order of the pictures already given (completed out of order), the watch
+        ends with a warning, a full fetch is then needed.
+
+        :param idle_timeout: Seconds without newly completed picture before the watch ends.
+        :type idle_timeout: float
+        :param poll_interval: Seconds between two appends.
+        :type poll_interval: float
+        :return: Iterator on ordered camera images.
+        :rtype: Iterator[CameraImage]
+        :raise OSError: When inotify isn't available.
         """
-        dcf_dirs = self._order_dcf_dir(self.dcim_folder.dirs())
-        pic_files = []
+        with Inotify() as inotify:
+            inotify.add_watch(self.dcim_folder, IN_CREATE | IN_MOVED_TO)  # new DCF folders
+            for dcf_dir in self.dcim_folder.dirs():
+                inotify.add_watch(dcf_dir, IN_CLOSE_WRITE | IN_MOVED_TO)
+
+            # watches are set before listing, pictures completed meanwhile are listed or received
+            yield from self.iter_images()
+            pic_files = self.get_images()
+            self._watch_dcf_dirs(inotify)
+
+            changed = True  # pictures completed since the listing are appended at once
+            last_completed = time.monotonic()
+            while True:
+                if changed:
+                    appended = self._append_completed_pictures(pic_files)
+                    if appended is None:
+                        break
+                    yield from appended
+                if time.monotonic() - last_completed >= idle_timeout:
+                    break
+
+                changed = False
+                for event in inotify.read_events(timeout=poll_interval):
+                    if event.mask & IN_Q_OVERFLOW:
+                        self.logger.warning("Events of %s were lost, DCF folders are listed again", self.dcim_folder)
+                        self._watch_dcf_dirs(inotify)
+                        changed = True
+                    elif event.mask & IN_ISDIR:
+                        if self._profile.is_folder(Path(event.path).basename()):
+                            inotify.add_watch(event.path, IN_CLOSE_WRITE | IN_MOVED_TO)
+                            self._scan_dcf_dir(Path(event.path))  # pictures completed before the watch was added
+                            changed = True
+                    else:
+                        dcf_dir, name = os.path.split(event.path)
+                        index = self._naming.index_of(name)
+                        if index is not None and Path(dcf_dir) in self._dcf_dir_indexes:
+                            self._dcf_dir_indexes[Path(dcf_dir)][index] = name
+                            changed = True
+                if changed:
+                    last_completed = time.monotonic()
+
+        self._dcf_dir_indexes = None
+        self.logger.debug("End of %s watch, %i pictures", self.dcim_folder, len(pic_files))
+
+    def _watch_dcf_dirs(self, inotify: Inotify):
+        """
+        Watch all DCF folders and list them again.
+
+        :param inotify: Inotify instance used by the watch.
+        :type inotify: Inotify
+        """
+        self._dcf_dir_indexes = {}
+        self._dcf_dir_others = {}
+        for dcf_dir in self.dcim_folder.dirs():
+            inotify.add_watch(dcf_dir, IN_CLOSE_WRITE | IN_MOVED_TO)  # same watch if it already exists
+            self._scan_dcf_dir(dcf_dir)
+
+    def _append_completed_pictures(self, pic_files: CameraImageList) -> Optional[List[CameraImage]]:
+        """
+        Order the pictures of the watched DCF folders again, from the folders indexes (nothing is listed), and append
+        the new ones to pic_files.
+
+        :param pic_files: Pictures given so far.
+        :type pic_files: CameraImageList
+        :return: The appended pictures, None if the new order doesn't continue the given pictures.
+        :rtype: List[CameraImage]
+        """
+        report = FetchReport(dcim_folder=self.dcim_folder, profile=self._profile.name)
+        walked = [(dcf_dir, pics) for dcf_dir, pics in self._walk_dcf_dirs(self._order_dcf_dir(list(self._dcf_dir_indexes)), report=report)
+                  if len(pics) > 0]
+        given = pic_files.segments()
+
+        for k, (dcf_dir, indexes) in enumerate(given):
+            is_last = k == len(given) - 1
+            if k >= len(walked) or walked[k][0] != dcf_dir or len(walked[k][1]) < len(indexes) or \
+                    (not is_last and len(walked[k][1]) != len(indexes)) or \
+                    not np.array_equal(walked[k][1][0:len(indexes)], indexes):
+                self.logger.warning("Pictures of %s were completed out of order, the watch ends, they need a full fetch",
+                                    dcf_dir)
+                return None
+
+        new_folders = walked[len(given):]
+        if len(given) > 0 and len(walked[len(given) - 1][1]) > len(given[-1][1]):
+            new_folders.insert(0, (given[-1][0], walked[len(given) - 1][1][len(given[-1][1]):]))
+
+        self.report = report  # the watched folders are ordered again from scratch
+        start = len(pic_files)
+        for dcf_dir, pics in new_folders:
+            pic_files.add_folder(dcf_dir, pics)
+        if len(pic_files) > start:
+            self._cache_ts = None
+            self.logger.debug("%i completed pictures appended to %s", len(pic_files) - start, self.dcim_folder)
+
+        return pic_files[start:]
+
+    def _new_image_list(self) -> CameraImageList:
+        """
+        :return: An empty camera images list, using the current DCF name formatting.
+        :rtype: CameraImageList
+        """
+        return CameraImageList.from_folders(
+            naming=self._naming, folders_indexes=[], ts_cache=self._ts_cache,
+            archive=self.archive)
+
+    def _fetch_folders(self, pic_files: CameraImageList) -> Iterator[int]:
+        """
+        Append the DCF folders pictures to a camera images list, one folder at a time.
+        Pictures timestamps are loaded from the pictures index before their folder is given.
+
+        :param pic_files: Where pictures are appended.
+        :type pic_files: CameraImageList
+        :return: Iterator on the position of each folder first picture in pic_files.
+        :rtype: Iterator[int]
+        """
+        if self._manifest is not None and self._manifest.is_up_to_date(self.dcim_folder):
+            yield from self._fetch_folders_from_manifest(pic_files)
+            return
+
+        self._dcf_dir_indexes = {}  # folders are scanned again on each fetch
+        self._dcf_dir_others = {}
+        if self._manifest is not None:  # read before listing, so that changes made during the walk invalidate the manifest
+            dcim_mtime = os.stat(self.dcim_folder).st_mtime_ns
+        dcf_dirs = self._order_dcf_dir(self._list_dcf_dirs())
+        if self._manifest is not None:
+            folders_mtime = DcimManifest.folders_mtime_of(dcim_folder=self.dcim_folder, dcf_dirs=dcf_dirs, dcim_mtime=dcim_mtime)
+        manifest_pictures = []
         self.logger.debug(" dcf_dirs ")
         self.logger.debug(dcf_dirs)
 
+        self.report = FetchReport(dcim_folder=self.dcim_folder, profile=self._profile.name)
         if len(dcf_dirs) == 0:
-            return []
+            return
+
+        for dcf_dir, pics in self._walk_dcf_dirs(dcf_dirs, report=self.report):
+            start = len(pic_files)
+            pic_files.add_folder(dcf_dir, pics)
+            folder_pics = pic_files[start:]
+            sizes = None
+            if self._manifest is not None:
+                folder_manifest = [(img.path, os.stat(img.path).st_size) for img in folder_pics]  # in series order
+                manifest_pictures.extend((os.path.relpath(path, self.dcim_folder), size) for path, size in folder_manifest)
+                sizes = dict(folder_manifest)
+            if self._pictures_index is not None:
+                self._load_timestamps_from_index(folder_pics, sizes=sizes)
+            yield start
+
+        self._dcf_dir_indexes = None  # file names aren't needed anymore
+        self._dcf_dir_others = None
+        self._log_anomalies()
+        if self._manifest is not None:
+            self._manifest.save(
+                naming=self._naming,
+                folders_mtime=folders_mtime,
+                pictures=manifest_pictures,
+                dropped_files=[os.path.relpath(path, self.dcim_folder) for path in self.report.dropped_files])
+
+    def _log_anomalies(self):
+        """
+        Log the pictures of the last fetch report which weren't fetched.
+        """
+        if self.report.has_anomalies():
+            self.logger.error("%i pictures of %s weren't fetched, first ones : %s", len(self.report.dropped_files),
+                              self.dcim_folder, ", ".join(self.report.dropped_files[0:10]))
 
-        next_index = GORPRO_IMG_START_INDEX
+    def _walk_dcf_dirs(self, dcf_dirs: List[Path], report: FetchReport = None) -> Iterator[Tuple[Path, List[int]]]:
+        """
+        Order the pictures of DCF folders, folder by folder. A folder is given before the next one is listed.
+
+        :param dcf_dirs: Ordered DCF folders.
+        :type dcf_dirs: List[Path]
+        :param report: Report the folders, series breaks and dropped files are added to, from the folders scans. Optional.
+        :type report: FetchReport
+        :return: Iterator on the folders and their ordered pictures file indexes.
+        :rtype: Iterator[Tuple[Path, List[int]]]
+        """
+        if not self._profile.dcf_series:  # names are sorted in capture order, no serie to follow
+            for dcf_dir in dcf_dirs:
+                pics = self._scan_dcf_dir(dcf_dir)
+                ordered = sorted(pics, key=lambda index: self._profile.file_key(pics[index]))
+                if report is not None:
+                    report.add_folder(dcf_dir, ordered, series=False)
+                yield (dcf_dir, ordered)
+            return
+
+        next_index = self._profile.start_index
         for k_dir in range(0, len(dcf_dirs)):
             next_dcf_folder = dcf_dirs[k_dir + 1] if k_dir + 1 < len(dcf_dirs) else None
             next_index, pics = self._fetch_pic_files_from_dcf_dir(
                 dcf_dir=dcf_dirs[k_dir],
                 start_index=next_index)
 
-            pic_files.extend(pics)
-
-            # setting next index to initial on if the serie doesn't continue in the next folder
-            if next_dcf_folder is not None and not self._check_serie_continue_in_folder(next_index=next_index, next_dcf_folder_path=next_dcf_folder):
-                next_index = GORPRO_IMG_START_INDEX
+            if report is not None:  # scans are kept by the fetch, no file is listed again
+                report.add_folder(dcf_dirs[k_dir], pics, scanned=(self._dcf_dir_indexes or {}).get(dcf_dirs[k_dir]),
+                                  others=(self._dcf_dir_others or {}).get(dcf_dirs[k_dir]))
+            yield (dcf_dirs[k_dir], pics)
+
+            if next_dcf_folder is None:
+                continue
+            if self._naming.is_rolled_over(next_index):
+                # last index (9999) reached, the camera goes on in the next folder from its lowest index (0 or 1)
+                next_index = min(self._scan_dcf_dir(next_dcf_folder), default=self._profile.start_index)
+            elif not self._check_serie_continue_in_folder(next_index=next_index, next_dcf_folder_path=next_dcf_folder):
+                # setting next index to initial on if the serie doesn't continue in the next folder
+                next_index = self._profile.start_index
+
+    def _fetch_folders_from_manifest(self, pic_files: CameraImageList) -> Iterator[int]:
+        """
+        Append ordered pictures from the DCIM manifest, without walking the DCIM folder.
 
-        return pic_files
+        :param pic_files: Where pictures are appended.
+        :type pic_files: CameraImageList
+        :return: Iterator on the position of each folder first picture in pic_files.
+        :rtype: Iterator[int]
+        """
+        dcim_folder = Path(self.dcim_folder)
+        folders_pictures = []  # type: List[Tuple[Path, List[int], List[int]]]  # folder, file indexes, sizes
+        for rel_path, size in self._manifest.pictures:
+            folder, name = os.path.split(rel_path)
+            if len(folders_pictures) == 0 or folders_pictures[-1][0] != dcim_folder / folder:
+                folders_pictures.append((dcim_folder / folder, [], []))
+            folders_pictures[-1][1].append(self._naming.index_of(name))
+            folders_pictures[-1][2].append(size)
+        self.logger.debug("%i pictures loaded from DCIM manifest %s", len(self._manifest), self._manifest.manifest_path)
+
+        # series breaks are found again from the pictures indexes, dropped files are the ones of the walk
+        self.report = FetchReport(dcim_folder=self.dcim_folder, profile=self._profile.name)
+        self.report.dropped_files = [dcim_folder / rel_path for rel_path in self._manifest.dropped_files]
+        self._log_anomalies()
+        for folder, file_indexes, folder_sizes in folders_pictures:
+            self.report.add_folder(folder, file_indexes)
+            start = len(pic_files)
+            pic_files.add_folder(folder, file_indexes)
+            if self._pictures_index is not None:
+                folder_pics = pic_files[start:]
+                self._load_timestamps_from_index(folder_pics, sizes={img.path: size for img, size in zip(folder_pics, folder_sizes)})
+            yield start
+
+    def _load_timestamps_from_index(self, pic_files: List[CameraImage], sizes: Dict[Path, int] = None):
+        """
+        Set camera images timestamps and exif tags from the pictures index, so that their exif is not read.
+        Pictures which aren't indexed (or have a different size) are left untouched.
 
-    def get_images(self) -> List[CameraImage]:
+        :param pic_files: Camera images.
+        :type pic_files: List[CameraImage]
+        :param sizes: Known pictures sizes (from the DCIM manifest), read from the files when not given.
+        :type sizes: Dict[Path, int]
+        """
+        index_root = self._pictures_index.index_path.parent
+        nb_indexed = 0
+        for img in pic_files:
+            try:
+                rel_path = index_root.relpathto(img.path)
+                size = img.path.getsize() if sizes is None else sizes[img.path]
+            except OSError:
+                continue
+            ts = self._pictures_index.get_timestamp(rel_path=rel_path, size=size)
+            if ts is not None:
+                img._ts = ts
+                img._exif_tags = self._pictures_index.get_exif_tags(rel_path=rel_path, size=size, names=list(EXIF_EXTRA_TAGS))
+                nb_indexed += 1
+
+        self.logger.debug("%i/%i pictures timestamps loaded from index %s", nb_indexed, len(pic_files), self._pictures_index.index_path)
+
+    def get_images(self) -> CameraImageList:
         """
         Returns fetch images if they are already fetched get it from cache.
         Otherwise fetch same and save them to a cache.
 
         :return: Ordered by gopro order list of camera images.
-        :rtype: List[CameraImage]
+        :rtype: CameraImageList
         """
         if self._cache_camimg is None:
             self._cache_camimg = self.fetch_images()
 
         return self._cache_camimg
 
+    def get_report(self) -> FetchReport:
+        """
+        Returns the report of the pictures fetch (fetched if they aren't), with the first and last pictures
+        timestamps if they are already known (nothing is read).
+
+        :return: The camera fetch report.
+        :rtype: FetchReport
+        """
+        imgs = self.get_images()
+        if self.report is None:  # cached pictures weren't fetched by this fetcher
+            self.report = FetchReport(dcim_folder=self.dcim_folder, profile=self._profile.name)
+        if len(imgs) > 0:
+            self.report.first_ts, self.report.last_ts = imgs[0]._ts, imgs[-1]._ts
+
+        return self.report
+
+    def load_timestamps_from_mtime(self, nb_samples: int=MTIME_TS_NB_SAMPLES, max_diff: int=MTIME_TS_MAX_DIFF) -> bool:
+        """
+        Use pictures modification time as timestamp (GoPro set it to the capture time, kept by rsync -a).
+        A random sample of pictures exif timestamps is read first, if one of them disagree with its modification time
+        nothing is changed and timestamps will be read from exif.
+
+        :param nb_samples: Number of pictures exif checked.
+        :type nb_samples: int
+        :param max_diff: Difference between exif and modification time from which modification times are rejected, in seconds.
+        :type max_diff: int
+        :return: True if modification times are used.
+        :rtype: bool
+        """
+        imgs = [img for img in self.get_images() if img._ts is None]
+        if len(imgs) == 0:
+            return True
+
+        dirs_mtimes = {}  # dcf dir -> {file name: mtime}, each folder is listed once
+        mtimes = []
+        for img in imgs:
+            dcf_dir, name = img.path.parent, img.path.basename()
+            if dcf_dir not in dirs_mtimes:
+                dirs_mtimes[dcf_dir] = self._list_file_mtimes(dcf_dir)
+            mtimes.append(dirs_mtimes[dcf_dir][name])
+
+        for i in random.sample(range(0, len(imgs)), min(nb_samples, len(imgs))):
+            exif_ts = imgs[i].get_timestamp()
+            if abs(exif_ts - mtimes[i]) >= max_diff:  # same strict bound as the lot maker TIME_MARGING
+                self.logger.warning(
+                    "Modification time of %s differs from its exif timestamp (%i != %i), using exif timestamps for %s",
+                    imgs[i].path, mtimes[i], exif_ts, self.dcim_folder)
+                return False
+
+        for img, mtime in zip(imgs, mtimes):
+            if img._ts is None:
+                img._ts = mtime
+        self._cache_ts = None
+
+        self.logger.debug("Using modification time as timestamp for %i pictures of %s", len(imgs), self.dcim_folder)
+        return True
+
+    def get_timestamps(self) -> np.ndarray:
+        """
+        Returns the timestamps of all pictures, in the same order as get_images. Memoized.
+
+        :return: Contiguous array of timestamps, one per picture.
+        :rtype: np.ndarray (int64)
+        """
+        if self._cache_ts is None:
+            imgs = self.get_images()
+            if isinstance(imgs, CameraImageList):
+                self._cache_ts = imgs.get_timestamps()
+            else:
+                self._cache_ts = np.fromiter((img.get_timestamp() for img in imgs), dtype=np.int64, count=len(imgs))
+
+        return self._cache_ts
+
     def get_pic(self, index: int) -> CameraImage:
         """
         Return picture at a specific index.
@@ -261,3 +740,7 @@ class MissingDcfFolderError(OpvImportError):
 class MissingPictureFileError(OpvImportError):
     """ Raise when there is no picture file inside DCF folder """
     pass
+
+class UnknownNamingError(OpvImportError):
+    """ Raised when a camera pictures names don't follow one of the naming profiles """
+    pass
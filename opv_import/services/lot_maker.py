@@ -16,14 +16,27 @@
 # Email: team@openpathview.fr
 # Description: Lot Maker, takes CSV en pictures and manage them to get coherent set of datas.
 
+import os
+import time
+import itertools
 import logging
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from path import Path
-from opv_import.helpers import indexes_walk
-from opv_import.services import CameraImageFetcher
-from typing import List, Iterator, Dict, Tuple, NamedTuple
-from opv_import.model import ImageSet, RederbroMeta, Lot, CameraImage, OpvImportError, CameraSetPartition, LotPartition
+from opv_import.helpers import indexes_walk, ThreadPool, TimestampCache, LazyTimestamps, PictureArchive
+from opv_import.services import CameraImageFetcher, ArchiveCameraImageFetcher
+from typing import List, Iterator, Dict, Tuple, NamedTuple, Callable, Optional
+from opv_import.model import ImageSet, RederbroMeta, Lot, CameraImage, OpvImportError, CameraSetPartition, LotPartition, \
+    FetchReport
 from opv_import.helpers import MetaCsvParser
-from opv_import.config import APN_NUM_TO_APN_OUTPUT_DIR
+from opv_import.helpers import read_scheduler, pictures_utils
+from opv_import.helpers.set_assignment import assign_sets, NO_PICTURE
+from opv_import.helpers.offset_estimation import estimate_offset, choose_reference
+from opv_import.helpers.reference_trials import ReferenceTrials
+from opv_import.helpers.monotonic_segments import find_breaks, segment_ends, reached_ends
+from opv_import.config import APN_NUM_TO_APN_OUTPUT_DIR, APN_ARCHIVE_EXTENSIONS, EXIF_EXTRA_TAGS
 
 import datetime
 def dt(ts):
@@ -34,18 +47,106 @@ CAM_DCIM_PATH = APN_NUM_TO_APN_OUTPUT_DIR+"/DCIM"
 REF_SEARCH_NB_LOT_GENERATED = 30  # default number lot generated for camera set reference search
 REF_SEARCH_MAX_INCOMPLET_CONSECUTIVE_SET = 7  # Maximum number of accepted consecutive incomplete sets during reference search
 REF_SEARCH_MAX_INCOMPLET_SETS = 10  # Maximum total number of incomplete sets during reference search
+REF_SEARCH_NUMBER_OF_WORKERS = 1  # default number of processes trying reference candidates
+REF_SEARCH_CANDIDATES_PER_TASK = 16  # reference candidates tried by a worker task, most are rejected after a few sets
+REF_SEARCH_TASKS_PER_WORKER = 2  # worker tasks submitted at once per worker
+REF_SEARCH_OFFSET_SAMPLE_SIZE = 256  # number of pictures of each camera read from the partition start to estimate offsets
 
 THRESHOLD_MAX_CONSECUTIVE_INCOMPLETE_SETS = 10
 THRESHOLD_WINDOW_SIZE = 10
 THRESHOLD_WINDOW_MAX_ERRORS = 6
 SUCCESS_WINDOW_SIZE_NEXT_PARTITION_START_SAVING_POINT = 10
 
+FETCH_NUMBER_OF_WORKERS = 1  # default number of cameras fetched simultaneously
+PREFETCH_NUMBER_OF_WORKERS = 4  # default number of threads reading pictures timestamps during prefetch
+PREFETCH_CHUNK_SIZE = 200  # number of pictures read by a prefetch task
+PREFETCH_WATCH_CHUNK_SIZE = 10  # number of pictures read by a prefetch task when following copies, they come slowly
+PREFETCH_BACKEND_THREAD = "thread"    # threads, IO bound reads (cold page cache)
+PREFETCH_BACKEND_PROCESS = "process"  # processes, CPU bound exif parsing isn't limited by the GIL (warm page cache)
+PREFETCH_BACKEND_AUTO = "auto"        # process backend if pictures are in the page cache, thread backend otherwise
+PREFETCH_BACKENDS = [PREFETCH_BACKEND_THREAD, PREFETCH_BACKEND_PROCESS, PREFETCH_BACKEND_AUTO]
+PREFETCH_CACHED_RATIO = 0.8  # minimum rate of sampled pictures in the page cache to use the process backend
+
 ImageSetWithFetcherIndexes = NamedTuple('ImageSetWithFetcherIndexes', [('fetcher_next_indexes', List[int]), ('set', ImageSet)])
 LotWithIndexes = NamedTuple('LotWithIndexes', [('next_meta_index', int), ('next_img_set_index', int), ('lot', Lot)])
+ReferenceTrialResult = NamedTuple('ReferenceTrialResult', [
+    ('images_sets', List[ImageSet]),  # saved sets (success windows), None when tried by a worker process
+    ('sets_indexes', List[List[int]]),  # pictures indexes of the saved sets, NO_PICTURE for missing cameras
+    ('fetcher_next_indexes', List[int]),  # next partition start, the partition start if the reference is rejected
+    ('path_indexes', List[List[int]]),  # generator next indexes from the candidate and after each set, None if accepted
+    ('break_reason', str),
+    ('number_of_incomplete_sets', int),
+    ('number_of_complete_sets', int),
+    ('consecutive_incomplete_sets', int)])
+
+
+_reference_search_lot_maker = None  # lot maker of a reference search worker process, see _init_reference_search_worker
+
+
+def _init_reference_search_worker(lot_maker: Optional['LotMaker']):
+    """
+    Set the lot maker of the reference search workers, before they are forked : the lot maker, its fetchers and the
+    timestamps already read are inherited, not pickled (process pool initializers need python 3.7).
+
+    :param lot_maker: Lot maker searching references, None once the search is done.
+    """
+    global _reference_search_lot_maker
+    _reference_search_lot_maker = lot_maker
+
+
+def _try_references_in_worker(candidates: List[List[int]], start_indexes: List[int], trial_args: Dict) -> List[ReferenceTrialResult]:
+    """
+    Process pool task, try reference candidates in order until one is accepted (see LotMaker._try_reference).
+    Module level function so that it can be pickled.
+
+    :param candidates: Reference candidates indexes.
+    :param start_indexes: Partition start.
+    :param trial_args: Thresholds and generation options of LotMaker._try_reference.
+    :return: The trials results, up to the accepted candidate. Sets are only returned as pictures indexes
+             (images_sets is None).
+    """
+    lot_maker = _reference_search_lot_maker
+    trials = []
+    for cam_indexes in candidates:
+        trial = lot_maker._try_reference(
+            cam_set=lot_maker.get_images(cam_indexes), cam_indexes=cam_indexes, start_indexes=start_indexes, **trial_args)
+        trials.append(trial._replace(images_sets=None))
+        if trial.fetcher_next_indexes != start_indexes:
+            break
+
+    return trials
+
+
+def _read_timestamps_chunk(
+        pics_paths: List[str], read_ahead: bool) -> Tuple[np.ndarray, List[Dict[str, str]], List[Tuple[int, str]]]:
+    """
+    Process pool task, read the timestamps (and exif tags) of a chunk of pictures.
+    Module level function so that it can be pickled.
+
+    :param pics_paths: Pictures locations.
+    :param read_ahead: Give read-ahead hints to the kernel.
+    :return: int64 timestamps array (0 where reading failed), exif tags (None where reading failed)
+             and failures as (chunk index, error representation).
+    """
+    if read_ahead:
+        read_scheduler.advise_will_need(pics_paths)
+
+    timestamps = np.zeros(len(pics_paths), dtype=np.int64)
+    tags = [None] * len(pics_paths)
+    errors = []
+    for i, path in enumerate(pics_paths):
+        try:
+            timestamps[i], tags[i] = pictures_utils.read_exif(path, tags=EXIF_EXTRA_TAGS)
+        except (OSError, KeyError, ValueError) as err:
+            errors.append((i, repr(err)))
+
+    return timestamps, tags, errors
 
 class LotMaker:
 
-    def __init__(self, rederbro_csv_path: Path, pictures_path: Path, nb_cams: int = 6):
+    def __init__(
+            self, rederbro_csv_path: Path, pictures_path: Path, nb_cams: int = 6, ts_cache: TimestampCache = None,
+            use_manifest: bool = False):
         """
         Init a lot maker with rederbro CSV and pictures path.
 
@@ -56,31 +157,457 @@ class LotMaker:
         :type pictures_path: Path
         :param nb_cams: Number of cameras, default is 6 (rederbro backpack).
         :type nb_cams: int
+        :param ts_cache: Persistent pictures timestamps cache, optional.
+        :type ts_cache: TimestampCache
+        :param use_manifest: If True, cameras fetchers use DCIM manifests and don't walk unchanged DCIM folders.
+        :type use_manifest: bool
         """
         self.rederbro_csv_path = rederbro_csv_path
         self.pictures_path = pictures_path
         self.nb_cams = nb_cams
+        self.ts_cache = ts_cache
+        self.use_manifest = use_manifest
         self.fetchers = None
+        self.fetch_wall_times = {}  # type: Dict[int, float]  # camera number -> fetching time (s)
         self.rederbrometa = None
+        self._lazy_ts = None
+        self._cams_breaks = None  # type: List[np.ndarray]
+        self.reference_trials = ReferenceTrials()  # rejected reference candidates, see generate_cam_partition
 
         self.logger = logging.getLogger(self.__module__ + "." + self.__class__.__name__)
 
-    def load_cam_images(self) -> List[CameraImageFetcher]:
+    def load_cam_images(self, number_of_workers: int=FETCH_NUMBER_OF_WORKERS) -> List[CameraImageFetcher]:
         """
         Load camera images from pictures_path/APNxx/DCIM. Using camera fetcher.
         Lazy only start camera image fetchers once and fetch the images.
+        Fetching time of each camera is kept in fetch_wall_times.
+
+        :param number_of_workers: Number of cameras DCIM folders fetched simultaneously (threads), cameras are often
+                                  on different cards or network mounts.
+        :type number_of_workers: int
+        :raise MissingDcfFolderError, MissingPictureFileError: Error of the first failing camera, raised once all
+                                                                cameras were fetched.
         """
         if self.fetchers is not None:
             return self.fetchers
 
-        self.fetchers = []
-        for no in range(0, self.nb_cams):
-            fetcher = CameraImageFetcher(dcim_folder=self.pictures_path / CAM_DCIM_PATH.format(no))
-            fetcher.fetch_images()
-            self.fetchers.append(fetcher)
+        def load(no: int) -> CameraImageFetcher:
+            start = time.perf_counter()
+            try:
+                fetcher = self._make_fetcher(no)
+                fetcher.get_images()  # fetched pictures are kept by the fetcher
+                return fetcher
+            finally:
+                self.fetch_wall_times[no] = time.perf_counter() - start
+
+        self.fetch_wall_times = {}
+        if number_of_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(number_of_workers, self.nb_cams)) as executor:
+                futures = [executor.submit(load, no) for no in range(0, self.nb_cams)]
+            # executor exit waits for all cameras, errors are raised in camera order
+            for no, future in enumerate(futures):
+                if future.exception() is not None:
+                    self.logger.error("Can't fetch camera %i images : %r", no, future.exception())
+            fetchers = [future.result() for future in futures]
+        else:
+            fetchers = [load(no) for no in range(0, self.nb_cams)]
+
+        self.logger.debug("Cameras fetching wall times (s) : %r", self.fetch_wall_times)
+        self.fetchers = fetchers
 
         return self.fetchers
 
+    def close(self):
+        """
+        Release the memory maps of the cameras archives read in place (archives are mapped again if read afterwards).
+        """
+        for fetcher in self.fetchers or []:
+            if fetcher.archive is not None:
+                fetcher.archive.close()
+
+    def _make_fetcher(self, no: int) -> CameraImageFetcher:
+        """
+        Instantiate the fetcher of a camera, pictures aren't fetched.
+        When there is no APNx/DCIM folder, the camera archive (APNx.tar or APNx.zip) is read in place if it exists.
+
+        :param no: Camera number.
+        :type no: int
+        :return: The camera fetcher.
+        :rtype: CameraImageFetcher
+        """
+        dcim_folder = self.pictures_path / CAM_DCIM_PATH.format(no)
+        if not dcim_folder.exists():
+            for ext in APN_ARCHIVE_EXTENSIONS:
+                archive_path = self.pictures_path / (APN_NUM_TO_APN_OUTPUT_DIR.format(no) + ext)
+                if archive_path.isfile():
+                    self.logger.debug("Reading camera %i pictures from archive %s", no, archive_path)
+                    return ArchiveCameraImageFetcher(archive=PictureArchive(archive_path=archive_path))
+
+        return CameraImageFetcher(dcim_folder=dcim_folder, ts_cache=self.ts_cache, use_manifest=self.use_manifest)
+
+    def prefetch_timestamps(
+            self,
+            number_of_workers: int=PREFETCH_NUMBER_OF_WORKERS,
+            on_progress_listener: Callable[[float], None]=None,
+            read_order: str=read_scheduler.READ_ORDER_INDEX,
+            read_ahead: bool=False,
+            backend: str=PREFETCH_BACKEND_THREAD,
+            stream: bool=False,
+            watch_idle_timeout: float=None):
+        """
+        Read all cameras pictures timestamps at once, using a pool of threads or processes.
+        Optional, timestamps are otherwise lazily read the first time a camera image is used.
+        When streaming, cameras pictures mustn't be loaded yet : they are read while the DCF folders are listed,
+        oldest first.
+
+        :param number_of_workers: Number of threads (or processes) reading the pictures simultaneously.
+        :type number_of_workers: int
+        :param on_progress_listener: A lambda that will be executed when progression evolve, with the progression rate.
+        :type on_progress_listener: Callable[[float], None]
+        :param read_order: Pictures reading order, one of read_scheduler.READ_ORDERS. Inode or extent (physical position)
+                           orders reduce seeks on rotational storage.
+        :type read_order: str
+        :param read_ahead: If True, each task hints the kernel (posix_fadvise) the headers of its pictures will be read.
+        :type read_ahead: bool
+        :param backend: One of PREFETCH_BACKENDS.
+        :type backend: str
+        :param stream: If True and cameras pictures aren't loaded, pictures are read by threads as soon as their
+                       folder is listed. read_order and backend don't apply, progression is relative to the pictures
+                       listed so far.
+        :type stream: bool
+        :param watch_idle_timeout: When streaming, DCIM folders still being copied are followed until no picture is
+                                   completed during this time (seconds). Not followed if None.
+        :type watch_idle_timeout: float
+        """
+        if backend not in PREFETCH_BACKENDS:
+            raise ValueError("Unknown prefetch backend {}, should be one of {}".format(backend, PREFETCH_BACKENDS))
+
+        if stream and self.fetchers is None:
+            self._prefetch_streaming(number_of_workers=number_of_workers, read_ahead=read_ahead,
+                                     on_progress_listener=on_progress_listener, watch_idle_timeout=watch_idle_timeout)
+            return
+
+        self.load_cam_images()
+
+        cam_imgs = [img for f in self.fetchers for img in f.get_images() if img._ts is None]
+        nb_of_imgs = len(cam_imgs)
+
+        if nb_of_imgs == 0:
+            return
+
+        if any(img.archive is not None for img in cam_imgs):
+            # archives members are read through the archives (no file per picture), in archive order
+            backend, read_order = PREFETCH_BACKEND_THREAD, read_scheduler.READ_ORDER_INDEX
+        elif backend == PREFETCH_BACKEND_AUTO:
+            backend = self._select_prefetch_backend(cam_imgs=cam_imgs, number_of_workers=number_of_workers)
+        self.logger.debug("Prefetching %i pictures timestamps with %i %s workers, read order : %s",
+                          nb_of_imgs, number_of_workers, backend, read_order)
+
+        cam_imgs = [cam_imgs[i] for i in read_scheduler.order_by_locality([img.path for img in cam_imgs], read_order=read_order)]
+        chunks = [cam_imgs[i:i + PREFETCH_CHUNK_SIZE] for i in range(0, nb_of_imgs, PREFETCH_CHUNK_SIZE)]
+
+        progress = {'nb_read': 0}
+        progress_lock = threading.Lock()
+
+        def on_pictures_read(nb_read: int):
+            with progress_lock:
+                progress['nb_read'] += nb_read
+                progression_rate = progress['nb_read'] / nb_of_imgs
+                if on_progress_listener is not None:
+                    on_progress_listener(progression_rate)
+
+        if backend == PREFETCH_BACKEND_PROCESS:
+            self._prefetch_with_processes(chunks=chunks, number_of_workers=number_of_workers, read_ahead=read_ahead,
+                                          on_pictures_read=on_pictures_read)
+        else:
+            self._prefetch_with_threads(chunks=chunks, number_of_workers=number_of_workers, read_ahead=read_ahead,
+                                        on_pictures_read=on_pictures_read)
+
+        if self.ts_cache is not None:
+            self.ts_cache.flush()
+
+        self.logger.debug("Prefetched pictures timestamps")
+
+    def _prefetch_streaming(self, number_of_workers: int, read_ahead: bool, on_progress_listener: Callable[[float], None],
+                            watch_idle_timeout: float=None):
+        """
+        Load cameras pictures one camera after the other, and read their timestamps with a thread pool as soon as
+        they are listed. Fetching time of each camera is kept in fetch_wall_times.
+
+        :param number_of_workers: Number of threads.
+        :param read_ahead: Give read-ahead hints to the kernel.
+        :param on_progress_listener: Called with the progression rate, relative to the pictures listed so far.
+        :param watch_idle_timeout: If set, all cameras DCIM folders are watched at the same time (see
+                                   CameraImageFetcher.watch_images) until no picture is completed during this time.
+        """
+        progress = {'nb_read': 0, 'nb_listed': 0}
+        progress_lock = threading.Lock()
+
+        def on_pictures_read(nb_read: int):
+            with progress_lock:
+                progress['nb_read'] += nb_read
+                progression_rate = progress['nb_read'] / progress['nb_listed']
+                if on_progress_listener is not None:
+                    on_progress_listener(progression_rate)
+
+        pool = ThreadPool(number_of_workers=number_of_workers)
+        pool.start()
+
+        def add_chunk(chunk: List[CameraImage]):
+            with progress_lock:
+                progress['nb_listed'] += len(chunk)
+            self._prefetch_with_threads(chunks=[chunk], number_of_workers=number_of_workers, read_ahead=read_ahead,
+                                        on_pictures_read=on_pictures_read, pool=pool)
+
+        chunk_size = PREFETCH_CHUNK_SIZE if watch_idle_timeout is None else PREFETCH_WATCH_CHUNK_SIZE
+
+        def stream(no: int) -> CameraImageFetcher:
+            start = time.perf_counter()
+            try:
+                fetcher = self._make_fetcher(no)
+                if watch_idle_timeout is None:
+                    images = fetcher.iter_images()
+                else:
+                    images = fetcher.watch_images(idle_timeout=watch_idle_timeout)
+                chunk = []
+                for img in images:
+                    if img._ts is None:
+                        chunk.append(img)
+                    if len(chunk) == chunk_size:
+                        add_chunk(chunk)
+                        chunk = []
+                if len(chunk) > 0:
+                    add_chunk(chunk)
+                return fetcher
+            finally:
+                self.fetch_wall_times[no] = time.perf_counter() - start
+
+        try:
+            if watch_idle_timeout is None:
+                fetchers = [stream(no) for no in range(0, self.nb_cams)]
+            else:  # cameras are copied simultaneously, they are watched simultaneously
+                with ThreadPoolExecutor(max_workers=self.nb_cams) as executor:
+                    futures = [executor.submit(stream, no) for no in range(0, self.nb_cams)]
+                fetchers = [future.result() for future in futures]
+        finally:
+            pool.stop()  # waits for the queued reads
+
+        self.fetchers = fetchers
+        if self.ts_cache is not None:
+            self.ts_cache.flush()
+
+        self.logger.debug("Cameras fetching wall times (s) : %r", self.fetch_wall_times)
+        self.logger.debug("Prefetched %i streamed pictures timestamps", progress['nb_listed'])
+
+    def _select_prefetch_backend(self, cam_imgs: List[CameraImage], number_of_workers: int) -> str:
+        """
+        Choose the prefetch backend : when pictures are in the page cache parsing exif is CPU bound and processes
+        scale, otherwise reads are IO bound and threads are enough (and cheaper).
+
+        :param cam_imgs: Pictures to be read.
+        :param number_of_workers: Number of workers.
+        :return: PREFETCH_BACKEND_PROCESS or PREFETCH_BACKEND_THREAD.
+        """
+        if number_of_workers < 2 or (os.cpu_count() or 1) < 2:
+            return PREFETCH_BACKEND_THREAD
+
+        ratio = read_scheduler.cached_ratio([img.path for img in cam_imgs])
+        self.logger.debug("Pictures page cache ratio : %s", ratio)
+        if ratio is not None and ratio >= PREFETCH_CACHED_RATIO:
+            return PREFETCH_BACKEND_PROCESS
+
+        return PREFETCH_BACKEND_THREAD
+
+    def _prefetch_with_threads(self, chunks: List[List[CameraImage]], number_of_workers: int, read_ahead: bool,
+                               on_pictures_read: Callable[[int], None], pool: ThreadPool=None):
+        """
+        Read pictures timestamps with a thread pool, camera images are updated by the workers.
+
+        :param chunks: Pictures, one task per chunk.
+        :param number_of_workers: Number of threads.
+        :param read_ahead: Give read-ahead hints to the kernel.
+        :param on_pictures_read: Called, from workers, with the number of pictures read.
+        :param pool: Started thread pool the tasks are added to, not waited for. A pool is made and waited for if None.
+        """
+        def generate_task(chunk: List[CameraImage]) -> Callable:
+            def task():
+                if read_ahead:
+                    read_scheduler.advise_will_need([img.path for img in chunk])
+
+                for img in chunk:
+                    try:
+                        img.get_timestamp()
+                    except (OSError, KeyError, ValueError) as err:  # will be raised again when the timestamp is used
+                        self.logger.warning("Can't prefetch timestamp of %s : %r", img.path, err)
+
+                on_pictures_read(len(chunk))
+            return task
+
+        if pool is not None:
+            for chunk in chunks:
+                pool.add_task(generate_task(chunk))
+            return
+
+        pool = ThreadPool(number_of_workers=number_of_workers)
+        pool.start()
+        for chunk in chunks:
+            pool.add_task(generate_task(chunk))
+        pool.stop()  # stop sentinels are queued after the tasks, so it waits until all of them are treated
+
+    def _prefetch_with_processes(self, chunks: List[List[CameraImage]], number_of_workers: int, read_ahead: bool,
+                                 on_pictures_read: Callable[[int], None]):
+        """
+        Read pictures timestamps with a process pool. Only paths are sent to the workers and they return
+        compact timestamps arrays, camera images are updated here.
+        Timestamps already in the timestamps cache aren't sent to the workers.
+
+        :param chunks: Pictures, one task per chunk.
+        :param number_of_workers: Number of processes.
+        :param read_ahead: Give read-ahead hints to the kernel.
+        :param on_pictures_read: Called with the number of pictures read.
+        """
+        if self.ts_cache is not None:
+            cached_chunks = []
+            for chunk in chunks:
+                missing = []
+                for img in chunk:
+                    try:
+                        img._ts = self.ts_cache.lookup(img.path)
+                    except OSError:
+                        img._ts = None
+                    if img._ts is None:
+                        missing.append(img)
+                on_pictures_read(len(chunk) - len(missing))
+                if len(missing) > 0:
+                    cached_chunks.append(missing)
+            chunks = cached_chunks
+
+        with ProcessPoolExecutor(max_workers=number_of_workers) as executor:
+            futures = {
+                executor.submit(_read_timestamps_chunk, [str(img.path) for img in chunk], read_ahead): chunk
+                for chunk in chunks}
+
+            for future in as_completed(futures):
+                chunk = futures[future]
+                timestamps, tags, errors = future.result()
+                failed = {i for i, _ in errors}
+                for i, err in errors:  # will be raised again when the timestamp is used
+                    self.logger.warning("Can't prefetch timestamp of %s : %s", chunk[i].path, err)
+
+                for i, img in enumerate(chunk):
+                    if i in failed:
+                        continue
+                    img._ts = int(timestamps[i])
+                    img._exif_tags = tags[i]
+                    if self.ts_cache is not None:
+                        self.ts_cache.put(pic_path=img.path, ts=img._ts, tags=img._exif_tags)
+
+                on_pictures_read(len(chunk))
+
+    def load_timestamps_from_mtime(self, nb_samples: int) -> List[bool]:
+        """
+        Use pictures modification times as timestamps for cameras where sampled exif timestamps agree with them.
+
+        :param nb_samples: Number of exif timestamps checked per camera.
+        :type nb_samples: int
+        :return: For each camera, True if modification times are used, False if exif will be read.
+        :rtype: List[bool]
+        """
+        self.load_cam_images()
+
+        return [f.load_timestamps_from_mtime(nb_samples=nb_samples, max_diff=TIME_MARGING) for f in self.fetchers]
+
+    def get_fetch_reports(self) -> List[FetchReport]:
+        """
+        Reports of the cameras fetch, from the DCIM folders walk already done (cameras are loaded if they aren't).
+
+        :return: One FetchReport per camera (position 0 for APN0).
+        :rtype: List[FetchReport]
+        """
+        self.load_cam_images()
+
+        return [f.get_report() for f in self.fetchers]
+
+    def check_fetch_reports(self) -> List[FetchReport]:
+        """
+        Check cameras fetch reports before making sets, so that missing pictures are known before any alignment.
+
+        :return: One FetchReport per camera (position 0 for APN0).
+        :rtype: List[FetchReport]
+        :raise DroppedPicturesError: When pictures of a camera weren't fetched (series breaks).
+        """
+        reports = self.get_fetch_reports()
+        failing = [no for no, report in enumerate(reports) if report.has_anomalies()]
+        if len(failing) > 0:
+            raise DroppedPicturesError(reports={no: reports[no] for no in failing})
+
+        return reports
+
+    def lazy_timestamps(self) -> List[LazyTimestamps]:
+        """
+        Timestamps of each camera, read on demand. Memoized.
+
+        :return: One LazyTimestamps per camera (position 0 for APN0).
+        :rtype: List[LazyTimestamps]
+        """
+        self.load_cam_images()
+        if self._lazy_ts is None:
+            self._lazy_ts = [
+                LazyTimestamps(pictures=f.get_images(), read_ts=lambda index, f=f: f.get_pic(index=index).get_timestamp())
+                for f in self.fetchers]
+
+        return self._lazy_ts
+
+    def timestamps_read_stats(self) -> Dict[str, int]:
+        """
+        Count timestamps read on demand (lazy timestamps), pictures which timestamp is known (exif, cache, index ...)
+        and those which weren't needed.
+
+        :return: Dict with nb_pictures, nb_read, nb_loaded and nb_avoided.
+        :rtype: Dict[str, int]
+        """
+        self.load_cam_images()
+        nb_pictures = sum(f.nb_pic() for f in self.fetchers)
+        nb_read = sum(lazy_ts.nb_reads for lazy_ts in self.lazy_timestamps())
+        nb_loaded = sum(1 for f in self.fetchers for index in range(0, f.nb_pic()) if f.get_pic(index=index)._ts is not None)
+
+        return {'nb_pictures': nb_pictures, 'nb_read': nb_read, 'nb_loaded': nb_loaded, 'nb_avoided': nb_pictures - nb_loaded}
+
+    def timestamp_matrix(self) -> List[np.ndarray]:
+        """
+        Timestamps of all pictures, for each camera. Memoized by the fetchers.
+
+        :return: One contiguous int64 array per camera (position 0 for APN0), ordered like the fetcher pictures.
+        :rtype: List[np.ndarray]
+        """
+        self.load_cam_images()
+
+        return [f.get_timestamps() for f in self.fetchers]
+
+    def back_in_time_breaks(self) -> List[np.ndarray]:
+        """
+        Pictures older than their previous one, for each camera (see monotonic_segments.find_breaks). Computed once
+        from the timestamps arrays, all timestamps are read. Memoized.
+
+        :return: One array of pictures indexes per camera (position 0 for APN0).
+        :rtype: List[np.ndarray]
+        """
+        if self._cams_breaks is None:
+            self._cams_breaks = [find_breaks(ts) for ts in self.timestamp_matrix()]
+            self.logger.debug("Cameras back in time breaks : %r", [breaks.tolist() for breaks in self._cams_breaks])
+
+        return self._cams_breaks
+
+    def segment_end_indexes(self, start_indexes: List[int]) -> List[int]:
+        """
+        :param start_indexes: Start indexes.
+        :type start_indexes: List[int]
+        :return: For each camera, the first picture going back in time after the start index, the number of pictures
+                 if none does.
+        :rtype: List[int]
+        """
+        return segment_ends(self.back_in_time_breaks(), start_indexes, [f.nb_pic() for f in self.fetchers])
+
     def get_images(self, indexes: List[int]) -> ImageSet:
         """
         Make an set of picture from indexes (for each camera).
@@ -101,7 +628,46 @@ class LotMaker:
             },
             number_of_pictures=self.nb_cams)
 
-    def cam_set_generator(self, reference_set: ImageSet, start_indexes: List[int]=None) -> Iterator[ImageSetWithFetcherIndexes]:
+    def _lonely_pictures_generator(
+            self, apn_no: int, leveled_ts: Dict[int, int], ref_ts: Dict[int, int],
+            n_i: List[int], last_indexes: List[int], end_indexes: List[int]=None) -> Iterator[ImageSetWithFetcherIndexes]:
+        """
+        Generate the sets of the pictures of a camera which are too old to be associated with the current pictures
+        of the other cameras. Their end is found by binary search, so their timestamps are mostly not read.
+
+        :param apn_no: The camera with pictures alone in their sets.
+        :param leveled_ts: Current leveled timestamps of all cameras.
+        :param ref_ts: Reference timestamps.
+        :param n_i: Next indexes, updated.
+        :param last_indexes: Last indexes of the cameras.
+        :param end_indexes: Segments ends of the cameras, see cam_set_generator.
+        :return: Generated sets, generator returns the last full images set (None if nothing was generated).
+        """
+        others_min = min(lvl_ts for k, lvl_ts in leveled_ts.items() if k != apn_no)
+        # pictures with a leveled ts older than others_min - TIME_MARGING aren't in the acceptance zone of other cameras
+        end = self.lazy_timestamps()[apn_no].bisect_right(
+            others_min - TIME_MARGING + ref_ts[apn_no], lo=n_i[apn_no],
+            hi=self.fetchers[apn_no].nb_pic() if end_indexes is None else end_indexes[apn_no])
+        if end is None:  # not monotonic, let the normal generation detect the back in time
+            return None
+
+        generated = False
+        while n_i[apn_no] < end and n_i <= last_indexes:
+            img_set = ImageSet(l={apn_no: self.fetchers[apn_no].get_pic(index=n_i[apn_no])}, number_of_pictures=self.nb_cams)
+            n_i[apn_no] += 1
+            generated = True
+            yield ImageSetWithFetcherIndexes(set=img_set, fetcher_next_indexes=n_i)
+
+        if not generated:
+            return None
+
+        last_indexes_used = list(n_i)
+        last_indexes_used[apn_no] -= 1
+        return self.get_images(last_indexes_used)
+
+    def cam_set_generator(
+            self, reference_set: ImageSet, start_indexes: List[int]=None, sparse: bool=False,
+            vectorized: bool=False, end_indexes: List[int]=None) -> Iterator[ImageSetWithFetcherIndexes]:
         """
         Generate all lot (event incomplete).
 
@@ -109,6 +675,17 @@ class LotMaker:
         :type reference_set: ImageSet
         :param start_indexes: Start with this list of indexes, will ignore images before.
         :type start_indexes: List[int]
+        :param sparse: When a camera is alone in the acceptance zone, find with a binary search its following pictures
+                       that will also be alone. Their timestamps aren't read, back in time issues are only detected
+                       on the read pictures.
+        :type sparse: bool
+        :param vectorized: Assign all sets at once from the cameras timestamps arrays (see set_assignment.assign_sets),
+                           image sets are only made when they are generated. All timestamps are read, sparse is ignored.
+        :type vectorized: bool
+        :param end_indexes: Segments ends from the start indexes (see segment_end_indexes). Generation stops when a
+                            camera reaches its end, instead of comparing each set with the previous one and raising
+                            CameraBackInTimeError.
+        :type end_indexes: List[int]
         :return: An Iterator of the generated images sets.
         :rtype: Iterator[ImageSet]
         """
@@ -116,7 +693,12 @@ class LotMaker:
             raise InvalidReferenceSetError()
 
         ref_ts = {apn_no: reference_set[apn_no].get_timestamp() for apn_no in range(0, self.nb_cams)}
+        if vectorized:
+            yield from self._assigned_sets_generator(ref_ts=ref_ts, start_indexes=start_indexes, end_indexes=end_indexes)
+            return
+
         last_indexes = [max(f.nb_pic() - 1, 0) for f in self.fetchers]
+        nb_pics = [f.nb_pic() for f in self.fetchers]
 
         n_i = start_indexes if start_indexes is not None else [0] * self.nb_cams   # next indexes Start at the begining (oldest images)
 
@@ -127,11 +709,14 @@ class LotMaker:
             # list cam in accepted zone
             # compute new next_indexes
 
+            if end_indexes is not None and reached_ends(n_i, end_indexes, nb_pics) != []:  # next pictures went back in time
+                return
+
             last_cam = cam_img
             cam_img = self.get_images(n_i)
 
             # detecting back in time issu with cameras timestamp
-            if last_cam is not None:
+            if last_cam is not None and end_indexes is None:
                 back_in_time_apns = cam_img.get_pic_taken_before(img_set=last_cam)
                 if back_in_time_apns != []:
                     self.logger.warning("Detected back in time in cameras : %r", back_in_time_apns)
@@ -151,6 +736,139 @@ class LotMaker:
 
             yield ImageSetWithFetcherIndexes(set=img_set, fetcher_next_indexes=n_i)
 
+            if sparse and len(cam_no_in_acceptance) == 1 and len(leveled_ts) == self.nb_cams:
+                last_full_set = yield from self._lonely_pictures_generator(
+                    apn_no=cam_no_in_acceptance[0], leveled_ts=leveled_ts, ref_ts=ref_ts, n_i=n_i, last_indexes=last_indexes,
+                    end_indexes=end_indexes)
+                if last_full_set is not None:
+                    cam_img = last_full_set
+
+    def _assigned_sets_generator(
+            self, ref_ts: Dict[int, int], start_indexes: List[int]=None, end_indexes: List[int]=None) -> Iterator[ImageSetWithFetcherIndexes]:
+        """
+        Generate the sets of cam_set_generator from a sets assignment of the cameras timestamps arrays.
+
+        :param ref_ts: Reference timestamps.
+        :param start_indexes: Start with this list of indexes, will ignore images before.
+        :param end_indexes: Segments ends, see cam_set_generator.
+        :return: An Iterator of the generated images sets.
+        :raise CameraBackInTimeError: After the last set before a camera goes back in time, as cam_set_generator does
+                                      without end_indexes.
+        """
+        assignment = assign_sets(
+            timestamps=self.timestamp_matrix(),
+            ref_ts=[ref_ts[apn_no] for apn_no in range(0, self.nb_cams)],
+            start_indexes=start_indexes if start_indexes is not None else [0] * self.nb_cams,
+            margin=TIME_MARGING,
+            end_indexes=end_indexes)
+
+        for indexes, next_indexes in zip(assignment.indexes.tolist(), assignment.next_indexes.tolist()):
+            yield ImageSetWithFetcherIndexes(set=self._indexes_to_set(indexes), fetcher_next_indexes=next_indexes)
+
+        if assignment.break_indexes is not None and end_indexes is None:
+            n_i = assignment.break_indexes
+            self.logger.warning("Detected back in time in cameras : %r", assignment.break_cams)
+            pic_path = {apnid: (self.fetchers[apnid].get_pic(index=n_i[apnid] - 1), self.fetchers[apnid].get_pic(index=n_i[apnid]))
+                        for apnid in assignment.break_cams}
+            raise CameraBackInTimeError(indexes=n_i, pictures_paths=pic_path)
+
+    def estimate_reference_indexes(self, start_indexes: List[int]) -> Optional[List[int]]:
+        """
+        Estimate a reference set from the cameras clocks offsets (see offset_estimation), only the timestamps of
+        REF_SEARCH_OFFSET_SAMPLE_SIZE pictures of each camera are read.
+
+        :param start_indexes: Partition start indexes.
+        :type start_indexes: List[int]
+        :return: Indexes of the estimated reference set, None if the offsets can't be estimated.
+        :rtype: List[int]
+        """
+        lazy_ts = self.lazy_timestamps()
+        samples = [
+            [lazy_ts[apn_no][index] for index in range(start_indexes[apn_no], min(start_indexes[apn_no] + REF_SEARCH_OFFSET_SAMPLE_SIZE, len(lazy_ts[apn_no])))]
+            for apn_no in range(0, self.nb_cams)]
+        if any(len(sample) == 0 for sample in samples):
+            return None
+
+        offsets = [0]
+        for apn_no in range(1, self.nb_cams):
+            estimate = estimate_offset(ref_ts=samples[0], cam_ts=samples[apn_no], margin=TIME_MARGING)
+            self.logger.debug("Camera %i offset estimate : %r", apn_no, estimate)
+            if estimate is None:
+                return None
+            offsets.append(estimate.offset)
+
+        positions = choose_reference(timestamps=samples, offsets=offsets, margin=TIME_MARGING)
+        if positions is None:
+            return None
+
+        return [start_indexes[apn_no] + positions[apn_no] for apn_no in range(0, self.nb_cams)]
+
+    def _reference_indexes_walk(self, partition_start: List[int], cam_max_indexes: List[int]) -> Iterator[List[int]]:
+        """
+        Reference indexes candidates, the estimated reference set (see estimate_reference_indexes) first, then the
+        indexes_walk candidates. Same protocol as indexes_walk : send the new partition start, offsets are estimated
+        again from it.
+
+        :param partition_start: Start indexes.
+        :param cam_max_indexes: Cameras max indexes.
+        :return: Generator of reference indexes candidates.
+        """
+        while True:
+            estimated = self.estimate_reference_indexes(start_indexes=list(partition_start))
+            if estimated is not None and any(index > max_index for index, max_index in zip(estimated, cam_max_indexes)):
+                estimated = None
+            if estimated is not None:
+                self.logger.debug("Estimated reference indexes : %r", estimated)
+                new_start_indexes = yield estimated
+                if new_start_indexes is not None:
+                    yield new_start_indexes
+                    partition_start = new_start_indexes
+                    continue
+
+            for cam_indexes in indexes_walk(nb_cams=self.nb_cams, cam_start_indexes=partition_start, cam_max_indexes=cam_max_indexes):
+                if cam_indexes == estimated:  # already rejected
+                    continue
+                new_start_indexes = yield cam_indexes
+                if new_start_indexes is not None:
+                    yield new_start_indexes
+                    partition_start = new_start_indexes
+                    break
+            else:
+                return
+
+    def _segments_indexes_walk(self, partition_start: List[int], estimate_offsets: bool) -> Iterator[List[int]]:
+        """
+        Reference indexes candidates within the cameras monotonic segments from the partition start (see
+        segment_end_indexes) : candidates don't mix pictures taken before and after a camera went back in time.
+        Same protocol as indexes_walk. When the candidates of the segments are exhausted, the walk goes on from the
+        breaks.
+
+        :param partition_start: Start indexes.
+        :param estimate_offsets: Try first the estimated reference set, see _reference_indexes_walk.
+        :return: Generator of reference indexes candidates.
+        """
+        nb_pics = [f.nb_pic() for f in self.fetchers]
+        while True:
+            end_indexes = self.segment_end_indexes(partition_start)
+            cam_max_indexes = [end - 1 for end in end_indexes]
+            if estimate_offsets:
+                walk = self._reference_indexes_walk(partition_start=partition_start, cam_max_indexes=cam_max_indexes)
+            else:
+                walk = indexes_walk(nb_cams=self.nb_cams, cam_start_indexes=partition_start, cam_max_indexes=cam_max_indexes)
+
+            for cam_indexes in walk:
+                new_start_indexes = yield cam_indexes
+                if new_start_indexes is not None:
+                    yield new_start_indexes
+                    partition_start = new_start_indexes
+                    break
+            else:
+                next_start = [end if end < nb else start for start, end, nb in zip(partition_start, end_indexes, nb_pics)]
+                if next_start == partition_start:
+                    return
+                self.logger.debug("No reference found before the back in time breaks, searching from : %r", next_start)
+                partition_start = next_start
+
     def is_equiv_ref(self, set_a: ImageSet, set_b: ImageSet) -> bool:
         """
         Check if 2 set could be equivalent if used as reference set.
@@ -173,13 +891,25 @@ class LotMaker:
             self,
             threshold_max_consecutive_incomplete_sets: int=THRESHOLD_MAX_CONSECUTIVE_INCOMPLETE_SETS,
             threshold_incomplete_set_window_size: int=THRESHOLD_WINDOW_SIZE,
-            threshold_incomplete_set_max_in_window: int=THRESHOLD_WINDOW_MAX_ERRORS) -> List[ImageSet]:
+            threshold_incomplete_set_max_in_window: int=THRESHOLD_WINDOW_MAX_ERRORS,
+            sparse_timestamps: bool=False,
+            vectorized_sets: bool=False,
+            estimate_offsets: bool=False,
+            memoize_references: bool=False,
+            reference_search_workers: int=REF_SEARCH_NUMBER_OF_WORKERS,
+            split_back_in_time: bool=False) -> List[ImageSet]:
         """
         Make camera images sets (doesn't use metadata).
 
         :param threshold_max_consecutive_incomplete_sets: Set the max consecutive incomplete sets that will be accepted when searching the reference.
         :param threshold_incomplete_set_window_size: Set the size of the incomplete set window (error window).
         :param threshold_incomplete_set_max_in_window: Maximum number of incomplete set in the error window.
+        :param sparse_timestamps: Skip reading timestamps of pictures alone in their sets, see cam_set_generator.
+        :param vectorized_sets: Assign sets from the timestamps arrays, see cam_set_generator.
+        :param estimate_offsets: Try first the reference set estimated from the cameras clocks offsets, see generate_cam_partition.
+        :param memoize_references: Skip reference candidates equivalent to rejected ones, see generate_cam_partition.
+        :param reference_search_workers: Number of processes trying reference candidates, see generate_cam_partition.
+        :param split_back_in_time: Search references and make sets within the cameras monotonic segments, see generate_cam_partition.
         :return: A list of generated ImageSet.
         """
         gp_sets = []
@@ -189,18 +919,129 @@ class LotMaker:
                 [0] * self.nb_cams,
                 threshold_max_consecutive_incomplete_sets,
                 threshold_incomplete_set_window_size,
-                threshold_incomplete_set_max_in_window):
+                threshold_incomplete_set_max_in_window,
+                sparse_timestamps,
+                vectorized_sets,
+                estimate_offsets,
+                memoize_references,
+                reference_search_workers,
+                split_back_in_time):
 
             gp_sets.extend(p.images_sets)
 
+        self.logger.debug("Timestamps read stats : %r", self.timestamps_read_stats())
+        self.logger.debug("Reference trials cache stats : %r", self.reference_trials.stats())
+
         return gp_sets
 
+    def _try_reference(
+            self, cam_set: ImageSet, cam_indexes: List[int], start_indexes: List[int],
+            threshold_max_consecutive_incomplete_sets: int, threshold_incomplete_set_window_size: int,
+            sparse_timestamps: bool, vectorized_sets: bool, split_back_in_time: bool=False) -> ReferenceTrialResult:
+        """
+        Generate sets with a reference candidate until it is rejected or the generator ends. Only reads the
+        cameras pictures, trials of several candidates can run in worker processes.
+
+        :param cam_set: Reference candidate set.
+        :param cam_indexes: Reference candidate indexes, generation starts there.
+        :param start_indexes: Partition start, fetcher next indexes if no set is saved.
+        :param threshold_max_consecutive_incomplete_sets: Max consecutive incomplete sets before rejecting the candidate.
+        :param threshold_incomplete_set_window_size: Set the size of the incomplete set window (error window).
+        :param sparse_timestamps: Skip reading timestamps of pictures alone in their sets, see cam_set_generator.
+        :param vectorized_sets: Assign sets from the timestamps arrays, see cam_set_generator.
+        :param split_back_in_time: Stop at the first back in time break after the candidate (see segment_end_indexes)
+                                   instead of catching CameraBackInTimeError, the trial ends the same way.
+        :return: The trial result, the candidate is rejected if its fetcher next indexes are the partition start.
+        :rtype: ReferenceTrialResult
+        """
+        fetcher_next_indexes = list(start_indexes)
+        incomplete_consecutive_sets_count = 0
+        gp_sets = []
+        gp_set_since_last_save = []
+        sets_indexes = []
+        sets_indexes_since_last_save = []
+        break_reason = 'NORMAL'
+        incomplete_set_count = 0
+        complete_set_count = 0
+        end_indexes = self.segment_end_indexes(cam_indexes) if split_back_in_time else None
+        img_set_generator = self.cam_set_generator(reference_set=cam_set, start_indexes=list(cam_indexes), sparse=sparse_timestamps,
+                                                   vectorized=vectorized_sets, end_indexes=end_indexes)
+        max_consecutive_incomplete_sets = 0
+
+        error_window = [0] * threshold_incomplete_set_window_size     # 1 when error, 0 when no errors
+        success_window = [0] * SUCCESS_WINDOW_SIZE_NEXT_PARTITION_START_SAVING_POINT  # success window, use to save fetcher_indexes
+        # so that we rollback at the right position
+
+        gen_img_index = 0
+        trial_next_indexes = list(cam_indexes)  # generator next indexes
+        path_indexes = [trial_next_indexes]
+
+        try:
+            # Generating sets with the current reference
+            for gen_img_set_with_fetcher_indexes in img_set_generator:
+                gen_img_set = gen_img_set_with_fetcher_indexes.set
+                sets_indexes_since_last_save.append(
+                    [trial_next_indexes[apn_no] if apn_no in gen_img_set else NO_PICTURE for apn_no in range(0, self.nb_cams)])
+                trial_next_indexes = list(gen_img_set_with_fetcher_indexes.fetcher_next_indexes)
+                path_indexes.append(trial_next_indexes)
+                self.logger.debug("Generated set : %r", gen_img_set)
+                gp_set_since_last_save.append(gen_img_set)
+                if gen_img_set.is_complete():
+                    complete_set_count += 1
+                    max_consecutive_incomplete_sets = max(max_consecutive_incomplete_sets, incomplete_consecutive_sets_count)
+                    incomplete_consecutive_sets_count = 0
+                else:
+                    incomplete_consecutive_sets_count += 1
+                    incomplete_set_count += 1
+
+                error_window[gen_img_index % len(error_window)] = int(gen_img_set.is_complete())
+                success_window[gen_img_index % len(success_window)] = int(gen_img_set.is_complete())
+
+                # rejection or stop conditions
+                if (incomplete_consecutive_sets_count > threshold_max_consecutive_incomplete_sets):
+                    self.logger.debug("Maximum incomplete set count reached, rejecting current reference %r ", cam_set)
+                    break
+
+                gen_img_index += 1
+                self.logger.debug("Success window : %r", success_window)
+
+                if sum(success_window) == len(success_window):
+                    gp_sets.extend(gp_set_since_last_save)   # adding set to generated sets
+                    gp_set_since_last_save = []   # clearing set since last save has we just save this point
+                    sets_indexes.extend(sets_indexes_since_last_save)
+                    sets_indexes_since_last_save = []
+                    fetcher_next_indexes = list(gen_img_set_with_fetcher_indexes.fetcher_next_indexes)
+                    self.logger.debug("Good success windows saving rollback point : fetcher_next_indexes = %r", fetcher_next_indexes)
+            else:
+                last_indexes = [max(f.nb_pic() - 1, 0) for f in self.fetchers]
+                if end_indexes is not None and trial_next_indexes <= last_indexes and \
+                        reached_ends(trial_next_indexes, end_indexes, [f.nb_pic() for f in self.fetchers]) != []:
+                    break_reason = "BACK IN TIME"
+                    fetcher_next_indexes = list(trial_next_indexes)  # next pictures went back in time, they start the next partition
+                    self.logger.debug("Reached back in time break : fetcher_next_indexes = %r", fetcher_next_indexes)
+        except CameraBackInTimeError as backintime_err:
+            break_reason = "BACK IN TIME"
+            fetcher_next_indexes = backintime_err.indexes  # Next indexes has this indexes weren't used to make an actual set
+            self.logger.debug("Detected back in time error : fetcher_next_indexes = %r", fetcher_next_indexes)
+
+        return ReferenceTrialResult(
+            images_sets=gp_sets, sets_indexes=sets_indexes, fetcher_next_indexes=fetcher_next_indexes,
+            path_indexes=path_indexes if fetcher_next_indexes == list(start_indexes) else None,
+            break_reason=break_reason, number_of_incomplete_sets=incomplete_set_count,
+            number_of_complete_sets=complete_set_count, consecutive_incomplete_sets=incomplete_consecutive_sets_count)
+
     def generate_cam_partition(
             self,
             partition_start: List[int],
             threshold_max_consecutive_incomplete_sets: int=THRESHOLD_MAX_CONSECUTIVE_INCOMPLETE_SETS,
             threshold_incomplete_set_window_size: int=THRESHOLD_WINDOW_SIZE,
-            threshold_incomplete_set_max_in_window: int=THRESHOLD_WINDOW_MAX_ERRORS) -> CameraSetPartition:
+            threshold_incomplete_set_max_in_window: int=THRESHOLD_WINDOW_MAX_ERRORS,
+            sparse_timestamps: bool=False,
+            vectorized_sets: bool=False,
+            estimate_offsets: bool=False,
+            memoize_references: bool=False,
+            number_of_workers: int=REF_SEARCH_NUMBER_OF_WORKERS,
+            split_back_in_time: bool=False) -> CameraSetPartition:
         """
         Make camera images sets partitions (doesn't use metadata).
 
@@ -208,90 +1049,142 @@ class LotMaker:
         :param threshold_max_consecutive_incomplete_sets: Set the max consecutive incomplete sets that will be accepted when searching the reference.
         :param threshold_incomplete_set_window_size: Set the size of the incomplete set window (error window).
         :param threshold_incomplete_set_max_in_window: Maximum number of incomplete set in the error window.
+        :param sparse_timestamps: Skip reading timestamps of pictures alone in their sets, see cam_set_generator.
+        :param vectorized_sets: Assign sets from the timestamps arrays, see cam_set_generator.
+        :param estimate_offsets: For each partition, try first the reference set estimated from the cameras clocks
+                                 offsets (see estimate_reference_indexes), before the indexes_walk candidates.
+        :param memoize_references: Skip the candidates with the offsets of a rejected one starting on its generation
+                                   path (see ReferenceTrials) : their sets are the end of the rejected trial ones and
+                                   they reach the same rejection. Hits are counted in reference_trials.stats().
+        :param number_of_workers: Number of processes trying reference candidates. With more than one, all timestamps
+                                  are read, then the next candidates are tried speculatively by forked workers, by
+                                  tasks of REF_SEARCH_CANDIDATES_PER_TASK candidates. Results are used in walk order :
+                                  partitions are the ones of a single worker.
+        :param split_back_in_time: Find all the cameras back in time breaks first (see back_in_time_breaks, all
+                                   timestamps are read). Reference candidates are taken within the monotonic segments
+                                   from the partition start (see _segments_indexes_walk), trials stop at the next
+                                   break without comparing each set with the previous one.
         :return: A CameraSetPartition.
         """
         self.logger.debug("generate_cam_partition : Start generating camera partitions")
         cam_max_indexes = [f.nb_pic() - 1 for f in self.fetchers]  # end indexes
         fetcher_next_indexes = [0] * self.nb_cams   # correspond to the begining of the next partition
+        trial_args = {
+            'threshold_max_consecutive_incomplete_sets': threshold_max_consecutive_incomplete_sets,
+            'threshold_incomplete_set_window_size': threshold_incomplete_set_window_size,
+            'sparse_timestamps': sparse_timestamps,
+            'vectorized_sets': vectorized_sets,
+            'split_back_in_time': split_back_in_time}
+
+        if number_of_workers > 1 and multiprocessing.get_start_method() != "fork":
+            self.logger.warning("Worker processes can't be forked, references are searched with a single worker")
+            number_of_workers = 1
+        nb_speculative_candidates = 1 if number_of_workers <= 1 else \
+            REF_SEARCH_CANDIDATES_PER_TASK * REF_SEARCH_TASKS_PER_WORKER * number_of_workers
 
         # for debug and tracking purposes
         id_set = 0
 
-        indexe_gen = indexes_walk(nb_cams=self.nb_cams, cam_start_indexes=partition_start, cam_max_indexes=cam_max_indexes)
-        for cam_indexes in indexe_gen:
-            self.logger.debug("Camera current indexes are : %r", cam_indexes)
-            cam_set = self.get_images(cam_indexes)
-            self.logger.debug("Current reference set is : %r", cam_set)
-
-            incomplete_consecutive_sets_count = 0
-            reject = False
-            gp_sets = []
-            gp_set_since_last_save = []
-            break_reason = 'NORMAL'
-            incomplete_set_count = 0
-            complete_set_count = 0
-            partition_start = list(fetcher_next_indexes)  # updating start
-            img_set_generator = self.cam_set_generator(reference_set=cam_set, start_indexes=list(cam_indexes))
-            max_consecutive_incomplete_sets = 0
-
-            error_window = [0] * threshold_incomplete_set_window_size     # 1 when error, 0 when no errors
-            success_window = [0] * SUCCESS_WINDOW_SIZE_NEXT_PARTITION_START_SAVING_POINT  # success window, use to save fetcher_indexes
-            # so that we rollback at the right position
-
-            gen_img_index = 0
-
-            try:
-                # Generating sets with the current reference
-                for gen_img_set_with_fetcher_indexes in img_set_generator:
-                    gen_img_set = gen_img_set_with_fetcher_indexes.set
-                    self.logger.debug("Generated set : %r", gen_img_set)
-                    gp_set_since_last_save.append(gen_img_set)
-                    if gen_img_set.is_complete():
-                        complete_set_count += 1
-                        max_consecutive_incomplete_sets = max(max_consecutive_incomplete_sets, incomplete_consecutive_sets_count)
-                        incomplete_consecutive_sets_count = 0
-                    else:
-                        incomplete_consecutive_sets_count += 1
-                        incomplete_set_count += 1
-
-                    error_window[gen_img_index % len(error_window)] = int(gen_img_set.is_complete())
-                    success_window[gen_img_index % len(success_window)] = int(gen_img_set.is_complete())
-
-                    # rejection or stop conditions
-                    if (incomplete_consecutive_sets_count > threshold_max_consecutive_incomplete_sets):
-                        self.logger.debug("Maximum incomplete set count reached, rejecting current reference %r ", cam_set)
+        def walk_from(start_indexes: List[int]) -> Iterator[List[int]]:
+            # a new walk gives the candidates .send(start_indexes) would, even once speculative candidates exhausted it
+            if split_back_in_time:
+                return self._segments_indexes_walk(partition_start=start_indexes, estimate_offsets=estimate_offsets)
+            if estimate_offsets:
+                return self._reference_indexes_walk(partition_start=start_indexes, cam_max_indexes=cam_max_indexes)
+            return indexes_walk(nb_cams=self.nb_cams, cam_start_indexes=start_indexes, cam_max_indexes=cam_max_indexes)
+
+        if split_back_in_time:
+            self.back_in_time_breaks()  # before forking the workers, they inherit them
+        indexe_gen = walk_from(partition_start)
+
+        executor = None
+        if nb_speculative_candidates > 1:
+            self.timestamp_matrix()  # read before forking the workers, they inherit them
+            _init_reference_search_worker(self)  # workers are forked by the default context
+            executor = ProcessPoolExecutor(max_workers=number_of_workers)
+
+        try:
+            candidates = list(itertools.islice(indexe_gen, nb_speculative_candidates))
+            while len(candidates) > 0:
+                partition_start = list(fetcher_next_indexes)  # updating start
+                if executor is not None:
+                    tasks = [
+                        executor.submit(_try_references_in_worker, candidates[first:first + REF_SEARCH_CANDIDATES_PER_TASK], partition_start, trial_args)
+                        for first in range(0, len(candidates), REF_SEARCH_CANDIDATES_PER_TASK)]
+
+                accepted = None
+                for candidate_no, cam_indexes in enumerate(candidates):
+                    self.logger.debug("Camera current indexes are : %r", cam_indexes)
+                    cam_set = self.get_images(cam_indexes)
+                    self.logger.debug("Current reference set is : %r", cam_set)
+
+                    ref_ts = [cam_set[apn_no].get_timestamp() for apn_no in range(0, self.nb_cams)] if memoize_references else None
+                    if memoize_references and self.reference_trials.is_rejected(ref_ts=ref_ts, indexes=cam_indexes):
+                        self.logger.debug("Reference %r would be rejected as a previous one, skipping it", cam_indexes)
+                        continue
+
+                    trial = None
+                    if executor is not None:
+                        task_trials = tasks[candidate_no // REF_SEARCH_CANDIDATES_PER_TASK].result()
+                        if candidate_no % REF_SEARCH_CANDIDATES_PER_TASK < len(task_trials):  # not tried after an accepted candidate
+                            trial = task_trials[candidate_no % REF_SEARCH_CANDIDATES_PER_TASK]
+                    if trial is None:
+                        trial = self._try_reference(cam_set=cam_set, cam_indexes=cam_indexes, start_indexes=partition_start, **trial_args)
+
+                    if trial.fetcher_next_indexes != partition_start:
+                        accepted = (cam_set, trial)
                         break
 
-                    gen_img_index += 1
-                    self.logger.debug("Success window : %r", success_window)
+                    if memoize_references:
+                        stopped = trial.consecutive_incomplete_sets > threshold_max_consecutive_incomplete_sets
+                        self.reference_trials.add_rejection(ref_ts=ref_ts, path_indexes=trial.path_indexes,
+                                                            nb_last_sets=trial.consecutive_incomplete_sets if stopped else 0)
 
-                    if sum(success_window) == len(success_window):
-                        gp_sets.extend(gp_set_since_last_save)   # adding set to generated sets
-                        gp_set_since_last_save = []   # clearing set since last save has we just save this point
-                        fetcher_next_indexes = list(gen_img_set_with_fetcher_indexes.fetcher_next_indexes)
-                        self.logger.debug("Good success windows saving rollback point : fetcher_next_indexes = %r", fetcher_next_indexes)
-            except CameraBackInTimeError as backintime_err:
-                break_reason = "BACK IN TIME"
-                fetcher_next_indexes = backintime_err.indexes  # Next indexes has this indexes weren't used to make an actual set
-                self.logger.debug("Detected back in time error : fetcher_next_indexes = %r", fetcher_next_indexes)
+                if executor is not None:
+                    for task in tasks:  # candidates after the accepted one aren't needed
+                        task.cancel()
 
-            if fetcher_next_indexes != partition_start:
+                if accepted is None:
+                    candidates = list(itertools.islice(indexe_gen, nb_speculative_candidates))
+                    continue
+
+                cam_set, trial = accepted
+                images_sets = trial.images_sets
+                if images_sets is None:  # tried by a worker
+                    images_sets = [self._indexes_to_set(indexes) for indexes in trial.sets_indexes]
+                fetcher_next_indexes = trial.fetcher_next_indexes
                 # generator should not suggest already used image, setting start indexes to the end of the partition
                 self.logger.debug("Indexes generator : fetcher_next_indexes = %r", fetcher_next_indexes)
-                indexe_gen.send(list(fetcher_next_indexes))  # copy list so that there are no reference issues
+                indexe_gen = walk_from(list(fetcher_next_indexes))  # copy list so that there are no reference issues
+                self.reference_trials.clear()  # candidates were rejected from the previous start
+                candidates = list(itertools.islice(indexe_gen, nb_speculative_candidates))
 
                 # for tracking and debug purposes
-                for s in gp_sets:
+                for s in images_sets:
                     s.id_set = id_set
                     id_set += 1
 
                 # returning the generated partition
                 yield CameraSetPartition(
-                    ref_set=cam_set, images_sets=gp_sets,
+                    ref_set=cam_set, images_sets=images_sets,
                     start_indexes=partition_start, fetcher_next_indexes=fetcher_next_indexes,
-                    break_reason=break_reason, number_of_incomplete_sets=incomplete_set_count,
-                    number_of_complete_sets=complete_set_count,
-                    max_consecutive_incomplete_sets=incomplete_consecutive_sets_count)
+                    break_reason=trial.break_reason, number_of_incomplete_sets=trial.number_of_incomplete_sets,
+                    number_of_complete_sets=trial.number_of_complete_sets,
+                    max_consecutive_incomplete_sets=trial.consecutive_incomplete_sets)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+                _init_reference_search_worker(None)
+
+    def _indexes_to_set(self, indexes: List[int]) -> ImageSet:
+        """
+        :param indexes: Pictures indexes of a set, NO_PICTURE for missing cameras.
+        :return: The images set.
+        :rtype: ImageSet
+        """
+        return ImageSet(
+            l={apn_no: self.fetchers[apn_no].get_pic(index=index) for apn_no, index in enumerate(indexes) if index != NO_PICTURE},
+            number_of_pictures=self.nb_cams)
 
     def load_metas(self) -> List[RederbroMeta]:
         """
@@ -309,7 +1202,8 @@ class LotMaker:
     def get_metas(self) -> List[RederbroMeta]:
         return self.load_metas()
 
-    def associate_meta(self, reference_lot: Lot, img_sets: List[ImageSet], start_meta_index: int=0, start_img_set_index: int=0) -> Iterator[LotWithIndexes]:
+    def associate_meta(self, reference_lot: Lot, img_sets: List[ImageSet], start_meta_index: int=0, start_img_set_index: int=0,
+                       end_meta_index: int=None) -> Iterator[LotWithIndexes]:
         """
         Generate all lot (event incomplete).
 
@@ -317,6 +1211,9 @@ class LotMaker:
         :param img_sets: Images sets use to generate lots.
         :param start_meta_index: Start meta index.
         :param start_img_set_index: Start image set.
+        :param end_meta_index: First meta going back in time after the start meta (see monotonic_segments). Generation
+                               stops there instead of comparing each meta with the previous one and raising
+                               MetaBackInTimeError.
         """
         self.logger.debug(
             "Associating meta with reference lot : %r, start meta indexes : %i, start img_set indexes : %i",
@@ -349,6 +1246,9 @@ class LotMaker:
             if n_i[K_SET] >= len(img_sets):  # image set index is too high
                 break
 
+            if end_meta_index is not None and n_i[K_META] >= end_meta_index:  # next metas went back in time
+                return
+
             last_lot = lot  # will be used to detect back in time issu
 
             lot = Lot(meta=rederbrometa[n_i[K_META]], cam_set=img_sets[n_i[K_SET]])
@@ -360,7 +1260,7 @@ class LotMaker:
                     self.logger.warning("Backintime detected for cameras : %r ", back_in_time_apns)
                     pic_path = {apnid: (last_lot.cam_set[apnid], lot.cam_set[apnid]) for apnid in back_in_time_apns}
                     raise CameraBackInTimeError(indexes=n_i, pictures_paths=pic_path)  # TODO unit test it
-                if lot.meta.get_timestamp() < last_lot.meta.get_timestamp():
+                if end_meta_index is None and lot.meta.get_timestamp() < last_lot.meta.get_timestamp():
                     self.logger.warning("Back in time detected in Metas, between : %r | %r", lot.meta, last_lot.meta)
                     raise MetaBackInTimeError(indexes=n_i)
 
@@ -430,7 +1330,8 @@ class LotMaker:
             partition_start_meta_index: int=0,
             threshold_max_consecutive_incomplete_sets: int=THRESHOLD_MAX_CONSECUTIVE_INCOMPLETE_SETS,
             threshold_incomplete_set_window_size: int=THRESHOLD_WINDOW_SIZE,
-            threshold_incomplete_set_max_in_window: int=THRESHOLD_WINDOW_MAX_ERRORS) -> Iterator[LotPartition]:
+            threshold_incomplete_set_max_in_window: int=THRESHOLD_WINDOW_MAX_ERRORS,
+            split_back_in_time: bool=False) -> Iterator[LotPartition]:
         """
         Generate partition of association of meta data and cam_set images.
 
@@ -440,6 +1341,8 @@ class LotMaker:
         :param threshold_max_consecutive_incomplete_sets: Tolerance max consecutive incomplete sets for a valid partition.
         :param threshold_incomplete_set_window_size: Tolerance size of the error window.
         :param threshold_incomplete_set_max_in_window: Max tolerated incomplete sets in the error window.
+        :param split_back_in_time: Find all the metas back in time breaks first, associations stop at the next break
+                                   without comparing each meta with the previous one.
         :return: LotPartition (as an Iterator).
         """
         self.logger.debug("Generating camera and meta partitions.")
@@ -457,6 +1360,7 @@ class LotMaker:
         partition_start[I_META] = partition_start_meta_index
         partition_start[I_SET] = partition_start_img_set_index
         fetcher_next_indexes = list(partition_start)
+        metas_breaks = find_breaks([meta.get_timestamp() for meta in rederbrometa]) if split_back_in_time else None
 
         indexe_gen = indexes_walk(nb_cams=2, cam_start_indexes=partition_start, cam_max_indexes=max_indexes)
         for indexes in indexe_gen:  # this will generate all possible index associations between meta and cam_sets in an optimal order
@@ -483,11 +1387,15 @@ class LotMaker:
             incomplete_set_count = 0
             complete_set_count = 0
             partition_start = list(fetcher_next_indexes)  # updating start
+            end_meta_index = None
+            if split_back_in_time:
+                end_meta_index = segment_ends([metas_breaks], [indexes[I_META]], [max_indexes[I_META]])[0]
             lot_generator = self.associate_meta(
                 reference_lot=lot,
                 img_sets=img_sets,
                 start_meta_index=indexes[I_META],
-                start_img_set_index=indexes[I_SET])
+                start_img_set_index=indexes[I_SET],
+                end_meta_index=end_meta_index)
             max_consecutive_incomplete_sets = 0
 
             error_window = [0] * threshold_incomplete_set_window_size     # 1 when error, 0 when no errors
@@ -534,6 +1442,13 @@ class LotMaker:
                         fetcher_next_indexes = [lot_with_indexes.next_meta_index, lot_with_indexes.next_img_set_index]
 
                         self.logger.debug("Found reference lot.cam_set.id_set: %i, lot.meta.id_meta: %i", lot.cam_set.id_set, lot.meta.id_meta)
+                else:
+                    if end_meta_index is not None and gen_img_index > 0 and \
+                            reached_ends([lot_with_indexes.next_meta_index], [end_meta_index], [max_indexes[I_META]]) != [] and \
+                            lot_with_indexes.next_img_set_index < max_indexes[I_SET]:
+                        self.logger.debug("Reached metas back in time break : %i", end_meta_index)
+                        break_reason = "BACK IN TIME META"
+                        fetcher_next_indexes = [lot_with_indexes.next_meta_index, lot_with_indexes.next_img_set_index]
             except CameraBackInTimeError as backintime_err:
                 self.logger.warning("Catching CameraBackInTimeError : %r", backintime_err)
                 break_reason = "BACK IN TIME CAMERA"
@@ -562,7 +1477,8 @@ class LotMaker:
             img_sets: List[ImageSet],
             threshold_max_consecutive_incomplete_sets: int=THRESHOLD_MAX_CONSECUTIVE_INCOMPLETE_SETS,
             threshold_incomplete_set_window_size: int=THRESHOLD_WINDOW_SIZE,
-            threshold_incomplete_set_max_in_window: int=THRESHOLD_WINDOW_MAX_ERRORS) -> List[Lot]:
+            threshold_incomplete_set_max_in_window: int=THRESHOLD_WINDOW_MAX_ERRORS,
+            split_back_in_time: bool=False) -> List[Lot]:
         """
         Generate list of Lot from partitions.
 
@@ -570,6 +1486,7 @@ class LotMaker:
         :param threshold_max_consecutive_incomplete_sets: Tolerance max consecutive incomplete sets for a valid partition.
         :param threshold_incomplete_set_window_size: Tolerance size of the error window.
         :param threshold_incomplete_set_max_in_window: Max tolerated incomplete sets in the error window.
+        :param split_back_in_time: Associate within the metas monotonic segments, see generate_meta_cam_partitions.
         :return: A list of generated lots.
         """
         lots = []
@@ -583,7 +1500,8 @@ class LotMaker:
                 partition_start_meta_index=partition_start_meta_index,
                 threshold_max_consecutive_incomplete_sets=threshold_max_consecutive_incomplete_sets,
                 threshold_incomplete_set_window_size=threshold_incomplete_set_window_size,
-                threshold_incomplete_set_max_in_window=threshold_incomplete_set_max_in_window):
+                threshold_incomplete_set_max_in_window=threshold_incomplete_set_max_in_window,
+                split_back_in_time=split_back_in_time):
             lots.extend(partition.lots)
 
         return lots
@@ -592,6 +1510,24 @@ class LotMaker:
 class InvalidReferenceSetError(OpvImportError):
     pass
 
+class DroppedPicturesError(OpvImportError):
+
+    def __init__(self, reports: Dict[int, FetchReport]):
+        """
+        When pictures of some cameras weren't fetched (series breaks in their DCF folders).
+
+        :param reports: Fetch reports of the failing cameras, by camera number.
+        :type reports: Dict[int, FetchReport]
+        """
+        self.reports = reports
+
+        Exception.__init__(self, self.__repr__())
+
+    def __repr__(self) -> str:
+        return "Pictures weren't fetched : {}".format(
+            ", ".join("camera {} {} dropped files (first {})".format(no, len(report.dropped_files), report.dropped_files[0])
+                      for no, report in sorted(self.reports.items())))
+
 class InvalidReferenceLotError(OpvImportError):
     pass
 
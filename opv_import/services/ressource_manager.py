@@ -17,6 +17,7 @@
 # Description: Service to save ressources using business logic (API and DM).
 
 import os
+import json
 import logging
 import datetime
 
@@ -29,6 +30,7 @@ from typing import Dict
 from path import Path
 
 from opv_import import model
+from opv_import import config
 
 from geojson import Point
 
@@ -110,18 +112,31 @@ class RessourceManager():
     def make_picture_path(self, img_set: model.ImageSet) -> str:
         """
         Save image set in Directory Manager and return it's uuid.
+        Known pictures exif tags are saved next to them (config.EXIF_TAGS_FILE_NAME), keyed by destination name
+        without extension, so that next stages don't have to read the pictures headers.
 
         :param img_set: Image set to be saved in DM.
         :return: The directory manager UUID.
         """
         with self._opv_dm_client.Open() as (uuid, dir_path):
+            exif_tags = {}
             for key, photo in img_set.items():
                 dest = Path(dir_path) / 'APN{}{}'.format(key, photo.path.ext.upper())
-                if self._use_hardlink:
+                if photo.archive is not None:  # archive member, copied from its byte range (it can't be hardlinked)
+                    offset, size = photo.archive.byte_range(photo.path)
+                    self.logger.debug("Copying : {} [{}, +{}] -> {}".format(photo.archive.archive_path, offset, size, dest))
+                    photo.archive.copy_range(offset=offset, size=size, dest=dest)
+                elif self._use_hardlink:
                     self.logger.debug("Hardlinking : {} -> {}".format(photo.path, dest))
                     os.link(photo.path, dest)
                 else:
                     photo.path.copy(dest)
+                if photo._exif_tags is not None:  # read along with the timestamp, never read here
+                    exif_tags['APN{}'.format(key)] = photo._exif_tags
+
+            if len(exif_tags) > 0:
+                with open(Path(dir_path) / config.EXIF_TAGS_FILE_NAME, 'w') as tags_file:
+                    json.dump(exif_tags, tags_file, sort_keys=True)
 
         self.logger.debug("Imageset stored in uuid : %s", uuid)
         return uuid
@@ -20,7 +20,8 @@ import logging
 from typing import Callable, Dict
 from path import Path
 
-from opv_import.helpers import RsyncWrapper
+from opv_import.helpers import RsyncWrapper, PicturesIndex
+from opv_import.helpers import pictures_utils
 from opv_import.services import AbstractApnDeviceTasker
 from opv_import import model
 from opv_import.model.apn_device import ApnDeviceNumberNotFoundError
@@ -29,6 +30,7 @@ from opv_import import config
 SD_UDEV_OBSERVER_NAME = "OPV SD card import"
 COPY_NUMBER_OF_WORKERS = 3
 SD_DCIM_FOLDER_PATH = Path("DCIM")
+INDEXED_PICTURES_EXT = [".JPG", ".JPEG"]  # extensions of the files added to the pictures index
 
 
 class SdCopier(AbstractApnDeviceTasker):
@@ -78,8 +80,15 @@ class SdCopier(AbstractApnDeviceTasker):
                 self._progress[device.apn_number] = progress_rate
                 self._fire_on_progression_change()
 
+            dest_path = self.dest_path(apn_number=device.apn_number)
+            pictures_index = PicturesIndex(index_path=dest_path / config.PICTURES_INDEX_FILE_NAME).load()
+
+            def on_file_transferred(rel_path: Path):
+                self._index_picture(pictures_index=pictures_index, apn_dest_path=dest_path, rel_path=rel_path)
+
             def on_terminate():
                 self.logger.debug("Rsync terminated for APN %r", device)
+                pictures_index.save()
                 self._progress[device.apn_number] = 1
                 self._terminated[device.apn_number] = True
                 self._fire_on_progression_change()
@@ -87,14 +96,31 @@ class SdCopier(AbstractApnDeviceTasker):
                 self.logger.debug("Device %r unmounted", device)
 
             source_path = device.mount_path / SD_DCIM_FOLDER_PATH  # no trailling slash for rsync to copy folder + content
-            dest_path = self.dest_path(apn_number=device.apn_number)
             rsync = RsyncWrapper(source_path=source_path, destination_path=dest_path)
             rsync.on_progress(on_progress)
+            rsync.on_file_transferred(on_file_transferred)
             rsync.on_terminate(on_terminate)
             self.logger.debug("Starting Rsync for APN %r", device)
             rsync.run()
         return task
 
+    def _index_picture(self, pictures_index: PicturesIndex, apn_dest_path: Path, rel_path: Path):
+        """
+        Add a just copied picture to the APN pictures index, its header is still in the page cache.
+        :param pictures_index: The APN pictures index.
+        :param apn_dest_path: APN destination folder.
+        :param rel_path: Copied file path relative to apn_dest_path.
+        """
+        if rel_path.ext.upper() not in INDEXED_PICTURES_EXT:
+            return
+
+        pic_path = apn_dest_path / rel_path
+        try:
+            ts, tags = pictures_utils.read_exif(pic_path, tags=config.EXIF_EXTRA_TAGS)
+            pictures_index.add(rel_path=rel_path, size=pic_path.getsize(), ts=ts, tags=tags)
+        except (OSError, KeyError, ValueError) as err:
+            self.logger.warning("Can't index picture %s : %r", pic_path, err)
+
     def _fire_on_progression_change(self):
         """
         Fire progression change event.
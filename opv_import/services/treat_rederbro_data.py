@@ -30,6 +30,9 @@ from opv_directorymanagerclient import DirectoryManagerClient
 
 from opv_import import services
 from opv_import import model
+from opv_import import config
+from opv_import.helpers import TimestampCache
+from opv_import.helpers import read_scheduler
 
 from opv_import.services.ressource_manager import InvalidLotForDbError
 
@@ -46,7 +49,15 @@ class TreatRederbroData:
                  opv_api_client: OpvApiRestClient,
                  opv_dm_client: DirectoryManagerClient,
                  number_of_cameras: int=6,
-                 csv_meta_path: Path=None):
+                 csv_meta_path: Path=None,
+                 use_ts_cache: bool=False,
+                 sparse_timestamps: bool=False,
+                 vectorized_sets: bool=False,
+                 estimate_offsets: bool=False,
+                 memoize_references: bool=False,
+                 reference_search_workers: int=1,
+                 split_back_in_time: bool=False,
+                 use_dcim_manifest: bool=False):
         """
         Initiate a treat rederbrodata instance with pictures directory and optionnaly a CSV.
         :param cam_pictures_dir: Where pictures are stored (DCIM folders)
@@ -54,11 +65,25 @@ class TreatRederbroData:
         :param opv_api_client: API client (used to save Lot ...).
         :param opv_dm_client: Directory Manager client.
         :param csv_meta_path: The meta CSV.
+        :param use_ts_cache: If true pictures timestamps are saved in a persistent cache, next to the APN folders.
+        :param sparse_timestamps: If true timestamps of pictures alone in their sets are skipped (binary search).
+        :param vectorized_sets: If true camera sets are assigned from all the pictures timestamps arrays at once.
+        :param estimate_offsets: If true reference sets are first estimated from the cameras clocks offsets.
+        :param memoize_references: If true reference candidates equivalent to rejected ones aren't tried.
+        :param reference_search_workers: Number of processes trying reference candidates, results are the same.
+        :param split_back_in_time: If true back in time breaks are found first, sets and lots are made within monotonic segments.
+        :param use_dcim_manifest: If true DCIM folders are listed once and saved in a manifest in each APN folder.
         """
         self.logger = logging.getLogger(TreatRederbroData.__module__ + "." + TreatRederbroData.__class__.__name__)
         self._cam_picture_dir = cam_pictures_dir
         self._csv_meta_path = csv_meta_path
         self._number_of_cameras = number_of_cameras
+        self._sparse_timestamps = sparse_timestamps
+        self._vectorized_sets = vectorized_sets
+        self._estimate_offsets = estimate_offsets
+        self._memoize_references = memoize_references
+        self._reference_search_workers = reference_search_workers
+        self._split_back_in_time = split_back_in_time
 
         # checking args
         if not self._cam_picture_dir.exists():
@@ -69,9 +94,12 @@ class TreatRederbroData:
                 errno.ENOENT, os.strerror(errno.ENOENT), self._csv_meta_path)
 
         # -- Services
+        self._ts_cache = TimestampCache(db_path=self._cam_picture_dir / config.TS_CACHE_FILE_NAME) if use_ts_cache else None
         self._lot_maker = services.LotMaker(pictures_path=self._cam_picture_dir,
                                             rederbro_csv_path=self._csv_meta_path,
-                                            nb_cams=self._number_of_cameras)
+                                            nb_cams=self._number_of_cameras,
+                                            ts_cache=self._ts_cache,
+                                            use_manifest=use_dcim_manifest)
         self._ress_manager = services.RessourceManager(opv_api_client=opv_api_client,
                                                        opv_dm_client=opv_dm_client,
                                                        id_malette=id_malette)
@@ -95,6 +123,56 @@ class TreatRederbroData:
             self._lot_maker.load_metas()
             self._meta_loaded = True
 
+    def load_cam_images(self, number_of_workers: int):
+        """
+        Fetch all cameras DCIM folders simultaneously. Optional, otherwise cameras are fetched one after the other.
+        :param number_of_workers: Number of cameras fetched simultaneously.
+        """
+        self.logger.debug("Fetching cameras images ...")
+        self._lot_maker.load_cam_images(number_of_workers=number_of_workers)
+        self.logger.info("Cameras fetching wall times (s) : %r", self._lot_maker.fetch_wall_times)
+
+    def check_cam_images(self, fail_on_dropped: bool=False):
+        """
+        Log the cameras fetch reports (fetching cameras if needed), before any set is made.
+        :param fail_on_dropped: If True, raise when pictures of a camera weren't fetched.
+        :raise DroppedPicturesError: When pictures were dropped and fail_on_dropped is True.
+        """
+        for no, report in enumerate(self._lot_maker.get_fetch_reports()):
+            self.logger.info("Camera %i : %r", no, report)
+            for serie_break in report.series_breaks:
+                self.logger.debug("Camera %i serie break in %s after index %i, next index %i", no, *serie_break)
+
+        if fail_on_dropped:
+            self._lot_maker.check_fetch_reports()
+
+    def prefetch_timestamps(self, number_of_workers: int, on_progress_listener: Callable[[float], None]=None,
+                            read_order: str=read_scheduler.READ_ORDER_INDEX, read_ahead: bool=False,
+                            backend: str=services.lot_maker.PREFETCH_BACKEND_THREAD, stream: bool=False,
+                            watch_idle_timeout: float=None):
+        """
+        Read all pictures timestamps in parallel before generating camera sets. Optional.
+        :param number_of_workers: Number of threads (or processes) reading pictures simultaneously.
+        :param on_progress_listener: A lambda that will be executed when progression evolve, with the progression rate.
+        :param read_order: Pictures reading order, see read_scheduler.READ_ORDERS.
+        :param read_ahead: If True, read-ahead hints are given to the kernel.
+        :param backend: Thread, process or auto, see lot_maker.PREFETCH_BACKENDS.
+        :param stream: If True, timestamps are read while DCIM folders are listed (cameras images mustn't be loaded yet).
+        :param watch_idle_timeout: When streaming, follow DCIM folders being copied until idle for this time (seconds).
+        """
+        self.logger.debug("Prefetching pictures timestamps ...")
+        self._lot_maker.prefetch_timestamps(number_of_workers=number_of_workers, on_progress_listener=on_progress_listener,
+                                            read_order=read_order, read_ahead=read_ahead, backend=backend, stream=stream,
+                                            watch_idle_timeout=watch_idle_timeout)
+
+    def load_timestamps_from_mtime(self, nb_samples: int):
+        """
+        Use pictures modification time as timestamp, when a sample of exif timestamps agree. Optional.
+        :param nb_samples: Number of exif timestamps checked per camera.
+        """
+        used_mtime = self._lot_maker.load_timestamps_from_mtime(nb_samples=nb_samples)
+        self.logger.info("Modification time used as timestamp for cameras : %r", used_mtime)
+
     def generate_camera_sets(self, max_incomplete_camera_sets: int=MAX_CONSECUTIVE_INCOMPLET_CAM_SETS) -> List[model.ImageSet]:
         """
         Generate camera sets, lazy way.
@@ -104,8 +182,18 @@ class TreatRederbroData:
         if not self._cam_set_generated:
             self.logger.debug("Generate camera images sets")
             self._lot_maker.load_cam_images()
-            self._cam_sets = self._lot_maker.make_gopro_set_new(threshold_max_consecutive_incomplete_sets=max_incomplete_camera_sets)
+            self._cam_sets = self._lot_maker.make_gopro_set_new(threshold_max_consecutive_incomplete_sets=max_incomplete_camera_sets,
+                                                                sparse_timestamps=self._sparse_timestamps,
+                                                                vectorized_sets=self._vectorized_sets,
+                                                                estimate_offsets=self._estimate_offsets,
+                                                                memoize_references=self._memoize_references,
+                                                                reference_search_workers=self._reference_search_workers,
+                                                                split_back_in_time=self._split_back_in_time)
             self._cam_set_generated = True
+
+            if self._ts_cache is not None:
+                self._ts_cache.flush()
+                self.logger.info("Timestamps cache, hits: %i, misses: %i", self._ts_cache.hits, self._ts_cache.misses)
         return self._cam_set_generated
 
     def make_lot(self,
@@ -123,7 +211,8 @@ class TreatRederbroData:
                     img_sets=self._cam_sets,
                     threshold_max_consecutive_incomplete_sets=max_consecutive_incomplete_sets,
                     threshold_incomplete_set_window_size=error_window_size,
-                    threshold_incomplete_set_max_in_window=max_incomplete_set_in_window)
+                    threshold_incomplete_set_max_in_window=max_incomplete_set_in_window,
+                    split_back_in_time=self._split_back_in_time)
                 self._lots_generated = True
             else:  # not meta, simply making lots
                 self._lots = [model.Lot(cam_set=s, meta=None) for s in self._cam_sets]
@@ -167,6 +256,12 @@ class TreatRederbroData:
             progression_rate = (i+1) / nb_of_lots
             on_progress_listener(progression_rate)
 
+    def close(self):
+        """ Release the pictures archives opened by the lot maker, flush and close the timestamps cache. """
+        self._lot_maker.close()
+        if self._ts_cache is not None:
+            self._ts_cache.close()
+
 class CampaignNeededException(Exception):
     """ Campaign wasn't created. """
     pass
\ No newline at end of file
@@ -23,7 +23,8 @@ setup(
         "geojson",
         "opv_api_client",
         "opv_directorymanagerclient",
-        "PyYAML"
+        "PyYAML",
+        "numpy"
     ],
     # Active la prise en compte du fichier MANIFEST.in
     include_package_data=True,
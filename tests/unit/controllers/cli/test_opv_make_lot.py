@@ -0,0 +1,52 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Test - Make lot CLI arguments.
+
+import docopt
+from path import Path
+
+from opv_import.controllers.cli import opv_make_lot
+
+
+def parse(argv):
+    return opv_make_lot.parse_arguments(docopt.docopt(opv_make_lot.__doc__, argv=argv))
+
+
+class TestOpvMakeLot(object):
+
+    def test_parse_arguments(self):
+        p = parse(["--prefetch-workers=4", "--prefetch-stream", "--watch-copies=30", "cameras/"])
+
+        assert p['cameras_dir'] == Path("cameras/")
+        assert p['number_of_devices'] == 6
+        assert p['prefetch_workers'] == 4
+        assert p['prefetch_stream'], "Streaming should be used with prefetch workers"
+        assert p['watch_copies'] == 30
+        assert p['mtime_ts_samples'] is None
+
+    def test_parse_arguments_stream_without_workers(self):
+        p = parse(["--prefetch-stream", "--watch-copies=30", "cameras/"])
+
+        assert not p['prefetch_stream'], "Streaming needs prefetch workers"
+        assert p['watch_copies'] is None
+
+    def test_parse_arguments_stream_mtime_ts(self):
+        p = parse(["--prefetch-workers=4", "--prefetch-stream", "--watch-copies=30", "--mtime-ts-samples=5", "cameras/"])
+
+        assert p['mtime_ts_samples'] == 5
+        assert not p['prefetch_stream'], "Cameras should be fetched before modification times are checked"
+        assert p['watch_copies'] is None
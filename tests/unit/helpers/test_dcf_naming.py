@@ -0,0 +1,111 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test DCF naming, properties checked on random names (seeded).
+
+import pickle
+import random
+import pytest
+from path import Path
+from opv_import.helpers import DcfNaming
+from opv_import.helpers.dcf_naming import dcf_folder_number, dcf_file_number
+
+SEEDS = range(0, 20)
+NB_SAMPLES = 500
+PREFIX_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ_0123456789%{}"
+
+
+def random_naming(rand: random.Random) -> DcfNaming:
+    prefix = "".join(rand.choice(PREFIX_CHARS) for _ in range(0, 4))
+    return DcfNaming(prefix=prefix, digit_len=rand.randint(1, 6), ext=rand.choice([".JPG", ".jpg", ".LRV", ".%d", ""]))
+
+
+def previous_index_of(naming: DcfNaming, name: str):
+    """ Index parsing of the fetcher before DcfNaming, names of indexes above the rollover excluded """
+    prefix, digit_len, ext = naming
+    if not name.startswith(prefix) or not name.endswith(ext) or len(name) < len(prefix) + len(ext):
+        return None
+    digits = name[len(prefix):len(name) - len(ext)]
+    if digits != "" and all('0' <= c <= '9' for c in digits) and prefix + str(int(digits)).zfill(digit_len) + ext == name \
+            and int(digits) <= naming.max_index:
+        return int(digits)
+    return None
+
+
+def mutate(rand: random.Random, name: str) -> str:
+    """ Random edit of a name : inserted, removed or replaced character """
+    k = rand.randint(0, len(name))
+    char = rand.choice("0123456789AZ._²٣")  # superscript two and arabic-indic three are str.isdigit()
+    edit = rand.choice(["insert", "remove", "replace"])
+    if edit == "insert":
+        return name[0:k] + char + name[k:]
+    if edit == "remove":
+        return name[0:k] + name[k + 1:]
+    return name[0:k] + char + name[k + 1:]
+
+
+class TestDcfNaming(object):
+
+    @pytest.mark.parametrize("seed", SEEDS)
+    def test_round_trip(self, seed):
+        rand = random.Random(seed)
+        naming = random_naming(rand)
+
+        for _ in range(0, NB_SAMPLES):
+            index = rand.randint(0, naming.max_index)
+            name = naming.file_name(index)
+
+            assert name == naming.prefix + str(index).zfill(naming.digit_len) + naming.ext
+            assert naming.index_of(name) == index, "Made names should be parsed back"
+            assert DcfNaming.from_file_name(name) == naming, "Naming should be parsed back from any of its names"
+
+    @pytest.mark.parametrize("seed", SEEDS)
+    def test_index_of_same_as_previous(self, seed):
+        rand = random.Random(seed)
+        naming = random_naming(rand)
+
+        for _ in range(0, NB_SAMPLES):
+            name = naming.file_name(rand.randint(0, naming.max_index))
+            for _ in range(0, rand.randint(0, 2)):
+                name = mutate(rand, name)
+
+            assert naming.index_of(name) == previous_index_of(naming, name), name
+
+    @pytest.mark.parametrize("seed", SEEDS)
+    def test_ordering(self, seed):
+        rand = random.Random(seed)
+        folders = [Path("DCIM") / "{}{}".format(rand.randint(100, 999), rand.choice(["GOPRO", "S3D_L", "_PANA"]))
+                   for _ in range(0, 50)]
+        files = [Path("DCIM/100GOPRO") / "GOPR{}.JPG".format(str(rand.randint(0, 9999)).zfill(4)) for _ in range(0, 50)]
+
+        assert sorted(folders, key=dcf_folder_number) == sorted(folders, key=lambda p: int(Path(p).basename()[0:3]))
+        assert sorted(files, key=dcf_file_number) == sorted(files, key=lambda p: int(Path(p).namebase[4:]))
+
+    def test_tuple(self):
+        naming = DcfNaming(prefix="GOPR", digit_len=4, ext=".JPG")
+
+        assert naming == ("GOPR", 4, ".JPG"), "Naming should stay usable as a tuple (manifests)"
+        assert list(naming) == ["GOPR", 4, ".JPG"]
+        assert naming._replace(ext=".LRV").file_name(3) == "GOPR0003.LRV", "Copies should be compiled too"
+        assert pickle.loads(pickle.dumps(naming)).file_name(3) == "GOPR0003.JPG", "Unpickled naming should be compiled"
+
+    def test_rollover(self):
+        naming = DcfNaming(prefix="3D_L", digit_len=4, ext=".JPG")
+
+        assert naming.max_index == 9999
+        assert not naming.is_rolled_over(9999)
+        assert naming.is_rolled_over(10000)
+        assert naming.index_of("3D_L10000.JPG") is None, "Indexes above the rollover can't be camera pictures"
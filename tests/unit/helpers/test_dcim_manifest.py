@@ -0,0 +1,70 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test DCIM manifest.
+
+import os
+from path import Path
+from opv_import.helpers import DcimManifest
+from opv_import.helpers.dcim_manifest import DCIM_MANIFEST_VERSION
+
+
+class TestDcimManifest(object):
+
+    def make_dcim(self, tmpdir) -> Path:
+        dcim = Path(str(tmpdir)) / "APN0" / "DCIM"
+        (dcim / "100GOPRO").makedirs_p()
+        (dcim / "100GOPRO" / "GOPR0001.JPG").write_bytes(b"jpeg")
+        return dcim
+
+    def test_save_load(self, tmpdir):
+        dcim = self.make_dcim(tmpdir)
+        manifest_path = dcim.parent / "dcim_manifest.json"
+        folders_mtime = DcimManifest.folders_mtime_of(dcim_folder=dcim, dcf_dirs=[dcim / "100GOPRO"])
+        DcimManifest(manifest_path=manifest_path).save(naming=("GOPR", 4, ".JPG"), folders_mtime=folders_mtime,
+                                                       pictures=[("100GOPRO/GOPR0001.JPG", 4)],
+                                                       dropped_files=["100GOPRO/GOPR0010.JPG"])
+
+        loaded = DcimManifest(manifest_path=manifest_path).load()
+        assert loaded.naming == ("GOPR", 4, ".JPG")
+        assert loaded.pictures == [("100GOPRO/GOPR0001.JPG", 4)]
+        assert loaded.dropped_files == ["100GOPRO/GOPR0010.JPG"]
+        assert set(loaded.folders_mtime.keys()) == {".", "100GOPRO"}
+        assert loaded.is_up_to_date(dcim), "Nothing changed"
+
+    def test_is_up_to_date_changed(self, tmpdir):
+        dcim = self.make_dcim(tmpdir)
+        manifest = DcimManifest(manifest_path=dcim.parent / "dcim_manifest.json")
+        manifest.save(naming=("GOPR", 4, ".JPG"), folders_mtime=DcimManifest.folders_mtime_of(dcim, [dcim / "100GOPRO"]),
+                      pictures=[("100GOPRO/GOPR0001.JPG", 4)])
+
+        (dcim / "100GOPRO" / "GOPR0002.JPG").write_bytes(b"jpeg")
+        st = os.stat(dcim / "100GOPRO")
+        os.utime(dcim / "100GOPRO", ns=(st.st_atime_ns, st.st_mtime_ns + 1))  # coarse mtime file systems
+        assert not manifest.is_up_to_date(dcim), "A picture was added"
+
+        (dcim / "100GOPRO").rmtree()
+        assert not manifest.is_up_to_date(dcim), "A folder was removed"
+
+    def test_load_ignored(self, tmpdir):
+        manifest_path = Path(str(tmpdir)) / "dcim_manifest.json"
+        assert not DcimManifest(manifest_path=manifest_path).load().is_up_to_date(Path(str(tmpdir))), "No manifest"
+
+        manifest_path.write_text('{"version": %i, "naming": ["GOPR", 4, ".JPG"], "folders_mtime": {}, "pictures": []}' % (DCIM_MANIFEST_VERSION + 1))
+        assert DcimManifest(manifest_path=manifest_path).load().naming is None, "Other version should be ignored"
+
+        manifest_path.write_text('{"version": ')
+        assert DcimManifest(manifest_path=manifest_path).load().naming is None, "Unreadable manifest should be ignored"
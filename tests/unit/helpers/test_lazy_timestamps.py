@@ -0,0 +1,56 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test lazy timestamps.
+
+from unittest.mock import MagicMock
+from opv_import.helpers import LazyTimestamps
+
+
+class TestLazyTimestamps(object):
+
+    def test_getitem_read_once(self):
+        read_ts = MagicMock(side_effect=lambda i: i * 10)
+        lazy = LazyTimestamps(pictures=range(0, 5), read_ts=read_ts)
+
+        assert len(lazy) == 5
+        assert lazy[3] == 30
+        assert lazy[3] == 30
+        assert read_ts.call_count == 1 and lazy.nb_reads == 1, "Timestamp should be read once"
+
+    def test_len_appended_pictures(self):
+        values = [0, 10, 20]
+        lazy = LazyTimestamps(pictures=values, read_ts=lambda i: values[i])
+        values.extend([30, 40])
+
+        assert len(lazy) == 5, "Appended pictures should be counted"
+        assert lazy.bisect_right(35) == 4
+
+    def test_bisect_right(self):
+        values = [0, 10, 10, 20, 30, 30, 30, 40] * 1 + list(range(50, 1050, 10))
+        lazy = LazyTimestamps(pictures=values, read_ts=lambda i: values[i])
+
+        assert lazy.bisect_right(30) == 7
+        assert lazy.bisect_right(-5) == 0
+        assert lazy.bisect_right(2000) == len(values)
+        assert lazy.bisect_right(10, lo=2, hi=5) == 3
+        assert lazy.nb_reads < 30, "Binary search should only read a few timestamps"
+
+    def test_bisect_right_not_monotonic(self):
+        values = [0, 10, 20, 30, 40, 50, 60, 70, 1, 2]
+        lazy = LazyTimestamps(pictures=values, read_ts=lambda i: values[i])
+
+        assert lazy.bisect_right(65) is None, "Back in time should be detected on probed timestamps"
@@ -0,0 +1,39 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test timestamps series back in time breaks.
+
+import numpy as np
+from opv_import.helpers.monotonic_segments import find_breaks, segment_ends, reached_ends
+
+
+class TestMonotonicSegments(object):
+
+    def test_find_breaks(self):
+        assert find_breaks([10, 12, 12, 5, 7, 3, 4]).tolist() == [3, 5], "Equal timestamps aren't back in time"
+        assert find_breaks([]).tolist() == []
+        assert find_breaks([1]).tolist() == []
+
+    def test_segment_ends(self):
+        breaks = [np.array([3, 5]), np.array([], dtype=np.int64)]
+
+        assert segment_ends(breaks, [0, 0], [7, 4]) == [3, 4]
+        assert segment_ends(breaks, [3, 2], [7, 4]) == [5, 4], "A break at the start begins the segment"
+        assert segment_ends(breaks, [6, 4], [7, 4]) == [7, 4]
+
+    def test_reached_ends(self):
+        assert reached_ends([3, 4], [3, 4], [7, 4]) == [0], "Series end isn't a break"
+        assert reached_ends([2, 4], [3, 4], [7, 4]) == []
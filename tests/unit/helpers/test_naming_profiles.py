@@ -0,0 +1,73 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test naming profiles detection.
+
+import pytest
+from opv_import.helpers import DcfNaming
+from opv_import.helpers.naming_profiles import NameTable, detect_naming_profile, is_picture_name, \
+    GOPRO_PROFILE, DCF_PROFILE, TIMESTAMP_PROFILE
+
+
+class TestNamingProfiles(object):
+
+    @pytest.mark.parametrize("folders_names, files_names, expected", [
+        (["100GOPRO", "102GOPRO"], ["GOPR0001.JPG", "GOPR0002.JPG"], GOPRO_PROFILE),
+        (["100GOPRO"], ["G0010001.JPG", "G0010002.JPG"], GOPRO_PROFILE),
+        (["100S3D_L", "101S3D_L"], ["3D_L0000.JPG", "3D_L0001.JPG"], DCF_PROFILE),
+        (["100GOPRO"], ["GOPR0001.jpg"], DCF_PROFILE),
+        (["Camera"], ["IMG_20171028_081103.jpg", "PANO_20171028-081107_1.JPG", "20171028081109.jpeg"], TIMESTAMP_PROFILE),
+        (["100GOPRO", "101GOPRO"], ["GOPR0001.JPG", "3D_L0001.JPG"], None),  # two cameras
+        (["100GOPRO"], ["GOPR0001.JPG", "G0010002.JPG", "G0010003.JPG"], GOPRO_PROFILE),  # bursts, several series
+        (["100MEDIA"], ["DSC_0001.JPG", "_DSC0002.JPG"], None),  # two DCF prefixes
+        (["MISC", "100S3D_L"], ["3D_L0000.JPG"], None),  # not a DCF folder
+        (["100MEDIA"], ["photo.jpg"], None),
+        (["100MEDIA"], [], None)])
+    def test_detect_naming_profile(self, folders_names, files_names, expected):
+        assert detect_naming_profile(folders_names=folders_names, files_names=files_names) is expected
+
+    def test_detect_naming_profile_order(self):
+        names = ["GOPR0001.JPG"]
+
+        assert detect_naming_profile(folders_names=[], files_names=names, profiles=[DCF_PROFILE, GOPRO_PROFILE]) is DCF_PROFILE
+        assert detect_naming_profile(folders_names=[], files_names=names, profiles=[TIMESTAMP_PROFILE]) is None
+
+    def test_make_naming(self):
+        assert GOPRO_PROFILE.make_naming(["GOPR0007.JPG"]) == DcfNaming(prefix="GOPR", digit_len=4, ext=".JPG")
+        assert GOPRO_PROFILE.make_naming(["G0010002.JPG", "GOPR0001.JPG", "GOPR0002.JPG", "G0020004.JPG"]) == \
+            DcfNaming(prefix="GOPR", digit_len=4, ext=".JPG"), "Main serie should be walked"
+        assert GOPRO_PROFILE.make_naming(["G0010002.JPG", "GOPR0001.JPG"]).prefix == "G001", "First sampled serie on ties"
+        assert isinstance(TIMESTAMP_PROFILE.make_naming(["IMG_20171028_081103.jpg"]), NameTable)
+
+    def test_keys(self):
+        assert sorted(["DCIM/101GOPRO", "DCIM/099GOPRO"], key=GOPRO_PROFILE.folder_key) == ["DCIM/099GOPRO", "DCIM/101GOPRO"]
+        assert sorted(["PANO_20171028_081107.jpg", "IMG_20171028_081106.jpg"], key=TIMESTAMP_PROFILE.file_key) == \
+            ["IMG_20171028_081106.jpg", "PANO_20171028_081107.jpg"], "Names should be sorted by time, then name"
+
+    def test_name_table(self):
+        table = TIMESTAMP_PROFILE.make_naming([])
+
+        assert table.index_of("IMG_20171028_081106.jpg") == 0
+        assert table.index_of("IMG_20171028_081103.jpg") == 1
+        assert table.index_of("IMG_20171028_081106.jpg") == 0, "Names should be indexed once"
+        assert table.index_of("thumbs.db") is None
+        assert table.file_name(1) == "IMG_20171028_081103.jpg"
+
+    def test_is_picture_name(self):
+        assert is_picture_name("GOPR0001.JPG")
+        assert is_picture_name("IMG_20171028_081103.jpeg")
+        assert not is_picture_name("GOPR0001.LRV")
+        assert not is_picture_name("JPG")
@@ -0,0 +1,73 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test cameras clock offsets estimation.
+
+import pytest
+import random
+from opv_import.helpers.offset_estimation import estimate_offset, choose_reference
+
+MARGIN = 3
+
+
+def shots_ts(rand: random.Random, nb: int, offset: int, missing_rate: float):
+    ts, t = [], 0
+    for _ in range(0, nb):
+        t += rand.randint(4, 8)
+        if rand.random() >= missing_rate:
+            ts.append(t + offset + rand.randint(0, 1))
+    return ts
+
+
+class TestOffsetEstimation(object):
+
+    @pytest.mark.parametrize("seed", range(0, 10))
+    def test_estimate_offset(self, seed):
+        rand = random.Random(seed)
+        offset = rand.randint(-7200, 7200)
+        ref_ts = shots_ts(random.Random(seed), nb=200, offset=0, missing_rate=0)
+        cam_ts = [ts + offset + rand.randint(-1, 1) for ts in ref_ts if rand.random() > 0.05]
+        cam_ts = [cam_ts[0] - 30, cam_ts[0] - 20] + cam_ts  # camera started earlier
+
+        estimate = estimate_offset(ref_ts=ref_ts, cam_ts=cam_ts, margin=MARGIN)
+
+        assert estimate is not None
+        assert abs(estimate.offset - offset) <= 1, "Offset should be the shots timestamps difference"
+        assert estimate.support >= 0.9 * len(cam_ts) - 2
+
+    def test_estimate_offset_regular_shots(self):
+        ref_ts = list(range(0, 1000, 5))
+
+        assert estimate_offset(ref_ts=ref_ts, cam_ts=[ts + 42 for ts in ref_ts], margin=MARGIN).offset == 42, \
+            "Pictures with the same indexes should win when shots are regular"
+
+    def test_estimate_offset_unrelated(self):
+        rand = random.Random(1)
+
+        assert estimate_offset(ref_ts=sorted(rand.sample(range(0, 100000), 100)),
+                               cam_ts=sorted(rand.sample(range(0, 100000), 100)), margin=MARGIN) is None
+        assert estimate_offset(ref_ts=[], cam_ts=[1, 2, 3], margin=MARGIN) is None
+
+    def test_choose_reference(self):
+        cams_ts = [
+            [10, 15, 21, 26, 30],
+            [100, 110, 115, 121, 126],  # offset 100
+            [-35, -29, -24, -20]]  # offset -50, 10 is missing
+
+        assert choose_reference(timestamps=cams_ts, offsets=[0, 100, -50], margin=MARGIN) == [1, 2, 0], \
+            "First picture of camera 0 should be skipped, its shot is missing on camera 2"
+        assert choose_reference(timestamps=cams_ts, offsets=[0, 100, -50], margin=MARGIN, nb_candidates=1) is None
+        assert choose_reference(timestamps=[[1, 2], []], offsets=[0, 0], margin=MARGIN) is None
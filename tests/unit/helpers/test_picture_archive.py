@@ -0,0 +1,124 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test pictures archive.
+
+import io
+import errno
+import tarfile
+import zipfile
+import pytest
+from unittest.mock import patch
+from path import Path
+from opv_import.helpers import PictureArchive
+
+FILES = {
+    "APN0/DCIM/100GOPRO/GOPR0001.JPG": b"first picture" * 100,
+    "APN0/DCIM/100GOPRO/GOPR0002.JPG": b"second picture" * 100,
+    "APN0/DCIM/101GOPRO/GOPR0003.JPG": b"",
+    "APN0/MISC/notes.txt": b"notes",
+}
+
+
+def make_tar(archive_path: Path):
+    with tarfile.open(archive_path, "w") as tar:
+        for name, data in FILES.items():
+            info = tarfile.TarInfo(name="./" + name)
+            info.size = len(data)
+            info.mtime = 1500000000
+            tar.addfile(info, io.BytesIO(data))
+
+
+def make_zip(archive_path: Path, compression: int=zipfile.ZIP_STORED):
+    with zipfile.ZipFile(archive_path, "w", compression=compression) as archive:
+        for name, data in FILES.items():
+            archive.writestr(name, data)
+
+
+@pytest.fixture(params=["tar", "zip"])
+def archive_path(request, tmpdir):
+    archive_path = Path(str(tmpdir)) / "APN0.{}".format(request.param)
+    make_tar(archive_path) if request.param == "tar" else make_zip(archive_path)
+    return archive_path
+
+
+class TestPictureArchive(object):
+
+    def test_members(self, archive_path):
+        with PictureArchive(archive_path=archive_path) as archive:
+            assert len(archive) == len(FILES)
+            for name, data in FILES.items():
+                offset, size = archive.byte_range(archive_path / name)
+                assert size == len(data)
+                assert archive_path.bytes()[offset:offset + size] == data, "Byte range should be the member data"
+
+            dcim_folder = archive.find_dcim_folder()
+            assert dcim_folder == archive_path / "APN0/DCIM"
+            assert archive.dirs(dcim_folder) == [dcim_folder / "100GOPRO", dcim_folder / "101GOPRO"]
+            assert archive.file_names(dcim_folder / "100GOPRO") == ["GOPR0001.JPG", "GOPR0002.JPG"]
+            assert archive.file_names(dcim_folder / "102GOPRO") == [], "Missing folders should be empty"
+
+            with pytest.raises(FileNotFoundError):
+                archive.byte_range(dcim_folder / "100GOPRO/GOPR0004.JPG")
+
+    def test_open(self, archive_path):
+        with PictureArchive(archive_path=archive_path) as archive:
+            data = FILES["APN0/DCIM/100GOPRO/GOPR0002.JPG"]
+            with archive.open(archive_path / "APN0/DCIM/100GOPRO/GOPR0002.JPG") as f:
+                assert f.read(6) == data[0:6]
+                f.seek(-4, io.SEEK_END)
+                assert f.read() == data[-4:], "Reads should stop at the member end"
+                f.seek(10)
+                assert f.tell() == 10
+                assert f.read() == data[10:]
+
+    def test_copy_range(self, archive_path, tmpdir):
+        dest = Path(str(tmpdir)) / "copy.JPG"
+        data = FILES["APN0/DCIM/100GOPRO/GOPR0001.JPG"]
+        with PictureArchive(archive_path=archive_path) as archive:
+            offset, size = archive.byte_range(archive_path / "APN0/DCIM/100GOPRO/GOPR0001.JPG")
+            archive.copy_range(offset=offset, size=size, dest=dest)
+            assert dest.bytes() == data
+
+            with patch("os.copy_file_range", side_effect=OSError(errno.EXDEV, "cross device"), create=True):
+                archive.copy_range(offset=offset, size=size, dest=dest)
+            assert dest.bytes() == data, "Data should be copied when copy_file_range isn't supported"
+
+    def test_index_file(self, archive_path):
+        first = PictureArchive(archive_path=archive_path)
+        assert first.index_path.exists(), "Members index should be saved next to the archive"
+
+        with patch.object(PictureArchive, "_index") as mock_index:
+            second = PictureArchive(archive_path=archive_path)
+        assert not mock_index.called, "Unchanged archive shouldn't be indexed again"
+        assert second.members == first.members
+
+        archive_path.write_bytes(archive_path.bytes() + b"\x00" * 1024)
+        with patch.object(PictureArchive, "_index") as mock_index:
+            PictureArchive(archive_path=archive_path)
+        assert mock_index.called, "Changed archive should be indexed again"
+
+    def test_compressed(self, tmpdir):
+        zip_path = Path(str(tmpdir)) / "APN0.zip"
+        make_zip(zip_path, compression=zipfile.ZIP_DEFLATED)
+        with pytest.raises(ValueError):
+            PictureArchive(archive_path=zip_path)
+
+        tar_path = Path(str(tmpdir)) / "APN0.tar"
+        with tarfile.open(tar_path, "w:gz") as tar:
+            tar.add(str(zip_path), arcname="DCIM/100GOPRO/GOPR0001.JPG")
+        with pytest.raises(ValueError):
+            PictureArchive(archive_path=tar_path)
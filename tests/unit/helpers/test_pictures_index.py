@@ -0,0 +1,64 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test pictures index.
+
+from path import Path
+from opv_import.helpers import PicturesIndex
+
+
+class TestPicturesIndex(object):
+
+    def test_save_load(self, tmpdir):
+        index_path = Path(str(tmpdir)) / "APN0" / "pictures_index.csv"
+        index = PicturesIndex(index_path=index_path)
+        index.add(rel_path=Path("DCIM/100GOPRO/GOPR0002.JPG"), size=20, ts=1500000002)
+        index.add(rel_path="DCIM/100GOPRO/GOPR0001.JPG", size=10, ts=1500000001)
+        index.save()
+
+        loaded = PicturesIndex(index_path=index_path).load()
+        assert len(loaded) == 2
+        assert loaded.get_timestamp(rel_path=Path("DCIM/100GOPRO/GOPR0001.JPG"), size=10) == 1500000001
+        assert loaded.get_timestamp(rel_path="DCIM/100GOPRO/GOPR0002.JPG", size=20) == 1500000002
+
+    def test_get_timestamp_missing(self, tmpdir):
+        index = PicturesIndex(index_path=Path(str(tmpdir)) / "pictures_index.csv").load()
+        index.add(rel_path="DCIM/100GOPRO/GOPR0001.JPG", size=10, ts=1500000001)
+
+        assert len(index) == 1
+        assert index.get_timestamp(rel_path="DCIM/100GOPRO/GOPR0001.JPG", size=11) is None, "Size changed, entry invalid"
+        assert index.get_timestamp(rel_path="DCIM/100GOPRO/GOPR0003.JPG", size=10) is None, "Not indexed"
+
+    def test_exif_tags(self, tmpdir):
+        index_path = Path(str(tmpdir)) / "pictures_index.csv"
+        index = PicturesIndex(index_path=index_path)
+        index.add(rel_path="DCIM/100GOPRO/GOPR0001.JPG", size=10, ts=1500000001, tags={"iso": "100", "serial_number": None})
+        index.add(rel_path="DCIM/100GOPRO/GOPR0002.JPG", size=20, ts=1500000002)
+        index.save()
+
+        loaded = PicturesIndex(index_path=index_path).load()
+        assert loaded.get_exif_tags(rel_path="DCIM/100GOPRO/GOPR0001.JPG", size=10, names=["iso"]) == {"iso": "100", "serial_number": None}
+        assert loaded.get_exif_tags(rel_path="DCIM/100GOPRO/GOPR0001.JPG", size=10, names=["iso", "make"]) is None, \
+            "Tags not extracted when indexed"
+        assert loaded.get_exif_tags(rel_path="DCIM/100GOPRO/GOPR0002.JPG", size=20, names=[]) is None, "No tags indexed"
+
+    def test_load_without_exif_tags(self, tmpdir):
+        index_path = Path(str(tmpdir)) / "pictures_index.csv"
+        index_path.write_text("path;size;timestamp\nDCIM/100GOPRO/GOPR0001.JPG;10;1500000001\n")
+
+        index = PicturesIndex(index_path=index_path).load()
+        assert index.get_timestamp(rel_path="DCIM/100GOPRO/GOPR0001.JPG", size=10) == 1500000001
+        assert index.get_exif_tags(rel_path="DCIM/100GOPRO/GOPR0001.JPG", size=10, names=[]) is None
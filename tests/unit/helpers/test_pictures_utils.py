@@ -0,0 +1,159 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test pictures utils.
+
+import io
+import struct
+import datetime
+import pytest
+from unittest.mock import patch
+from path import Path
+from opv_import.helpers import pictures_utils
+
+
+def make_jpeg(date: bytes=b"2017:10:28 08:11:03", endian: str='<', app0_size: int=16, with_exif_ifd: bool=True) -> bytes:
+    """
+    Build a minimal JPEG with an exif APP1 segment (IFD0 + Exif IFD), GoPro like layout.
+    """
+    order = b'II' if endian == '<' else b'MM'
+
+    def ifd(entries, offset, next_ifd=0):
+        """ entries: (tag, type, count, data), returns IFD bytes and the data area placed after it """
+        data_offset = offset + 2 + 12 * len(entries) + 4
+        body = struct.pack(endian + 'H', len(entries))
+        data = b''
+        for tag, typ, count, value in entries:
+            if isinstance(value, int):
+                body += struct.pack(endian + 'HHII', tag, typ, count, value)
+            else:
+                body += struct.pack(endian + 'HHII', tag, typ, count, data_offset + len(data))
+                data += value
+        return body + struct.pack(endian + 'I', next_ifd) + data
+
+    ifd0_entries = [(0x010F, 2, 6, b'GoPro\x00'), (0x0110, 2, 13, b'HERO4 Black\x00\x00')]
+    ifd0_size = 2 + 12 * (len(ifd0_entries) + int(with_exif_ifd)) + 4 + 6 + 13
+    exif_ifd_offset = 8 + ifd0_size
+    if with_exif_ifd:
+        ifd0_entries.append((0x8769, 4, 1, exif_ifd_offset))
+    exif_entries = [(0x829A, 5, 1, struct.pack(endian + 'II', 1, 240)), (0x9003, 2, 20, date + b'\x00')]
+
+    tiff = order + struct.pack(endian + 'HI', 42, 8) + ifd(ifd0_entries, 8)
+    if with_exif_ifd:
+        tiff += ifd(exif_entries, exif_ifd_offset)
+
+    app0 = b'\xff\xe0' + struct.pack('>H', app0_size + 2) + b'\x00' * app0_size
+    app1 = b'\xff\xe1' + struct.pack('>H', len(tiff) + 8) + b'Exif\x00\x00' + tiff
+    return b'\xff\xd8' + app0 + app1 + b'\xff\xda\x00\x02' + b'\x00' * 64 + b'\xff\xd9'
+
+
+def expected_ts(date: str) -> int:
+    return int(datetime.datetime.strptime(date, "%Y:%m:%d %H:%M:%S").timestamp())
+
+
+class TestPicturesUtils(object):
+
+    @pytest.mark.parametrize("endian", ['<', '>'])
+    def test_read_exif_fast_time(self, endian, tmpdir):
+        pic = Path(str(tmpdir)) / "3D_L0001.JPG"
+        pic.write_bytes(make_jpeg(endian=endian))
+
+        assert pictures_utils.read_exif_fast(pic, tags={}) == (expected_ts("2017:10:28 08:11:03"), {})
+
+    def test_read_exif_fast_time_same_as_exifread(self, tmpdir):
+        pic = Path(str(tmpdir)) / "3D_L0001.JPG"
+        pic.write_bytes(make_jpeg(date=b"2018:01:02 23:59:58"))
+
+        with patch("opv_import.helpers.pictures_utils.read_exif_fast", return_value=None):
+            exifread_ts = pictures_utils.read_exif_time(pic)
+
+        assert pictures_utils.read_exif_fast(pic, tags={})[0] == exifread_ts
+
+    def test_read_exif_fast_undecided(self, tmpdir):
+        pic = Path(str(tmpdir)) / "3D_L0001.JPG"
+
+        pic.write_bytes(b"not a jpeg")
+        assert pictures_utils.read_exif_fast(pic, tags={}) is None, "Not a JPEG"
+
+        pic.write_bytes(make_jpeg(with_exif_ifd=False))
+        assert pictures_utils.read_exif_fast(pic, tags={}) is None, "No exif IFD"
+
+        pic.write_bytes(make_jpeg(app0_size=200))
+        assert pictures_utils.read_exif_fast(pic, tags={}, read_size=100) is None, "Exif outside of the read header"
+
+    @patch("exifread.process_file")
+    def test_read_exif_time_fallback(self, mock_process_file, tmpdir):
+        pic = Path(str(tmpdir)) / "3D_L0001.JPG"
+        pic.write_bytes(make_jpeg())
+
+        assert pictures_utils.read_exif_time(pic) == expected_ts("2017:10:28 08:11:03")
+        assert not mock_process_file.called, "exifread shouldn't be used when the fast reader decides"
+
+        pic.write_bytes(make_jpeg(with_exif_ifd=False))
+        mock_process_file.return_value = {'EXIF DateTimeOriginal': type("Tag", (), {'values': "2017:10:28 08:11:05"})}
+
+        assert pictures_utils.read_exif_time(pic) == expected_ts("2017:10:28 08:11:05")
+        assert mock_process_file.call_count == 1, "exifread should be used as fallback"
+        assert mock_process_file.call_args[1]["stop_tag"] == "DateTimeOriginal", "exifread should stop after the time"
+
+    @pytest.mark.parametrize("endian", ['<', '>'])
+    def test_read_exif(self, endian, tmpdir):
+        pic = Path(str(tmpdir)) / "3D_L0001.JPG"
+        pic.write_bytes(make_jpeg(endian=endian))
+        tags = {"make": ("Image", 0x010F), "model": ("Image", 0x0110), "exposure_time": ("EXIF", 0x829A), "iso": ("EXIF", 0x8827)}
+
+        ts, values = pictures_utils.read_exif(pic, tags=tags)
+
+        assert ts == expected_ts("2017:10:28 08:11:03")
+        assert values == {"make": "GoPro", "model": "HERO4 Black", "exposure_time": "1/240", "iso": None}
+
+    def test_read_exif_fast_same_as_exifread(self, tmpdir):
+        pic = Path(str(tmpdir)) / "3D_L0001.JPG"
+        pic.write_bytes(make_jpeg())
+        tags = {"make": ("Image", 0x010F), "model": ("Image", 0x0110), "exposure_time": ("EXIF", 0x829A), "iso": ("EXIF", 0x8827)}
+
+        with patch("opv_import.helpers.pictures_utils.read_exif_fast", return_value=None):
+            exifread_result = pictures_utils.read_exif(pic, tags=tags)
+
+        assert pictures_utils.read_exif_fast(pic, tags=tags) == exifread_result
+
+    def test_read_exif_fast_value_outside_header(self, tmpdir):
+        pic = Path(str(tmpdir)) / "3D_L0001.JPG"
+        pic.write_bytes(make_jpeg())
+        tags = {"exposure_time": ("EXIF", 0x829A)}
+
+        assert pictures_utils.read_exif_fast(pic, tags=tags, read_size=130) is None, "Can't be decided on a truncated header"
+
+    def test_read_exif_file(self):
+        tags = {"make": ("Image", 0x010F), "iso": ("EXIF", 0x8827)}
+
+        ts, values = pictures_utils.read_exif_file(io.BytesIO(make_jpeg()), tags=tags)
+
+        assert ts == expected_ts("2017:10:28 08:11:03")
+        assert values == {"make": "GoPro", "iso": None}
+
+    @patch("exifread.process_file")
+    def test_read_exif_file_fallback(self, mock_process_file):
+        mock_process_file.return_value = {'EXIF DateTimeOriginal': type("Tag", (), {'values': "2017:10:28 08:11:05"})}
+        f = io.BytesIO(make_jpeg(with_exif_ifd=False))
+
+        ts, values = pictures_utils.read_exif_file(f, tags={"iso": ("EXIF", 0x8827)})
+
+        assert ts == expected_ts("2017:10:28 08:11:05")
+        assert values == {"iso": None}
+        assert mock_process_file.call_args[0][0] is f, "exifread should read the same file"
+        assert f.tell() == 0, "exifread should read from the picture start"
+        assert mock_process_file.call_args[1]["stop_tag"] == "UNDEF", "exifread should read the wanted tags too"
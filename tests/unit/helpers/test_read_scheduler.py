@@ -0,0 +1,93 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test disk locality read scheduler.
+
+import os
+import pytest
+from unittest.mock import patch
+from path import Path
+from opv_import.helpers import read_scheduler
+
+
+class TestReadScheduler(object):
+
+    @pytest.fixture
+    def pictures(self, tmpdir):
+        paths = []
+        for i in range(0, 5):
+            p = Path(str(tmpdir)) / "GOPR000{}.JPG".format(i)
+            p.write_bytes(b"jpeg" * 100)
+            paths.append(p)
+        return paths
+
+    def test_order_by_locality_index(self, pictures):
+        assert read_scheduler.order_by_locality(pictures, read_order=read_scheduler.READ_ORDER_INDEX) == [0, 1, 2, 3, 4]
+
+    def test_order_by_locality_inode(self, pictures):
+        order = read_scheduler.order_by_locality(pictures, read_order=read_scheduler.READ_ORDER_INODE)
+        inodes = [os.stat(pictures[i]).st_ino for i in order]
+
+        assert sorted(order) == [0, 1, 2, 3, 4], "Should be a permutation"
+        assert inodes == sorted(inodes), "Should be ordered by inode"
+
+    @patch("opv_import.helpers.read_scheduler.physical_offset")
+    def test_order_by_locality_extent(self, mock_physical_offset, pictures):
+        offsets = {p: o for p, o in zip(pictures, [500, 100, 400, 200, 300])}
+        mock_physical_offset.side_effect = lambda p: offsets[p]
+
+        assert read_scheduler.order_by_locality(pictures, read_order=read_scheduler.READ_ORDER_EXTENT) == [1, 3, 4, 2, 0]
+
+    @patch("opv_import.helpers.read_scheduler.physical_offset")
+    def test_order_by_locality_extent_fallback(self, mock_physical_offset, pictures):
+        mock_physical_offset.return_value = None
+
+        order = read_scheduler.order_by_locality(pictures, read_order=read_scheduler.READ_ORDER_EXTENT)
+        assert order == read_scheduler.order_by_locality(pictures, read_order=read_scheduler.READ_ORDER_INODE), \
+            "Should fallback to inode order"
+
+    def test_order_by_locality_unknown(self, pictures):
+        with pytest.raises(ValueError):
+            read_scheduler.order_by_locality(pictures, read_order="random")
+
+    def test_physical_offset_not_available(self, tmpdir):
+        assert read_scheduler.physical_offset(str(tmpdir) + "/404.JPG") is None
+
+    @pytest.mark.skipif(not hasattr(os, "posix_fadvise"), reason="posix_fadvise not available")
+    @patch("os.posix_fadvise")
+    def test_advise_will_need(self, mock_fadvise, pictures):
+        read_scheduler.advise_will_need(pictures + [Path("/404.JPG")], length=1024)
+
+        assert mock_fadvise.call_count == 5, "Should advise existing files only"
+        assert all(c[0][1:] == (0, 1024, os.POSIX_FADV_WILLNEED) for c in mock_fadvise.call_args_list)
+
+    def test_is_cached(self, pictures):
+        assert read_scheduler.is_cached(pictures[0]) in [True, None], "Just written file should be in page cache"
+        assert read_scheduler.is_cached("/404.JPG") is None
+
+    def test_is_cached_mincore(self, pictures):
+        assert read_scheduler._is_cached_mincore(pictures[0]) is True, "Just written file should be in page cache"
+        assert read_scheduler._is_cached_mincore("/404.JPG") is None
+
+    @patch("opv_import.helpers.read_scheduler.is_cached")
+    def test_cached_ratio(self, mock_is_cached, pictures):
+        mock_is_cached.side_effect = [True, False, True, True]
+        assert read_scheduler.cached_ratio(pictures[:4]) == 0.75
+
+        mock_is_cached.side_effect = [True, None]
+        assert read_scheduler.cached_ratio(pictures[:2]) is None, "Unknown when a file can't be checked"
+
+        assert read_scheduler.cached_ratio([]) is None
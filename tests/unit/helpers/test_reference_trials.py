@@ -0,0 +1,48 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test rejected reference candidates memo.
+
+from opv_import.helpers.reference_trials import ReferenceTrials
+
+
+class TestReferenceTrials(object):
+
+    def test_key(self):
+        trials = ReferenceTrials()
+
+        assert trials.key([100, 130, 94]) == (30, -6)
+        assert trials.key([105, 135, 99]) == trials.key([100, 130, 94]), "Shifted candidates share a key"
+        assert trials.key([100, 131, 94]) != trials.key([100, 130, 94]), "Offsets should be exact"
+
+    def test_is_rejected(self):
+        trials = ReferenceTrials()
+        trials.add_rejection(ref_ts=[100, 130, 94], path_indexes=[[0, 0, 0], [1, 1, 1], [2, 1, 2], [3, 2, 2]], nb_last_sets=2)
+
+        assert trials.is_rejected(ref_ts=[105, 135, 99], indexes=[1, 1, 1]), "Candidate on the path should be rejected"
+        assert not trials.is_rejected(ref_ts=[105, 135, 99], indexes=[2, 1, 2]), "Last sets wouldn't be enough to reject it"
+        assert not trials.is_rejected(ref_ts=[105, 135, 99], indexes=[1, 1, 2]), "Not on the path"
+        assert not trials.is_rejected(ref_ts=[105, 136, 99], indexes=[1, 1, 1]), "Other offsets"
+        assert trials.stats() == {'hits': 1, 'misses': 3, 'nb_entries': 2, 'hit_rate': 1 / 4}
+
+        trials.add_rejection(ref_ts=[100, 130, 94], path_indexes=[[2, 1, 2], [3, 2, 2]], nb_last_sets=0)
+
+        assert trials.is_rejected(ref_ts=[105, 135, 99], indexes=[3, 2, 2]), "Generation ended, whole path is rejected"
+
+        trials.clear()
+
+        assert not trials.is_rejected(ref_ts=[105, 135, 99], indexes=[1, 1, 1])
+        assert trials.stats()['nb_entries'] == 0 and trials.stats()['misses'] == 4, "Stats should be kept"
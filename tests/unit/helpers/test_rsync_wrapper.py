@@ -54,6 +54,29 @@ class TestRsyncWrapper(object):
         assert my_listener.call_args_list == [call()]
         assert my_other_listener.call_args_list == [call()]
 
+    @patch("opv_import.helpers.RsyncWrapper._read_current_popen_stdout")
+    @patch("subprocess.Popen")
+    def test_run_file_transferred(self, mock_popen, mock_read_iter):
+        mock_read_iter.return_value = [
+            "sending incremental file list",
+            "DCIM/",
+            "DCIM/100GOPRO/",
+            "DCIM/100GOPRO/GOPR0001.JPG",
+            "      1,133,445 50%   30.88MB/s    0:00:00",
+            "      2,266,891 100%   30.88MB/s    0:00:00 (xfr#1, to-chk=1/4)",
+            "DCIM/100GOPRO/GOPR0002.JPG",
+            "     30,566,258 100%   29.50MB/s    0:00:00 (xfr#2, to-chk=0/4)",
+            "",
+            "sent 32,841,000 bytes  received 54 bytes  21,894,036.00 bytes/sec"
+        ]
+        my_listener = MagicMock(Callable)
+
+        rsync = RsyncWrapper(source_path=Path("/tmp/a"), destination_path=Path("/tmp/b"))
+        assert rsync.on_file_transferred(my_listener) == "file_transferred_0", "Default event listener name, first one"
+        rsync.run()
+
+        assert my_listener.call_args_list == [call(Path("DCIM/100GOPRO/GOPR0001.JPG")), call(Path("DCIM/100GOPRO/GOPR0002.JPG"))]
+
     def test__read_current_popen_stdout(self):
         # Unable to find a suitable a not too complexe test for it
         assert True
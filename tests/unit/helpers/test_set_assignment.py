@@ -0,0 +1,81 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test cameras sets assignment.
+
+import pytest
+import numpy as np
+from unittest.mock import patch
+from opv_import.helpers.set_assignment import assign_sets, _window_starts, _is_lexico_less_equal, NO_PICTURE
+
+M = NO_PICTURE
+
+
+class TestSetAssignment(object):
+
+    def test_window_starts(self):
+        values = np.array([0, 1, 2, 3, 7, 8, 9, 10, 20])
+
+        next_starts = np.searchsorted(values, values + 3, side="left")
+        assert _window_starts(next_starts).tolist() == [0, 3, 4, 7, 8]
+        assert _window_starts(np.minimum(next_starts[0:1], 1)).tolist() == [0]
+
+    def test_is_lexico_less_equal(self):
+        rows = np.array([[3, 1], [3, 2], [2, 9], [4, 0]])
+
+        assert _is_lexico_less_equal(rows, np.array([3, 1])).tolist() == \
+            [[3, 1] <= [3, 1], [3, 2] <= [3, 1], [2, 9] <= [3, 1], [4, 0] <= [3, 1]]
+
+    @pytest.mark.parametrize("chunk_size", [4096, 2])
+    def test_assign_sets(self, chunk_size):
+        with patch("opv_import.helpers.set_assignment.WINDOWS_CHUNK_SIZE", chunk_size):
+            assignment = assign_sets(timestamps=[np.array([28, 40, 42, 50]), np.array([50, 60])], ref_ts=[40, 50],
+                                     start_indexes=[0, 0], margin=3)
+
+        assert assignment.indexes.tolist() == [[0, M], [1, 0], [2, M], [3, 1]]
+        assert assignment.next_indexes.tolist() == [[1, 0], [2, 1], [3, 1], [4, 2]]
+        assert assignment.break_indexes is None
+
+    def test_assign_sets_back_in_time(self):
+        assignment = assign_sets(timestamps=[np.array([28, 40, 30, 50]), np.array([50, 60])], ref_ts=[40, 50],
+                                 start_indexes=[0, 0], margin=3)
+
+        assert assignment.indexes.tolist() == [[0, M], [1, 0]], "Sets should end before the back in time"
+        assert assignment.break_indexes == [2, 1]
+        assert assignment.break_cams == [0]
+
+    def test_assign_sets_end_indexes(self):
+        timestamps = [np.array([28, 40, 30, 50]), np.array([50, 60])]
+        expected = assign_sets(timestamps=timestamps, ref_ts=[40, 50], start_indexes=[0, 0], margin=3)
+
+        with patch("numpy.diff") as mock_diff:
+            assignment = assign_sets(timestamps=timestamps, ref_ts=[40, 50], start_indexes=[0, 0], margin=3, end_indexes=[2, 2])
+
+        assert mock_diff.call_count == 0, "Breaks given by the end indexes shouldn't be searched"
+        assert assignment.indexes.tolist() == expected.indexes.tolist()
+        assert assignment.break_indexes == expected.break_indexes and assignment.break_cams == expected.break_cams
+
+    def test_assign_sets_last_indexes(self):
+        # generation stops once the first camera is consumed, as the generator compares indexes lists
+        assignment = assign_sets(timestamps=[np.array([0, 10]), np.array([0, 10, 20, 30])], ref_ts=[0, 0],
+                                 start_indexes=[0, 0], margin=3)
+
+        assert assignment.indexes.tolist() == [[0, 0], [1, 1]]
+        assert assign_sets(timestamps=[np.array([0])], ref_ts=[0], start_indexes=[1], margin=3).indexes.shape == (0, 1)
+
+    def test_assign_sets_margin(self):
+        with pytest.raises(ValueError):
+            assign_sets(timestamps=[np.array([0])], ref_ts=[0], start_indexes=[0], margin=0)
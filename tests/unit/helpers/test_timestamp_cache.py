@@ -0,0 +1,138 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test pictures timestamps cache.
+
+import os
+import sqlite3
+from unittest.mock import patch
+from path import Path
+from opv_import.helpers import TimestampCache
+
+
+class TestTimestampCache(object):
+
+    def make_pic(self, tmpdir, name: str, content: bytes=b"jpeg") -> Path:
+        pic = Path(str(tmpdir)) / name
+        pic.write_bytes(content)
+        return pic
+
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_get_timestamp_persistent(self, mock_read_exif, tmpdir):
+        mock_read_exif.return_value = (42, {})
+        pic = self.make_pic(tmpdir, "3D_L0001.JPG")
+        db_path = Path(str(tmpdir)) / "cache.sqlite"
+
+        cache = TimestampCache(db_path=db_path)
+        assert cache.get_timestamp(pic) == 42
+        assert cache.get_timestamp(pic) == 42
+        assert (cache.hits, cache.misses) == (1, 1), "Second read should be a hit"
+        cache.close()
+
+        cache = TimestampCache(db_path=db_path)
+        assert cache.get_timestamp(pic) == 42
+        assert (cache.hits, cache.misses) == (1, 0), "Cache wasn't persisted"
+        assert mock_read_exif.call_count == 1, "Exif should be read once"
+        cache.close()
+
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_get_timestamp_invalidated(self, mock_read_exif, tmpdir):
+        mock_read_exif.return_value = (42, {})
+        pic = self.make_pic(tmpdir, "3D_L0001.JPG")
+        cache = TimestampCache(db_path=Path(str(tmpdir)) / "cache.sqlite")
+        cache.get_timestamp(pic)
+
+        pic.write_bytes(b"a new jpeg")
+        mock_read_exif.return_value = (50, {})
+
+        assert cache.get_timestamp(pic) == 50, "Modified file should be read again"
+        assert (cache.hits, cache.misses) == (0, 2)
+        cache.close()
+
+    def test_put_relative_key(self, tmpdir):
+        pic = self.make_pic(tmpdir, "3D_L0001.JPG")
+        cache = TimestampCache(db_path=Path(str(tmpdir)) / "cache.sqlite")
+        cache.put(pic_path=pic, ts=12)
+        cache.flush()
+
+        rows = list(cache._conn.execute("SELECT path, ts FROM pictures_ts"))
+        assert rows == [("3D_L0001.JPG", 12)], "Path should be stored relative to the cache folder"
+        cache.close()
+
+    def test_put_keep_tags(self, tmpdir):
+        pic = self.make_pic(tmpdir, "3D_L0001.JPG")
+        db_path = Path(str(tmpdir)) / "cache.sqlite"
+        cache = TimestampCache(db_path=db_path, exif_tags={"iso": ("EXIF", 0x8827)})
+        cache.put(pic_path=pic, ts=42, tags={"iso": "100"})
+        cache.put(pic_path=pic, ts=42)
+        cache.close()
+
+        cache = TimestampCache(db_path=db_path, exif_tags={"iso": ("EXIF", 0x8827)})
+        assert cache._entries["3D_L0001.JPG"][3] == {"iso": "100"}, "Cached tags shouldn't be dropped"
+        cache.close()
+
+        pic.write_bytes(b"jpeg modified")
+        cache = TimestampCache(db_path=db_path, exif_tags={"iso": ("EXIF", 0x8827)})
+        cache.put(pic_path=pic, ts=43)
+        assert cache._entries["3D_L0001.JPG"][3] is None, "Tags of a modified picture shouldn't be kept"
+        cache.close()
+
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_lookup(self, mock_read_exif, tmpdir):
+        pic = self.make_pic(tmpdir, "3D_L0001.JPG")
+        cache = TimestampCache(db_path=Path(str(tmpdir)) / "cache.sqlite")
+
+        assert cache.lookup(pic) is None
+        cache.put(pic_path=pic, ts=12)
+        assert cache.lookup(pic) == 12
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert mock_read_exif.call_count == 0, "Lookup shouldn't read exif"
+        cache.close()
+
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_get_exif(self, mock_read_exif, tmpdir):
+        mock_read_exif.return_value = (42, {"iso": "100"})
+        pic = self.make_pic(tmpdir, "3D_L0001.JPG")
+        db_path = Path(str(tmpdir)) / "cache.sqlite"
+
+        cache = TimestampCache(db_path=db_path, exif_tags={"iso": ("EXIF", 0x8827)})
+        cache.put(pic_path=pic, ts=42)  # timestamp only
+        assert cache.get_exif(pic) == (42, {"iso": "100"}), "Tags should be read when not cached"
+        cache.close()
+
+        cache = TimestampCache(db_path=db_path, exif_tags={"iso": ("EXIF", 0x8827)})
+        assert cache.get_exif(pic) == (42, {"iso": "100"})
+        assert mock_read_exif.call_count == 1, "Tags weren't persisted"
+
+        cache.exif_tags = {"iso": ("EXIF", 0x8827), "make": ("Image", 0x010F)}
+        cache.get_exif(pic)
+        assert mock_read_exif.call_count == 2, "Tags should be read again when new tags are wanted"
+        cache.close()
+
+    def test_migrate_without_tags(self, tmpdir):
+        pic = self.make_pic(tmpdir, "3D_L0001.JPG")
+        db_path = Path(str(tmpdir)) / "cache.sqlite"
+        st = os.stat(pic)
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("CREATE TABLE pictures_ts (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL, ts INTEGER NOT NULL)")
+        conn.execute("INSERT INTO pictures_ts VALUES (?, ?, ?, ?)", ("3D_L0001.JPG", st.st_size, st.st_mtime_ns, 12))
+        conn.commit()
+        conn.close()
+
+        cache = TimestampCache(db_path=db_path)
+        assert cache.get_timestamp(pic) == 12, "Old cache entries should be kept"
+        cache.put(pic_path=pic, ts=12, tags={"iso": "100"})
+        cache.close()
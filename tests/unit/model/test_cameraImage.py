@@ -17,17 +17,18 @@
 # Description: Unit test camera image.
 
 import pytest
-from unittest.mock import patch, call
+from unittest.mock import patch, call, MagicMock
 from opv_import.model import CameraImage
+from opv_import.config import EXIF_EXTRA_TAGS
 from path import Path
 
 class TestCameraImage(object):
 
-    @patch('opv_import.helpers.pictures_utils.read_exif_time')
+    @patch('opv_import.helpers.pictures_utils.read_exif')
     def test_get_timestamp_ok(self, pic_util_mock):
         ts = 10
         path = Path("toto.jpg")
-        pic_util_mock.return_value = ts
+        pic_util_mock.return_value = (ts, {"iso": "100"})
         cam_pic = CameraImage(path=path)
         obtained_ts = cam_pic.get_timestamp()
 
@@ -36,10 +37,12 @@ class TestCameraImage(object):
         cam_pic.get_timestamp()
 
         assert len(pic_util_mock.call_args_list) == 1, "Exif reader was called more than once (performance issu)"
-        assert pic_util_mock.call_args_list[0] == call(path), "Exif reader was called with the wrong image path"
+        assert pic_util_mock.call_args_list[0] == call(path, tags=EXIF_EXTRA_TAGS), "Exif reader was called with the wrong image path"
         assert obtained_ts == ts, "Wrong timestamp"
+        assert cam_pic.get_exif_tags() == {"iso": "100"}, "Exif tags should be read along with the timestamp"
+        assert len(pic_util_mock.call_args_list) == 1, "Exif tags should be read in the same pass"
 
-    @patch('opv_import.helpers.pictures_utils.read_exif_time')
+    @patch('opv_import.helpers.pictures_utils.read_exif')
     def test_get_timestamp_failed(self, pic_util_mock):
         path = Path("404.jpg")
         cam_pic = CameraImage(path=path)
@@ -49,6 +52,28 @@ class TestCameraImage(object):
         with pytest.raises(FileNotFoundError):
             cam_pic.get_timestamp()
 
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_get_timestamp_with_cache(self, pic_util_mock):
+        path = Path("toto.jpg")
+        ts_cache = MagicMock()
+        ts_cache.get_exif.return_value = (10, {"iso": "100"})
+        cam_pic = CameraImage(path=path, ts_cache=ts_cache)
+
+        assert cam_pic.get_timestamp() == 10, "Wrong timestamp"
+        assert cam_pic.get_timestamp() == 10, "Wrong timestamp"
+        assert cam_pic.get_exif_tags() == {"iso": "100"}, "Wrong exif tags"
+        assert ts_cache.get_exif.call_args_list == [call(path)], "Cache should be used once"
+        assert not pic_util_mock.called, "Exif shouldn't be read directly when using a cache"
+
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_get_exif_tags_known_timestamp(self, pic_util_mock):
+        pic_util_mock.return_value = (12, {"iso": "100"})
+        cam_pic = CameraImage(path=Path("toto.jpg"))
+        cam_pic._ts = 10  # from index or modification time
+
+        assert cam_pic.get_exif_tags() == {"iso": "100"}
+        assert cam_pic.get_timestamp() == 10, "Known timestamp shouldn't be replaced"
+
     def test__eq__(self):
         ca = CameraImage(path=Path("ca.JPG"))
         ca_bis = CameraImage(path=Path("ca.JPG"))
@@ -0,0 +1,110 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test camera images list.
+
+import pytest
+import numpy as np
+from unittest.mock import patch, MagicMock
+from opv_import.model import CameraImage, CameraImageList
+from opv_import.config import EXIF_EXTRA_TAGS
+from path import Path
+
+
+def make_list(ts_cache=None):
+    return CameraImageList.from_folders(
+        naming=("3D_L", 4, ".JPG"),
+        folders_indexes=[(Path("DCIM/100S3D_L"), [8, 9]), (Path("DCIM/101S3D_L"), [10, 0])],
+        ts_cache=ts_cache)
+
+
+class TestCameraImageList(object):
+
+    def test_from_folders(self):
+        imgs = make_list()
+
+        assert len(imgs) == 4
+        assert imgs == [CameraImage(path=Path("DCIM/100S3D_L/3D_L0008.JPG")), CameraImage(path=Path("DCIM/100S3D_L/3D_L0009.JPG")),
+                        CameraImage(path=Path("DCIM/101S3D_L/3D_L0010.JPG")), CameraImage(path=Path("DCIM/101S3D_L/3D_L0000.JPG"))], \
+            "Pictures paths or order are wrong"
+        assert imgs[-1].path == Path("DCIM/101S3D_L/3D_L0000.JPG"), "Negative indexes should be supported"
+        assert [img.path.basename() for img in imgs[1:3]] == ["3D_L0009.JPG", "3D_L0010.JPG"], "Slices should be supported"
+        assert imgs.nbytes == 4 * (4 + 4 + 8 + 4), "Pictures should only use the arrays"
+        with pytest.raises(IndexError):
+            imgs[4]
+
+    def test_eq(self, capsys):
+        imgs = make_list()
+        other = CameraImageList.from_folders(
+            naming=("3D_L", 4, ".JPG"), folders_indexes=[(Path("DCIM/100S3D_L"), [8, 9]), (Path("DCIM/101S3D_L"), [10, 1])])
+
+        assert imgs == make_list()
+        assert imgs != other
+        assert imgs != make_list()[0:3]
+        out, _ = capsys.readouterr()
+        assert out == "", "Pictures paths should be compared without CameraImage.__eq__"
+
+    def test_empty(self):
+        imgs = CameraImageList.from_folders(naming=("GOPR", 4, ".JPG"), folders_indexes=[])
+
+        assert len(imgs) == 0
+        assert imgs.get_timestamps().tolist() == []
+
+    def test_add_folder(self):
+        imgs = make_list()
+        view = imgs[3]
+        view._ts = 10
+        imgs.add_folder(Path("DCIM/102S3D_L"), [1, 2])
+
+        assert len(imgs) == 6
+        assert imgs[4].path == Path("DCIM/102S3D_L/3D_L0001.JPG")
+        assert imgs[4]._ts is None
+        assert view._ts == 10, "Views made before growing should stay valid"
+
+    def test_views_write_through(self):
+        imgs = make_list()
+        imgs[1]._ts = 1500000000
+        imgs[1]._exif_tags = {"iso": "100"}
+        imgs[2]._exif_tags = {"iso": "100"}
+
+        assert imgs[1]._ts == 1500000000, "Timestamp should be kept in the list"
+        assert imgs[0]._ts is None, "Other pictures timestamps shouldn't be set"
+        assert imgs[1].get_exif_tags() == {"iso": "100"}, "Exif tags should be kept in the list"
+        assert len(imgs._tags_table) == 1, "Identical exif tags should be stored once"
+
+        imgs[1]._ts = None
+        assert imgs[1]._ts is None, "Timestamp should be forgotten"
+
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_get_timestamps(self, mock_read_exif):
+        mock_read_exif.side_effect = lambda p, tags: (int(p.namebase[4:]), {"iso": "100"})
+        imgs = make_list()
+        imgs[0]._ts = 42
+
+        ts = imgs.get_timestamps()
+
+        assert ts.dtype == np.int64
+        assert ts.tolist() == [42, 9, 10, 0], "Unknown timestamps should be read, known ones kept"
+        assert mock_read_exif.call_count == 3, "Known timestamps shouldn't be read"
+        assert imgs[3].get_exif_tags() == {"iso": "100"}, "Exif tags should be kept along with timestamps"
+
+    def test_ts_cache(self):
+        ts_cache = MagicMock()
+        ts_cache.get_exif.return_value = (12, {k: None for k in EXIF_EXTRA_TAGS})
+        imgs = make_list(ts_cache=ts_cache)
+
+        assert imgs[2].get_timestamp() == 12
+        ts_cache.get_exif.assert_called_once_with(Path("DCIM/101S3D_L/3D_L0010.JPG"))
@@ -0,0 +1,87 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View, Maison Du Libre
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD <benjamin.bernard@openpathview.fr>
+# Email: team@openpathview.fr
+# Description: Unit test archive camera image fetcher.
+
+import io
+import tarfile
+import pytest
+from unittest.mock import patch
+from path import Path
+from opv_import.helpers import PictureArchive
+from opv_import.services import CameraImageFetcher, ArchiveCameraImageFetcher
+from opv_import.services.camera_image_fetcher import MissingDcfFolderError
+
+# GoPro series : 100GOPRO starts a serie continued in 101GOPRO, 102GOPRO starts a new one
+NAMES = ["DCIM/100GOPRO/GOPR0002.JPG", "DCIM/100GOPRO/GOPR0001.JPG",
+         "DCIM/101GOPRO/GOPR0003.JPG", "DCIM/101GOPRO/GOPR0004.JPG", "DCIM/101GOPRO/notes.txt",
+         "DCIM/102GOPRO/GOPR0002.JPG", "DCIM/102GOPRO/GOPR0001.JPG"]
+
+
+def make_tar(archive_path: Path, names):
+    with tarfile.open(archive_path, "w") as tar:
+        for k, name in enumerate(names):
+            data = name.encode()
+            info = tarfile.TarInfo(name=name)
+            info.size = len(data)
+            info.mtime = 1500000000 + k
+            tar.addfile(info, io.BytesIO(data))
+
+
+class TestArchiveCameraImageFetcher(object):
+
+    def test_fetch_images_same_as_folder(self, tmpdir):
+        archive_path = Path(str(tmpdir)) / "APN0.tar"
+        make_tar(archive_path, NAMES)
+        with tarfile.open(archive_path) as tar:
+            tar.extractall(str(tmpdir / "APN0"))
+
+        fetcher = ArchiveCameraImageFetcher(archive=PictureArchive(archive_path=archive_path))
+        folder_fetcher = CameraImageFetcher(dcim_folder=Path(str(tmpdir)) / "APN0/DCIM")
+
+        assert [archive_path.relpathto(img.path) for img in fetcher.fetch_images()] == \
+            [Path(str(tmpdir / "APN0")).relpathto(img.path) for img in folder_fetcher.fetch_images()], \
+            "Archive pictures should be ordered as the extracted ones"
+        assert fetcher.get_last().path == archive_path / "DCIM/102GOPRO/GOPR0002.JPG"
+
+    @patch("opv_import.helpers.pictures_utils.read_exif_file")
+    def test_read_from_archive(self, mock_read_exif_file, tmpdir):
+        mock_read_exif_file.side_effect = lambda f, tags: (int(f.read()[-8:-4]), {})
+        archive_path = Path(str(tmpdir)) / "APN0.tar"
+        make_tar(archive_path, NAMES)
+        fetcher = ArchiveCameraImageFetcher(archive=PictureArchive(archive_path=archive_path))
+
+        assert fetcher.get_timestamps().tolist() == [1, 2, 3, 4, 1, 2], "Pictures should be read in the archive"
+        assert fetcher.get_first().archive is fetcher.archive
+
+        fetcher._cache_camimg = None
+        assert fetcher.load_timestamps_from_mtime(nb_samples=0)
+        assert [img.get_timestamp() for img in fetcher.get_images()][0:2] == [1500000001, 1500000000], \
+            "Modification times should be read from the archive"
+
+    def test_watch_images(self, tmpdir):
+        archive_path = Path(str(tmpdir)) / "APN0.tar"
+        make_tar(archive_path, NAMES)
+        fetcher = ArchiveCameraImageFetcher(archive=PictureArchive(archive_path=archive_path))
+
+        assert list(fetcher.watch_images(idle_timeout=10)) == fetcher.get_images(), "Archives don't need to be watched"
+
+    def test_missing_dcim(self, tmpdir):
+        archive_path = Path(str(tmpdir)) / "APN0.tar"
+        make_tar(archive_path, ["MISC/GOPR0001.JPG"])
+
+        with pytest.raises(MissingDcfFolderError):
+            ArchiveCameraImageFetcher(archive=PictureArchive(archive_path=archive_path))
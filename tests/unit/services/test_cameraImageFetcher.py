@@ -16,17 +16,36 @@
 # Email: team@openpathview.fr
 # Description: Unit test camera image fetcher.
 
+import os
+import time
 import pytest
+import threading
+import numpy as np
 import opv_import
 from unittest.mock import patch, MagicMock, call, DEFAULT
 from opv_import.services import CameraImageFetcher
-from opv_import.model import CameraImage
+from opv_import.model import CameraImage, CameraImageList
+from opv_import.helpers import DcfNaming, DcimManifest
+from opv_import.helpers.naming_profiles import GOPRO_PROFILE, TIMESTAMP_PROFILE
+from opv_import.services.camera_image_fetcher import UnknownNamingError, MissingPictureFileError
+from opv_import.config import EXIF_EXTRA_TAGS, DCIM_MANIFEST_FILE_NAME
 
 MOCKED_DIRS = ["/dir", "/dir/subdir"]
 
 Path = opv_import.services.camera_image_fetcher.Path  # Prevent namespace errors
 
 
+class FakeDirEntry(object):
+    """ os.DirEntry like, for faked directories """
+
+    def __init__(self, name, is_file):
+        self.name = name
+        self._is_file = is_file
+
+    def is_file(self):
+        return self._is_file
+
+
 class TestCameraImageFetcher(object):
 
     def start_fake_env(self, directories_files):
@@ -72,6 +91,9 @@ class TestCameraImageFetcher(object):
                     return dirs
                 return []
 
+        def scandir(p):
+            return iter([FakeDirEntry(name=f.basename(), is_file=True) for f in files(Path(p))])
+
         self.fake_env_patcher = patch.multiple(
             "path.Path",
             isdir=DEFAULT,
@@ -87,6 +109,8 @@ class TestCameraImageFetcher(object):
         self.fake_env_patcher_mocks['files'].side_effect = files
         self.fake_env_patcher_mocks['dirs'].side_effect = dirs
         self.fake_env_patcher_mocks['exists'].side_effect = exists
+        self.fake_scandir_patcher = patch("os.scandir", side_effect=scandir)
+        self.fake_scandir_patcher.start()
 
     def stop_fake_env(self):
         """
@@ -94,8 +118,10 @@ class TestCameraImageFetcher(object):
         """
         print("Stopped fake env")
         self.fake_env_patcher.stop()
+        self.fake_scandir_patcher.stop()
 
-    @patch("opv_import.services.CameraImageFetcher._extract_file_names_param")
+    @patch("opv_import.services.CameraImageFetcher._extract_file_names_param", autospec=True,
+           side_effect=lambda fetcher: setattr(fetcher, "_profile", GOPRO_PROFILE))
     def test__init__ok(self, mock_extract_file_names_param):
         fetcher = CameraImageFetcher(dcim_folder=Path("/tmp/"))
 
@@ -110,6 +136,7 @@ class TestCameraImageFetcher(object):
 
     def test__order_dcf_dir_ok(self):
         fetcher = object.__new__(CameraImageFetcher)
+        fetcher._profile = GOPRO_PROFILE
         dcf_folders = [Path('130TXT'), Path('005TXT')]
 
         ordered = fetcher._order_dcf_dir(dcf_dirs=dcf_folders)
@@ -129,102 +156,186 @@ class TestCameraImageFetcher(object):
 
     def test__extract_file_names_param_ok(self):
         fetcher = object.__new__(CameraImageFetcher)
+        fetcher._naming_profiles = None
         fetcher._extract_file_names_param(Path("DCIM/101S3D_L/3D_L0000.JPG"))
 
-        assert fetcher._f_prefix == "3D_L", "Image prefix file not correctly extracted"
-        assert fetcher._f_digit_len == 4, "Image index digit lenght not correctly extracted"
-        assert fetcher._f_ext == ".JPG", "Image extension not correctly extracted"
+        assert fetcher._naming.prefix == "3D_L", "Image prefix file not correctly extracted"
+        assert fetcher._naming.digit_len == 4, "Image index digit lenght not correctly extracted"
+        assert fetcher._naming.ext == ".JPG", "Image extension not correctly extracted"
 
     def test__make_dcf_pic_filename_ok(self):
         fetcher = object.__new__(CameraImageFetcher)
-        fetcher._f_prefix = "3D_L"
-        fetcher._f_digit_len = 4
-        fetcher._f_ext = ".JPG"
+        fetcher._naming = DcfNaming(prefix="3D_L", digit_len=4, ext=".JPG")
         name = fetcher._make_dcf_pic_filename(index=10)
 
         assert name == "3D_L0010.JPG", "File names formatting is wrong"
 
-    @patch("opv_import.services.CameraImageFetcher._order_dcf_files")
-    @patch("opv_import.services.CameraImageFetcher._make_dcf_pic_filename")
-    @patch("path.Path.exists", autospec=True)
-    def test___fetch_pic_files_from_dcf_dir(self, mock_path_exists, mock_name, mock_order_file):
-        dcf_dir = Path("DCIM/101S3D_L/")
-        files = [
-            Path("DCIM/101S3D_L/3D_L0000.JPG"),
-            Path("DCIM/101S3D_L/3D_L0001.JPG"),
-            Path("DCIM/101S3D_L/3D_L0010.JPG"),  # should not be returned
-            Path("DCIM/101S3D_L/3D_L0100.JPG"),
-            Path("DCIM/101S3D_L/3D_L0101.JPG")]
-        dcf_dir.files = MagicMock()
-        dcf_dir.files.return_value = files
-
-        def exists(p):
-            return p in files
-
-        def make_name_mocked(index):
-            return Path("3D_L{}.JPG".format(str(index).zfill(4)))
-
-        mock_order_file.return_value = files
-        mock_name.side_effect = make_name_mocked
-        mock_path_exists.side_effect = exists
-
+    def make_dcf_fetcher(self) -> CameraImageFetcher:
         fetcher = object.__new__(CameraImageFetcher)   # dcim_folder="DCIM"
         fetcher.logger = MagicMock()
-        next_index, images = fetcher._fetch_pic_files_from_dcf_dir(dcf_dir=dcf_dir, start_index=100)
+        fetcher._naming = DcfNaming(prefix="3D_L", digit_len=4, ext=".JPG")
+        fetcher._profile = GOPRO_PROFILE  # GoPro start index
+        fetcher._ts_cache = None
+        fetcher._pictures_index = None
+        fetcher._manifest = None
+        fetcher._dcf_dir_indexes = None
+        fetcher._dcf_dir_others = None
+        fetcher.report = None
+        fetcher._cache_camimg = None
+        fetcher._cache_ts = None
+        return fetcher
 
-        assert dcf_dir.files.call_count == 1, "Files were listed more than once"
-        assert mock_order_file.call_count == 1, "Files weren't ordered by index"
+    @patch("path.Path.exists", autospec=True)
+    def test___fetch_pic_files_from_dcf_dir(self, mock_path_exists, tmpdir):
+        dcf_dir = Path(str(tmpdir)) / "DCIM/101S3D_L"
+        dcf_dir.makedirs_p()
+        for name in ["3D_L0000.JPG", "3D_L0001.JPG", "3D_L0010.JPG", "3D_L0100.JPG", "3D_L0101.JPG", "3D_L0100.LRV", "3D_L00100.JPG"]:
+            (dcf_dir / name).write_bytes(b"")  # 3D_L0010 should not be returned, LRV and wrong digit len aren't pictures
 
-        expected_camimg = [
-            CameraImage(path=Path("DCIM/101S3D_L/3D_L0100.JPG")),
-            CameraImage(path=Path("DCIM/101S3D_L/3D_L0101.JPG")),
-            CameraImage(path=Path("DCIM/101S3D_L/3D_L0000.JPG")),
-            CameraImage(path=Path("DCIM/101S3D_L/3D_L0001.JPG"))
-        ]
+        fetcher = self.make_dcf_fetcher()
+        with patch("os.scandir", wraps=os.scandir) as mock_scandir:
+            next_index, images = fetcher._fetch_pic_files_from_dcf_dir(dcf_dir=dcf_dir, start_index=100)
+
+        assert mock_scandir.call_count == 1, "Files were listed more than once"
+        assert not mock_path_exists.called, "Files shouldn't be checked one by one"
 
         assert next_index == 2, "Wrong next index for search"
         assert len(images) == 4, "Should find 4 images"
-        assert images == expected_camimg, "Wrong result in file order"
+        assert images == [100, 101, 0, 1], "Wrong result in file order"
 
-    @patch("opv_import.services.CameraImageFetcher._make_dcf_pic_filename")
-    @patch("path.Path.exists", autospec=True)
-    def test__check_serie_continue_in_folder_ok(self, mock_path_exists, mock_name):
-        files = [
-            Path("DCIM/101S3D_L/3D_L0100.JPG")]
+    def test___fetch_pic_files_from_dcf_dir_restart_contiguous(self, tmpdir):
+        dcf_dir = Path(str(tmpdir)) / "DCIM/101S3D_L"
+        dcf_dir.makedirs_p()
+        for i in range(0, 6):
+            (dcf_dir / "3D_L{}.JPG".format(str(i).zfill(4))).write_bytes(b"")
 
-        def make_name_mocked(index):
-            return Path("3D_L{}.JPG".format(str(index).zfill(4)))
+        fetcher = self.make_dcf_fetcher()
+        next_index, images = fetcher._fetch_pic_files_from_dcf_dir(dcf_dir=dcf_dir, start_index=4)
 
-        def exists(p):
-            return p in files
+        assert images == [4, 5, 0, 1, 2, 3], "Each file should be added once"
+        assert next_index == 4
 
-        mock_name.side_effect = make_name_mocked
-        mock_path_exists.side_effect = exists
+    def test__check_serie_continue_in_folder_ok(self, tmpdir):
+        dcf_dir = Path(str(tmpdir)) / "DCIM/101S3D_L"
+        dcf_dir.makedirs_p()
+        (dcf_dir / "3D_L0100.JPG").write_bytes(b"")
 
-        fetcher = object.__new__(CameraImageFetcher)
-        r = fetcher._check_serie_continue_in_folder(next_index=100, next_dcf_folder_path=Path("DCIM/101S3D_L/"))
+        fetcher = self.make_dcf_fetcher()
+        r = fetcher._check_serie_continue_in_folder(next_index=100, next_dcf_folder_path=dcf_dir)
         assert r, "Serie should continue"
 
-    @patch("opv_import.services.CameraImageFetcher._make_dcf_pic_filename")
-    @patch("path.Path.exists", autospec=True)
-    def test__check_serie_continue_in_folder_fail(self, mock_path_exists, mock_name):
-        files = [
-            Path("DCIM/101S3D_L/3D_L0099.JPG"),
-            Path("DCIM/101S3D_L/3D_L0100.JPG")]
+    def test__check_serie_continue_in_folder_fail(self, tmpdir):
+        dcf_dir = Path(str(tmpdir)) / "DCIM/101S3D_L"
+        dcf_dir.makedirs_p()
+        (dcf_dir / "3D_L0099.JPG").write_bytes(b"")
+        (dcf_dir / "3D_L0100.JPG").write_bytes(b"")
 
-        def make_name_mocked(index):
-            return Path("3D_L{}.JPG".format(str(index).zfill(4)))
-
-        def exists(p):
-            return p in files
-
-        mock_name.side_effect = make_name_mocked
-        mock_path_exists.side_effect = exists
-
-        fetcher = object.__new__(CameraImageFetcher)
-        r = fetcher._check_serie_continue_in_folder(next_index=100, next_dcf_folder_path=Path("DCIM/101S3D_L/"))
+        fetcher = self.make_dcf_fetcher()
+        r = fetcher._check_serie_continue_in_folder(next_index=100, next_dcf_folder_path=dcf_dir)
         assert not r, "Serie should not continue (conflicting case)"
 
+    def test__walk_dcf_dirs_rollover(self, tmpdir):
+        dcim = Path(str(tmpdir)) / "DCIM"
+        folders = {"100S3D_L": [9998, 9999], "101S3D_L": [0, 1, 2], "102S3D_L": [3]}
+        for folder, indexes in folders.items():
+            (dcim / folder).makedirs_p()
+            for i in indexes:
+                (dcim / folder / "3D_L{}.JPG".format(str(i).zfill(4))).write_bytes(b"")
+
+        fetcher = self.make_dcf_fetcher()
+        walked = list(fetcher._walk_dcf_dirs(fetcher._order_dcf_dir(dcim.dirs())))
+
+        assert [(dcf_dir.basename(), pics) for dcf_dir, pics in walked] == \
+            [("100S3D_L", [9998, 9999]), ("101S3D_L", [0, 1, 2]), ("102S3D_L", [3])], \
+            "After 9999 the serie should go on from the lowest index of the next folder"
+
+    def make_camera(self, dcim: Path, folders):
+        for folder, names in folders.items():
+            (dcim / folder).makedirs_p()
+            for name in names:
+                (dcim / folder / name).write_bytes(b"")
+
+    def test_fetch_images_timestamp_names(self, tmpdir):
+        dcim = Path(str(tmpdir)) / "DCIM"
+        self.make_camera(dcim, {
+            "Camera": ["IMG_20171028_081105.jpg", "IMG_20171028_081103.jpg", "thumbs.db"],
+            "Camera2": ["PANO_20171028_081107.jpg", "IMG_20171028_081106.jpg"]})
+
+        fetcher = CameraImageFetcher(dcim_folder=dcim, use_manifest=True)
+
+        assert fetcher._profile is TIMESTAMP_PROFILE
+        assert [img.path.basename() for img in fetcher.fetch_images()] == [
+            "IMG_20171028_081103.jpg", "IMG_20171028_081105.jpg",
+            "IMG_20171028_081106.jpg", "PANO_20171028_081107.jpg"], "Pictures should be ordered by their names time"
+        assert not (dcim.parent / DCIM_MANIFEST_FILE_NAME).exists(), "Manifests only keep DCF names"
+
+    def test_extract_file_names_param_gopro(self, tmpdir):
+        dcim = Path(str(tmpdir)) / "DCIM"
+        self.make_camera(dcim, {"100GOPRO": ["GOPR0001.JPG", "GOPR0001.LRV"], "101GOPRO": ["GOPR0002.JPG"]})
+
+        fetcher = CameraImageFetcher(dcim_folder=dcim)
+
+        assert fetcher._profile is GOPRO_PROFILE
+        assert fetcher._naming == ("GOPR", 4, ".JPG"), "Videos names shouldn't be sampled"
+
+    def test_fetch_images_gopro_several_series(self, tmpdir):
+        dcim = Path(str(tmpdir)) / "DCIM"
+        self.make_camera(dcim, {
+            "100GOPRO": ["GOPR0001.JPG", "GOPR0002.JPG", "G0010003.JPG", "G0010004.JPG"],  # burst between single shots
+            "101GOPRO": ["GOPR0005.JPG"]})
+
+        fetcher = CameraImageFetcher(dcim_folder=dcim)
+
+        assert fetcher._profile is GOPRO_PROFILE
+        assert fetcher._naming == ("GOPR", 4, ".JPG"), "Main serie should be walked"
+        assert [img.path.basename() for img in fetcher.get_images()] == ["GOPR0001.JPG", "GOPR0002.JPG", "GOPR0005.JPG"]
+        assert fetcher.get_report().dropped_files == [dcim / "100GOPRO/G0010003.JPG", dcim / "100GOPRO/G0010004.JPG"], \
+            "Pictures of the other series should be reported"
+
+    @pytest.mark.parametrize("folders", [
+        {"100GOPRO": ["GOPR0001.JPG"], "101GOPRO": ["3D_L0002.JPG"]},  # two cameras in one DCIM folder
+        {"100GOPRO": ["GOPR0001.JPG"], "999GOPRO": ["DSC_00001.JPG"]},
+        {"100MEDIA": ["photo.jpg"]}])
+    def test_extract_file_names_param_unknown(self, tmpdir, folders):
+        dcim = Path(str(tmpdir)) / "DCIM"
+        self.make_camera(dcim, folders)
+
+        with patch("opv_import.services.CameraImageFetcher._scan_dcf_dir") as mock_scan_dcf_dir:
+            with pytest.raises(UnknownNamingError):
+                CameraImageFetcher(dcim_folder=dcim)
+        assert not mock_scan_dcf_dir.called, "Folders shouldn't be walked under a wrong naming"
+
+    def test_get_report(self, tmpdir):
+        dcim = Path(str(tmpdir)) / "DCIM"
+        self.make_camera(dcim, {
+            "100S3D_L": ["3D_L0000.JPG", "3D_L0001.JPG", "3D_L0003.JPG", "3D_L0001.LRV"],  # 3D_L0003 is dropped
+            "101S3D_L": ["3D_L0002.JPG", "3D_L0000.JPG"]})  # serie continued, then restarted
+        fetcher = CameraImageFetcher(dcim_folder=dcim)
+
+        with patch("os.scandir", wraps=os.scandir) as mock_scandir:
+            report = fetcher.get_report()
+        assert mock_scandir.call_count == 2, "Report should come from the fetch pass"
+
+        assert report.profile == "dcf"
+        assert report.nb_pictures == 4
+        assert [(f.folder.basename(), f.nb_pictures, f.first_index, f.last_index) for f in report.folders] == \
+            [("100S3D_L", 2, 0, 1), ("101S3D_L", 2, 2, 0)]
+        assert [(b.folder.basename(), b.last_index, b.next_index) for b in report.series_breaks] == [("101S3D_L", 2, 0)]
+        assert report.dropped_files == [dcim / "100S3D_L/3D_L0003.JPG"]
+        assert report.has_anomalies()
+        assert (report.first_ts, report.last_ts) == (None, None), "Timestamps shouldn't be read"
+
+        fetcher.get_images()[-1]._ts = 42
+        assert fetcher.get_report().last_ts == 42
+        assert fetcher.get_report().to_dict()["dropped_files"] == [str(dcim / "100S3D_L/3D_L0003.JPG")]
+
+    def test_extract_file_names_param_no_picture(self, tmpdir):
+        dcim = Path(str(tmpdir)) / "DCIM"
+        self.make_camera(dcim, {"100GOPRO": ["GOPR0001.LRV"]})
+
+        with pytest.raises(MissingPictureFileError):
+            CameraImageFetcher(dcim_folder=dcim)
+
     @patch("opv_import.services.CameraImageFetcher._order_dcf_dir")
     @patch("opv_import.services.CameraImageFetcher._check_serie_continue_in_folder")
     @patch("opv_import.services.CameraImageFetcher._fetch_pic_files_from_dcf_dir")
@@ -232,13 +343,8 @@ class TestCameraImageFetcher(object):
         dirs = [
             Path("DCIM/100S3D_L/"),
             Path("DCIM/101S3D_L/")]
-        dir_a_files = [
-            CameraImage(path=Path("DCIM/100S3D_L/3D_L0001.JPG")),
-            CameraImage(path=Path("DCIM/100S3D_L/3D_L0002.JPG"))]
-        dir_b_files = [
-            CameraImage(path=Path("DCIM/101S3D_L/3D_L0003.JPG")),
-            CameraImage(path=Path("DCIM/101S3D_L/3D_L0004.JPG")),
-            CameraImage(path=Path("DCIM/101S3D_L/3D_L0000.JPG"))]
+        dir_a_files = [1, 2]
+        dir_b_files = [3, 4, 0]
 
         def fetch_dir(dcf_dir, start_index):
             if dcf_dir == Path("DCIM/100S3D_L/"):
@@ -248,9 +354,8 @@ class TestCameraImageFetcher(object):
             return (1, [])
 
         mock_fetch_dir.side_effect = fetch_dir
-        fetcher = object.__new__(CameraImageFetcher)
+        fetcher = self.make_dcf_fetcher()
         fetcher.dcim_folder = MagicMock()
-        fetcher.logger = MagicMock()
 
         mock_ordered_dir.return_value = dirs
         mock_serie_check.return_value = True
@@ -287,6 +392,200 @@ class TestCameraImageFetcher(object):
         assert mock_fetch_images.call_count == 1, "Not lazy fetch called too much times"
         assert r == mock_fetch_images.return_value, "Result is incorrect"
 
+    @patch("opv_import.services.CameraImageFetcher.get_images")
+    def test_get_timestamps(self, mock_get_images):
+        imgs = [CameraImage(path=Path("DCIM/101S3D_L/3D_L000{}.JPG".format(i))) for i in range(0, 3)]
+        for i, img in enumerate(imgs):
+            img._ts = 1500000000 + i
+        mock_get_images.return_value = imgs
+
+        fetcher = object.__new__(CameraImageFetcher)
+        fetcher._cache_ts = None
+        ts = fetcher.get_timestamps()
+
+        assert ts.dtype == np.int64, "Timestamps should be int64"
+        assert ts.flags['C_CONTIGUOUS'], "Timestamps array should be contiguous"
+        assert ts.tolist() == [1500000000, 1500000001, 1500000002], "Wrong timestamps or order"
+        assert fetcher.get_timestamps() is ts, "Timestamps aren't memoized"
+        assert mock_get_images.call_count == 1
+
+    def make_mtime_env(self, tmpdir, mtimes):
+        imgs = []
+        for i, mtime in enumerate(mtimes):
+            pic = Path(str(tmpdir)) / "GOPR000{}.JPG".format(i)
+            pic.write_bytes(b"jpeg")
+            pic.utime((mtime, mtime))
+            imgs.append(CameraImage(path=pic))
+
+        fetcher = object.__new__(CameraImageFetcher)
+        fetcher.logger = MagicMock()
+        fetcher.dcim_folder = Path(str(tmpdir))
+        fetcher._cache_camimg = imgs
+        fetcher._cache_ts = None
+        return fetcher, imgs
+
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_load_timestamps_from_mtime_ok(self, mock_read_exif, tmpdir):
+        mtimes = [1500000000 + 2 * i for i in range(0, 10)]
+        fetcher, imgs = self.make_mtime_env(tmpdir, mtimes)
+        mock_read_exif.side_effect = lambda p, tags: (mtimes[imgs.index(CameraImage(path=p))] + 1, {})
+
+        assert fetcher.load_timestamps_from_mtime(nb_samples=3, max_diff=3), "Modification times should be used"
+        assert mock_read_exif.call_count == 3, "Only sampled pictures should be read"
+        assert sum(img._ts == mtime for img, mtime in zip(imgs, mtimes)) == 7, "Not sampled pictures should use mtime"
+
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_load_timestamps_from_mtime_disagree(self, mock_read_exif, tmpdir):
+        mtimes = [1500000000 + 2 * i for i in range(0, 10)]
+        fetcher, imgs = self.make_mtime_env(tmpdir, mtimes)
+        mock_read_exif.return_value = (1400000000, {})
+
+        assert not fetcher.load_timestamps_from_mtime(nb_samples=3, max_diff=3), "Modification times shouldn't be used"
+        assert mock_read_exif.call_count == 1, "Should stop at the first disagreeing sample"
+        assert sum(img._ts is None for img in imgs) == 9, "Not sampled pictures shouldn't have a timestamp"
+
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_load_timestamps_from_mtime_scandir(self, mock_read_exif, tmpdir):
+        mtimes = [1500000000 + 2 * i for i in range(0, 10)]
+        fetcher, imgs = self.make_mtime_env(tmpdir, mtimes)
+        mock_read_exif.side_effect = lambda p, tags: (mtimes[imgs.index(CameraImage(path=p))], {})
+
+        with patch("os.scandir", wraps=os.scandir) as mock_scandir, patch("path.Path.getmtime", autospec=True) as mock_getmtime:
+            assert fetcher.load_timestamps_from_mtime(nb_samples=3, max_diff=3), "Modification times should be used"
+        assert mock_scandir.call_count == 1, "The pictures folder should be listed once"
+        assert not mock_getmtime.called, "Modification times should come from the scandir entries"
+        assert [img._ts for img in imgs] == mtimes
+
+    @patch('opv_import.helpers.pictures_utils.read_exif')
+    def test_load_timestamps_from_mtime_bound(self, mock_read_exif, tmpdir):
+        mtimes = [1500000000 + 2 * i for i in range(0, 10)]
+        fetcher, imgs = self.make_mtime_env(tmpdir, mtimes)
+        mock_read_exif.side_effect = lambda p, tags: (mtimes[imgs.index(CameraImage(path=p))] + 3, {})
+
+        assert not fetcher.load_timestamps_from_mtime(nb_samples=3, max_diff=3), "max_diff is a strict bound"
+
+    def test__load_timestamps_from_index(self, tmpdir):
+        apn_path = Path(str(tmpdir)) / "APN0"
+        (apn_path / "DCIM/100GOPRO").makedirs_p()
+        imgs = []
+        for i in range(0, 3):
+            pic = apn_path / "DCIM/100GOPRO/GOPR000{}.JPG".format(i)
+            pic.write_bytes(b"jpeg")
+            imgs.append(CameraImage(path=pic))
+
+        pictures_index = opv_import.helpers.PicturesIndex(index_path=apn_path / "pictures_index.csv")
+        pictures_index.add(rel_path="DCIM/100GOPRO/GOPR0000.JPG", size=4, ts=10, tags={k: None for k in EXIF_EXTRA_TAGS})
+        pictures_index.add(rel_path="DCIM/100GOPRO/GOPR0001.JPG", size=5, ts=11)  # size changed
+
+        fetcher = object.__new__(CameraImageFetcher)
+        fetcher.logger = MagicMock()
+        fetcher._pictures_index = pictures_index
+        fetcher._load_timestamps_from_index(imgs)
+
+        assert [img._ts for img in imgs] == [10, None, None], "Only indexed pictures with the same size should have a timestamp"
+        assert imgs[0]._exif_tags == {k: None for k in EXIF_EXTRA_TAGS}, "Indexed exif tags should be loaded"
+
+    def test_fetch_images_manifest(self, tmpdir):
+        dcim = Path(str(tmpdir)) / "APN0" / "DCIM"
+        for folder, indexes in [("100GOPRO", range(998, 1000)), ("101GOPRO", range(1000, 1002))]:
+            (dcim / folder).makedirs_p()
+            for i in indexes:
+                (dcim / folder / "GOPR{}.JPG".format(str(i).zfill(4))).write_bytes(b"jpeg")
+
+        walked = CameraImageFetcher(dcim_folder=dcim, use_manifest=True).fetch_images()
+        assert (dcim.parent / DCIM_MANIFEST_FILE_NAME).exists(), "Manifest should be saved"
+        manifest = DcimManifest(manifest_path=dcim.parent / DCIM_MANIFEST_FILE_NAME).load()
+        assert [dcim / rel_path for rel_path, _ in manifest.pictures] == [img.path for img in walked], \
+            "Manifest should keep the series order"
+
+        with patch("os.scandir") as mock_scandir, patch("path.Path.files", autospec=True) as mock_files:
+            loaded = CameraImageFetcher(dcim_folder=dcim, use_manifest=True).fetch_images()
+            assert not mock_scandir.called and not mock_files.called, "Unchanged DCIM folder shouldn't be listed"
+        assert [img.path for img in loaded] == [img.path for img in walked]
+
+        (dcim / "101GOPRO" / "GOPR1002.JPG").write_bytes(b"jpeg")
+        st = os.stat(dcim / "101GOPRO")
+        os.utime(dcim / "101GOPRO", ns=(st.st_atime_ns, st.st_mtime_ns + 1))  # coarse mtime file systems
+        refreshed = CameraImageFetcher(dcim_folder=dcim, use_manifest=True).fetch_images()
+        assert [img.path for img in refreshed] == [img.path for img in walked] + [dcim / "101GOPRO" / "GOPR1002.JPG"], \
+            "Modified DCIM folder should be walked again"
+
+    def test_get_report_manifest(self, tmpdir):
+        dcim = Path(str(tmpdir)) / "APN0" / "DCIM"
+        self.make_camera(dcim, {"100GOPRO": ["GOPR0001.JPG", "GOPR0002.JPG", "GOPR0003.JPG", "GOPR0010.JPG", "GOPR0011.JPG"]})
+
+        walked = CameraImageFetcher(dcim_folder=dcim, use_manifest=True).get_report()
+        assert walked.dropped_files == [dcim / "100GOPRO/GOPR0010.JPG", dcim / "100GOPRO/GOPR0011.JPG"]
+
+        with patch("os.scandir") as mock_scandir:
+            loaded = CameraImageFetcher(dcim_folder=dcim, use_manifest=True).get_report()
+            assert not mock_scandir.called, "Unchanged DCIM folder shouldn't be listed"
+        assert loaded.has_anomalies(), "Dropped files should be reported again from the manifest"
+        assert loaded.to_dict() == walked.to_dict()
+
+    def test_iter_images(self, tmpdir):
+        dcim = Path(str(tmpdir)) / "DCIM"
+        for folder, indexes in [("100GOPRO", range(998, 1000)), ("101GOPRO", range(1000, 1002))]:
+            (dcim / folder).makedirs_p()
+            for i in indexes:
+                (dcim / folder / "GOPR{}.JPG".format(str(i).zfill(4))).write_bytes(b"jpeg")
+        fetched = CameraImageFetcher(dcim_folder=dcim).fetch_images()
+
+        fetcher = CameraImageFetcher(dcim_folder=dcim)
+        with patch("os.scandir", wraps=os.scandir) as mock_scandir:
+            images = fetcher.iter_images()
+            first = next(images)
+            assert mock_scandir.call_count == 1, "Only the first folder should be listed before its pictures are given"
+            streamed = [first] + list(images)
+
+        assert streamed == fetched, "Pictures should be streamed in the fetch order"
+        with patch("os.scandir") as mock_scandir:
+            assert fetcher.get_images() == fetched
+            assert not mock_scandir.called, "Streamed pictures should be kept"
+        streamed[0]._ts = 10
+        assert fetcher.get_pic(index=0)._ts == 10, "Streamed pictures should be the kept ones"
+
+    def test_watch_images(self, tmpdir):
+        dcim = Path(str(tmpdir)) / "DCIM"
+        (dcim / "100GOPRO").makedirs_p()
+        for i in range(1, 4):
+            (dcim / "100GOPRO" / "GOPR{}.JPG".format(str(i).zfill(4))).write_bytes(b"jpeg")
+
+        def copy():  # rsync like : temporary file renamed once written
+            time.sleep(0.2)
+            for i in range(4, 6):
+                tmp = dcim / "100GOPRO" / ".GOPR{}.JPG.tmp".format(str(i).zfill(4))
+                tmp.write_bytes(b"jpeg")
+                os.rename(tmp, dcim / "100GOPRO" / "GOPR{}.JPG".format(str(i).zfill(4)))
+            (dcim / "101GOPRO").makedirs_p()
+            for i in range(6, 8):
+                (dcim / "101GOPRO" / "GOPR{}.JPG".format(str(i).zfill(4))).write_bytes(b"jpeg")
+
+        copier = threading.Thread(target=copy)
+        copier.start()
+        fetcher = CameraImageFetcher(dcim_folder=dcim)
+        watched = [img.path for img in fetcher.watch_images(idle_timeout=1, poll_interval=0.05)]
+        copier.join()
+
+        assert watched == [img.path for img in CameraImageFetcher(dcim_folder=dcim).fetch_images()], \
+            "Completed pictures should be appended in the fetch order"
+        assert len(watched) == 7
+        assert [img.path for img in fetcher.get_images()] == watched, "Watched pictures should be kept"
+
+    def test__append_completed_pictures_out_of_order(self):
+        fetcher = self.make_dcf_fetcher()
+        fetcher.dcim_folder = Path("DCIM")
+        pic_files = CameraImageList.from_folders(naming=("3D_L", 4, ".JPG"), folders_indexes=[(Path("DCIM/100S3D_L"), [1, 2])])
+        fetcher._dcf_dir_indexes = {Path("DCIM/100S3D_L"): {i: "3D_L{}.JPG".format(str(i).zfill(4)) for i in [1, 2, 3]}}
+
+        appended = fetcher._append_completed_pictures(pic_files)
+        assert [img.path for img in appended] == [Path("DCIM/100S3D_L/3D_L0003.JPG")]
+
+        fetcher._dcf_dir_indexes[Path("DCIM/099S3D_L")] = {0: "3D_L0000.JPG"}  # completed before the given ones
+        fetcher._dcf_dir_indexes[Path("DCIM/100S3D_L")][4] = "3D_L0004.JPG"
+        assert fetcher._append_completed_pictures(pic_files) is None, "Order changes should end the watch"
+        assert len(pic_files) == 3, "Nothing should be appended"
+
     @pytest.fixture
     def test_dir_env(self, request):
         dir_a_files = [
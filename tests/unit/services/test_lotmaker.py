@@ -16,12 +16,22 @@
 # Email: team@openpathview.fr
 # Description: Unit test lot maker.
 
+import io
+import struct
+import random
+import datetime
+import itertools
 import pytest
+import numpy as np
+import tarfile
 from path import Path
-from opv_import.model import CameraImage, ImageSet, RederbroMeta, Lot
-from opv_import.services import LotMaker, CameraImageFetcher, CameraBackInTimeError
-from opv_import.services.lot_maker import ImageSetWithFetcherIndexes
-from unittest.mock import patch, call, DEFAULT
+from opv_import.model import CameraImage, ImageSet, RederbroMeta, Lot, FetchReport
+from opv_import.services import LotMaker, CameraImageFetcher, ArchiveCameraImageFetcher, CameraBackInTimeError
+from opv_import.services.lot_maker import ImageSetWithFetcherIndexes, DroppedPicturesError
+from opv_import.services.camera_image_fetcher import MissingDcfFolderError, MissingPictureFileError
+from unittest.mock import patch, call, DEFAULT, MagicMock
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 
 
 def cam_img(p, ts):
@@ -34,29 +44,258 @@ offset_a = 30
 offset_b = 40
 
 
+def make_exif_jpeg(date: bytes) -> bytes:
+    """
+    Minimal JPEG with an exif APP1 segment : IFD0 pointing to an Exif IFD with DateTimeOriginal.
+    """
+    exif_ifd_offset = 8 + 2 + 12 + 4
+    ifd0 = struct.pack('<HHHII', 1, 0x8769, 4, 1, exif_ifd_offset) + struct.pack('<I', 0)
+    exif_ifd = struct.pack('<HHHII', 1, 0x9003, 2, 20, exif_ifd_offset + 2 + 12 + 4) + struct.pack('<I', 0) + date + b'\x00'
+    tiff = b'II' + struct.pack('<HI', 42, 8) + ifd0 + exif_ifd
+    return b'\xff\xd8\xff\xe1' + struct.pack('>H', len(tiff) + 8) + b'Exif\x00\x00' + tiff + b'\xff\xda\x00\x02\xff\xd9'
+
+
 class TestLotMaker(object):
 
     def test__init__ok(self):
         pass
 
-    @patch("opv_import.services.CameraImageFetcher.__init__")
+    @patch("opv_import.services.CameraImageFetcher.__init__", autospec=True)
     @patch("opv_import.services.CameraImageFetcher.fetch_images")
     def test_load_cam_images(self, mock_fetch_images, mock_fetchers_init):
-        mock_fetchers_init.return_value = None
+        def fetcher_init(s, dcim_folder, ts_cache, use_manifest):
+            s._cache_camimg = None
+        mock_fetchers_init.side_effect = fetcher_init
 
         lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
         r = lm.load_cam_images()
 
-        assert mock_fetchers_init.call_args_list == [call(dcim_folder=Path("picPath/APN0/DCIM")), call(dcim_folder=Path("picPath/APN1/DCIM"))], \
+        assert [c[1] for c in mock_fetchers_init.call_args_list] == [
+            dict(dcim_folder=Path("picPath/APN0/DCIM"), ts_cache=None, use_manifest=False),
+            dict(dcim_folder=Path("picPath/APN1/DCIM"), ts_cache=None, use_manifest=False)], \
             "Not instanciating 2 fetchers"
         assert mock_fetch_images.call_count == 2, "Didn't fetch images on the 2 cameras"
         assert len(r) == 2, "Should have 2 fetchers"
 
+    @patch("opv_import.services.CameraImageFetcher.__init__", autospec=True)
+    @patch("opv_import.services.CameraImageFetcher.fetch_images")
+    def test_load_cam_images_concurrent(self, mock_fetch_images, mock_fetchers_init):
+        def fetcher_init(s, dcim_folder, ts_cache, use_manifest):
+            s._cache_camimg = None
+        mock_fetchers_init.side_effect = fetcher_init
+
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=3)
+        r = lm.load_cam_images(number_of_workers=3)
+
+        assert sorted(c[1]["dcim_folder"] for c in mock_fetchers_init.call_args_list) == \
+            [Path("picPath/APN{}/DCIM".format(no)) for no in range(0, 3)], "Not instanciating 3 fetchers"
+        assert mock_fetch_images.call_count == 3, "Didn't fetch images on the 3 cameras"
+        assert len(r) == 3 and all(isinstance(f, CameraImageFetcher) for f in r), "Should have 3 fetchers"
+        for f in r:
+            f.get_images()
+        assert mock_fetch_images.call_count == 3, "Fetched images should be kept by the fetchers"
+        assert sorted(lm.fetch_wall_times.keys()) == [0, 1, 2], "Wall time should be recorded for each camera"
+        assert all(t >= 0 for t in lm.fetch_wall_times.values())
+
+    def test_check_fetch_reports(self):
+        lm = LotMaker(pictures_path=Path("pictures"), rederbro_csv_path=None, nb_cams=2)
+        reports = [FetchReport(dcim_folder=Path("APN0/DCIM")), FetchReport(dcim_folder=Path("APN1/DCIM"))]
+        lm.fetchers = [MagicMock(), MagicMock()]
+        for fetcher, report in zip(lm.fetchers, reports):
+            fetcher.get_report.return_value = report
+
+        assert lm.check_fetch_reports() == reports
+
+        reports[1].dropped_files.append(Path("APN1/DCIM/100GOPRO/GOPR0042.JPG"))
+        with pytest.raises(DroppedPicturesError) as err:
+            lm.check_fetch_reports()
+        assert list(err.value.reports) == [1], "Only the failing cameras should be reported"
+        assert "GOPR0042.JPG" in str(err.value)
+
+    @patch("opv_import.helpers.pictures_utils.read_exif_file")
+    def test_cam_archive(self, mock_read_exif_file, tmpdir):
+        mock_read_exif_file.side_effect = lambda f, tags: (len(f.read()), {})
+        pictures_path = Path(str(tmpdir))
+        (pictures_path / "APN0/DCIM/100GOPRO").makedirs()
+        (pictures_path / "APN0/DCIM/100GOPRO/GOPR0001.JPG").write_bytes(b"jpeg")
+        with tarfile.open(pictures_path / "APN1.tar", "w") as tar:
+            for i in range(1, 4):
+                info = tarfile.TarInfo(name="DCIM/100GOPRO/GOPR000{}.JPG".format(i))
+                info.size = i
+                tar.addfile(info, io.BytesIO(b"x" * i))
+
+        lm = LotMaker(pictures_path=pictures_path, rederbro_csv_path=None, nb_cams=2)
+        lm.load_cam_images()
+
+        assert type(lm.fetchers[0]) is CameraImageFetcher, "DCIM folders should be used when they exist"
+        assert isinstance(lm.fetchers[1], ArchiveCameraImageFetcher), "Camera archive should be used without DCIM folder"
+        assert lm.fetchers[1].archive.archive_path == pictures_path / "APN1.tar"
+
+        with patch.object(lm, "_prefetch_with_processes") as mock_processes:
+            lm.prefetch_timestamps(number_of_workers=2, backend="process", read_order="inode")
+        assert not mock_processes.called, "Archive members can't be read by path in other processes"
+        assert lm.fetchers[1].get_timestamps().tolist() == [1, 2, 3], "Archive pictures should be prefetched"
+        assert mock_read_exif_file.call_count == 3
+
+        lm.close()
+        assert lm.fetchers[1].archive._mmap is None, "Archive should be released"
+
+    @pytest.mark.parametrize("number_of_workers", [1, 3])
+    @patch("opv_import.services.CameraImageFetcher.__init__", autospec=True)
+    @patch("opv_import.services.CameraImageFetcher.fetch_images")
+    def test_load_cam_images_error(self, mock_fetch_images, mock_fetchers_init, number_of_workers):
+        def fetcher_init(s, dcim_folder, ts_cache, use_manifest):
+            if dcim_folder == Path("picPath/APN1/DCIM"):
+                raise MissingDcfFolderError(dcim_folder)
+            if dcim_folder == Path("picPath/APN2/DCIM"):
+                raise MissingPictureFileError(dcim_folder)
+            s._cache_camimg = None
+        mock_fetchers_init.side_effect = fetcher_init
+
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=3)
+        with pytest.raises(MissingDcfFolderError):
+            lm.load_cam_images(number_of_workers=number_of_workers)
+
+        assert lm.fetchers is None, "Fetchers shouldn't be kept partially loaded"
+        assert 1 in lm.fetch_wall_times, "Failing camera wall time should be recorded"
+
+    @patch("opv_import.helpers.pictures_utils.read_exif")
+    def test_prefetch_timestamps(self, mock_read_exif):
+        mock_read_exif.side_effect = lambda p, tags: (len(p), {})
+        cam_a = [CameraImage(path=Path("APN0/DCIM/100S3D_L/3D_L{}.JPG".format(i))) for i in range(0, 250)]
+        cam_b = [cam_img("APN1/DCIM/100S3D_L/3D_L0000.JPG", 10), CameraImage(path=Path("APN1/DCIM/100S3D_L/3D_L0001.JPG"))]
+
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+        lm.fetchers = [MagicMock(), MagicMock()]
+        lm.fetchers[0].get_images.return_value = cam_a
+        lm.fetchers[1].get_images.return_value = cam_b
+        progress_event = MagicMock()
+
+        lm.prefetch_timestamps(number_of_workers=2, on_progress_listener=progress_event)
+
+        assert all(img._ts == len(img.path) for img in cam_a), "Timestamps weren't all prefetched"
+        assert cam_b[0]._ts == 10, "Already known timestamp shouldn't be read again"
+        assert mock_read_exif.call_count == 251, "Pictures should be read once"
+        assert progress_event.call_count == 2, "Progress should be fired once per task"
+        assert max(c[0][0] for c in progress_event.call_args_list) == 1, "Progression should end at 1"
+
+    @patch("opv_import.services.lot_maker.ProcessPoolExecutor", ThreadPoolExecutor)  # same interface, works with mocks
+    @patch("opv_import.helpers.pictures_utils.read_exif")
+    def test_prefetch_timestamps_process(self, mock_read_exif):
+        def read_exif(p, tags):
+            if p.endswith("3D_L7.JPG"):
+                raise OSError("Corrupted")
+            return len(p), {"iso": "100"}
+        mock_read_exif.side_effect = read_exif
+        cam_a = [CameraImage(path=Path("APN0/DCIM/100S3D_L/3D_L{}.JPG".format(i))) for i in range(0, 250)]
+
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=1)
+        lm.fetchers = [MagicMock()]
+        lm.fetchers[0].get_images.return_value = cam_a
+        progress_event = MagicMock()
+
+        lm.prefetch_timestamps(number_of_workers=2, on_progress_listener=progress_event, backend="process")
+
+        assert all(img._ts == len(img.path) for img in cam_a if img.path.name != "3D_L7.JPG"), "Timestamps weren't all prefetched"
+        assert cam_a[7]._ts is None, "Failed timestamp should be read again when used"
+        assert cam_a[0]._exif_tags == {"iso": "100"}, "Exif tags should be read along with timestamps"
+        assert mock_read_exif.call_count == 250, "Pictures should be read once"
+        assert progress_event.call_count == 2, "Progress should be fired once per task"
+        assert max(c[0][0] for c in progress_event.call_args_list) == 1, "Progression should end at 1"
+
+    def test_prefetch_timestamps_process_pool(self, tmpdir):
+        pictures_path = Path(str(tmpdir))
+        (pictures_path / "APN0/DCIM/100GOPRO").makedirs()
+        dates = [(datetime.datetime(2017, 10, 28, 8, 11) + datetime.timedelta(seconds=s)).strftime("%Y:%m:%d %H:%M:%S")
+                 for s in range(0, 300, 5)]
+        for i, date in enumerate(dates):
+            (pictures_path / "APN0/DCIM/100GOPRO/GOPR{}.JPG".format(str(i + 1).zfill(4))).write_bytes(make_exif_jpeg(date.encode()))
+        lm = LotMaker(pictures_path=pictures_path, rederbro_csv_path=None, nb_cams=1)
+        lm.load_cam_images()
+
+        lm.prefetch_timestamps(number_of_workers=2, backend="process")
+
+        assert [img._ts for img in lm.fetchers[0].get_images()] == \
+            [int(datetime.datetime.strptime(date, "%Y:%m:%d %H:%M:%S").timestamp()) for date in dates], \
+            "Timestamps read by the worker processes should be set in the camera images list"
+
+    @patch("opv_import.helpers.pictures_utils.read_exif")
+    @patch("opv_import.services.LotMaker._make_fetcher")
+    def test_prefetch_timestamps_stream(self, mock_make_fetcher, mock_read_exif):
+        mock_read_exif.side_effect = lambda p, tags: (len(p), {})
+        cams = [[CameraImage(path=Path("APN{}/DCIM/100S3D_L/3D_L{}.JPG".format(no, i))) for i in range(0, 150)]
+                for no in range(0, 2)]
+        cams[1][0]._ts = 10
+        fetchers = [MagicMock(), MagicMock()]
+        for fetcher, imgs in zip(fetchers, cams):
+            fetcher.iter_images.return_value = iter(imgs)
+        mock_make_fetcher.side_effect = lambda no: fetchers[no]
+        progress_event = MagicMock()
+
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+        lm.prefetch_timestamps(number_of_workers=2, on_progress_listener=progress_event, stream=True)
+
+        assert lm.fetchers == fetchers, "Streamed fetchers should be kept"
+        assert all(img._ts == len(img.path) for img in cams[0] + cams[1][1:]), "Timestamps weren't all prefetched"
+        assert cams[1][0]._ts == 10, "Already known timestamp shouldn't be read again"
+        assert mock_read_exif.call_count == 299, "Pictures should be read once"
+        assert sorted(lm.fetch_wall_times.keys()) == [0, 1], "Wall time should be recorded for each camera"
+        assert progress_event.call_count == 2, "Progress should be fired once per chunk"
+
+    @patch("opv_import.helpers.pictures_utils.read_exif")
+    @patch("opv_import.services.LotMaker._make_fetcher")
+    def test_prefetch_timestamps_stream_watch(self, mock_make_fetcher, mock_read_exif):
+        mock_read_exif.side_effect = lambda p, tags: (len(p), {})
+        cams = [[CameraImage(path=Path("APN{}/DCIM/100S3D_L/3D_L{}.JPG".format(no, i))) for i in range(0, 15)]
+                for no in range(0, 2)]
+        fetchers = [MagicMock(), MagicMock()]
+        for fetcher, imgs in zip(fetchers, cams):
+            fetcher.watch_images.return_value = iter(imgs)
+        mock_make_fetcher.side_effect = lambda no: fetchers[no]
+
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+        lm.prefetch_timestamps(number_of_workers=2, stream=True, watch_idle_timeout=5)
+
+        assert all(f.watch_images.call_args == call(idle_timeout=5) for f in fetchers), "Cameras should be watched"
+        assert not any(f.iter_images.called for f in fetchers)
+        assert all(img._ts == len(img.path) for img in cams[0] + cams[1]), "Timestamps weren't all prefetched"
+        assert lm.fetchers == fetchers
+
+    def test_prefetch_timestamps_unknown_backend(self):
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=1)
+        with pytest.raises(ValueError):
+            lm.prefetch_timestamps(backend="fibers")
+
+    @pytest.mark.parametrize("ratio, number_of_workers, expected", [
+        (1, 4, "process"),
+        (0.9, 4, "process"),
+        (0.2, 4, "thread"),
+        (None, 4, "thread"),
+        (1, 1, "thread"),
+    ])
+    @patch("opv_import.helpers.read_scheduler.cached_ratio")
+    @patch("os.cpu_count")
+    def test_select_prefetch_backend(self, mock_cpu_count, mock_cached_ratio, ratio, number_of_workers, expected):
+        mock_cpu_count.return_value = 8
+        mock_cached_ratio.return_value = ratio
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=1)
+
+        assert lm._select_prefetch_backend(cam_imgs=[CameraImage(path=Path("a.JPG"))], number_of_workers=number_of_workers) == expected
+
+    def test_timestamp_matrix(self):
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+        lm.fetchers = [MagicMock(), MagicMock()]
+        lm.fetchers[0].get_timestamps.return_value = "ts_cam_a"
+        lm.fetchers[1].get_timestamps.return_value = "ts_cam_b"
+
+        assert lm.timestamp_matrix() == ["ts_cam_a", "ts_cam_b"], "Should return fetchers timestamps, ordered by camera"
+
     def start_img_fetcher_fake_env(self, cameras):
 
-        def fetcher_init(s, dcim_folder):
+        def fetcher_init(s, dcim_folder, ts_cache=None, use_manifest=False):
             s.dcim_folder = dcim_folder
-            return None
+            s._cache_camimg = None
+            s._cache_ts = None
 
         def fetcher_images(s):
             for (cam_path, pics) in cameras:
@@ -199,6 +438,275 @@ class TestLotMaker(object):
 
         assert excinfo.value.indexes == [2, 1]
 
+    @pytest.fixture
+    def fetcher_test_env_lagging_camera(self, request):
+        """
+        Mock with 2 cameras, camera A took 64 pictures before camera B started. Timestamps aren't loaded.
+        """
+        cam_a = [CameraImage(path=Path("picPath/APN0/DCIM/100S3D_L/3D_L{:04d}.JPG".format(i))) for i in range(0, 70)]
+        cam_b = [CameraImage(path=Path("picPath/APN1/DCIM/100S3D_L/3D_L{:04d}.JPG".format(i))) for i in range(0, 6)]
+        ts = {img.path: 10 * i for i, img in enumerate(cam_a)}
+        ts.update({img.path: 10 * (i + 64) + offset_b for i, img in enumerate(cam_b)})
+
+        cameras = [
+            (Path("picPath/APN0/DCIM"), cam_a),
+            (Path("picPath/APN1/DCIM"), cam_b),
+        ]
+
+        request.addfinalizer(self.stop_img_fetcher_fake_env)
+        self.start_img_fetcher_fake_env(cameras)
+        return ts
+
+    @pytest.mark.parametrize("sparse", [False, True])
+    def test_cam_set_generator_sparse(self, sparse, fetcher_test_env_lagging_camera):
+        ts = fetcher_test_env_lagging_camera
+        with patch("opv_import.helpers.pictures_utils.read_exif", side_effect=lambda p, tags: (ts[p], {})) as mock_read_exif:
+            lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+            lm.load_cam_images()
+            reference_set = lm.get_images([64, 0])
+
+            generated = [(dict(s.set), list(s.fetcher_next_indexes)) for s in lm.cam_set_generator(reference_set=reference_set, sparse=sparse)]
+
+        expected = [({0: lm.fetchers[0].get_pic(i)}, [i + 1, 0]) for i in range(0, 64)]
+        expected += [({0: lm.fetchers[0].get_pic(64 + i), 1: lm.fetchers[1].get_pic(i)}, [65 + i, i + 1]) for i in range(0, 6)]
+
+        assert generated == expected, "Sparse and normal generation should give the same sets"
+        if sparse:
+            assert mock_read_exif.call_count < 30, "Lonely pictures timestamps shouldn't be all read"
+            assert lm.timestamps_read_stats()['nb_avoided'] > 40
+        else:
+            assert mock_read_exif.call_count == 76
+
+    def list_sets(self, generator) -> List:
+        sets = []
+        try:
+            for s in generator:
+                sets.append((dict(s.set), list(s.fetcher_next_indexes)))
+        except CameraBackInTimeError as err:
+            sets.append((list(err.indexes), {apn_no: tuple(pics) for apn_no, pics in err.pictures_paths.items()}))
+        return sets
+
+    @pytest.mark.parametrize("start_indexes", [None, [1, 0], [2, 1]])
+    def test_cam_set_generator_vectorized(self, start_indexes, fetcher_test_env):
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+        lm.load_cam_images()
+        reference_set = lm.get_images([1, 0])
+
+        expected = self.list_sets(lm.cam_set_generator(reference_set=reference_set, start_indexes=start_indexes and list(start_indexes)))
+        generated = self.list_sets(lm.cam_set_generator(
+            reference_set=reference_set, start_indexes=start_indexes and list(start_indexes), vectorized=True))
+
+        assert generated == expected, "Vectorized sets should be the generator ones"
+
+    def test_cam_set_generator_vectorized_backintime(self, fetcher_test_env_back_in_time):
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+        lm.load_cam_images()
+        reference_set = lm.get_images([1, 0])
+
+        expected = self.list_sets(lm.cam_set_generator(reference_set=reference_set))
+        generated = self.list_sets(lm.cam_set_generator(reference_set=reference_set, vectorized=True))
+
+        assert generated == expected
+        assert generated[-1][0] == [2, 1], "Back in time should be raised at the same indexes"
+
+    @pytest.mark.parametrize("seed", range(0, 30))
+    def test_cam_set_generator_vectorized_random(self, seed):
+        rand = random.Random(seed)
+        nb_cams = rand.randint(1, 4)
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=nb_cams)
+        lm.fetchers = []
+        for apn_no in range(0, nb_cams):
+            ts, pics = rand.randint(0, 50), []
+            for i in range(0, rand.randint(1, 80)):
+                ts += rand.choice([1, 2, 2, 3, 4, 6]) - (rand.randint(1, 30) if rand.random() < 0.01 else 0)  # some back in time
+                pics.append(cam_img("picPath/APN{}/DCIM/100GOPRO/GOPR{:04d}.JPG".format(apn_no, i), ts))
+            fetcher = MagicMock()
+            fetcher.get_pic.side_effect = lambda index, pics=pics: pics[index]
+            fetcher.nb_pic.return_value = len(pics)
+            fetcher.get_timestamps.return_value = np.array([pic._ts for pic in pics], dtype=np.int64)
+            lm.fetchers.append(fetcher)
+        reference_set = lm.get_images([rand.randint(0, f.nb_pic() - 1) for f in lm.fetchers])
+
+        expected = self.list_sets(lm.cam_set_generator(reference_set=reference_set))
+        generated = self.list_sets(lm.cam_set_generator(reference_set=reference_set, vectorized=True))
+
+        assert generated == expected, "Vectorized sets should be the generator ones"
+
+    def mock_fetchers(self, cams_ts: List[List[int]]) -> List[MagicMock]:
+        fetchers = []
+        for apn_no, cam_ts in enumerate(cams_ts):
+            pics = [cam_img("picPath/APN{}/DCIM/100GOPRO/GOPR{:04d}.JPG".format(apn_no, i), ts) for i, ts in enumerate(cam_ts)]
+            fetcher = MagicMock()
+            fetcher.get_pic.side_effect = lambda index, pics=pics: pics[index]
+            fetcher.get_images.return_value = pics
+            fetcher.nb_pic.return_value = len(pics)
+            fetcher.get_timestamps.return_value = np.array(cam_ts, dtype=np.int64)
+            fetchers.append(fetcher)
+        return fetchers
+
+    def offset_cameras_ts(self, rand: random.Random, nb_shots: int, offsets: List[int]) -> List[List[int]]:
+        shots = np.cumsum([rand.randint(4, 8) for _ in range(0, nb_shots)]).tolist()
+        return [[shot + offset + rand.randint(0, 1) for shot in shots if rand.random() > 0.05] for offset in offsets]
+
+    def test_estimate_reference_indexes(self):
+        rand = random.Random(3)
+        cams_ts = self.offset_cameras_ts(rand, nb_shots=400, offsets=[0, 3600, -125])
+        cams_ts[1] = [3500, 3510, 3520] + cams_ts[1]  # pictures taken before the others started
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=3)
+        lm.fetchers = self.mock_fetchers(cams_ts)
+
+        indexes = lm.estimate_reference_indexes(start_indexes=[0, 0, 0])
+
+        assert indexes is not None
+        ref_ts = [cams_ts[apn_no][indexes[apn_no]] for apn_no in range(0, 3)]
+        assert abs(ref_ts[1] - ref_ts[0] - 3600) <= 1 and abs(ref_ts[2] - ref_ts[0] + 125) <= 1, "Should be a shot of all cameras"
+        assert sum(lm.lazy_timestamps()[apn_no].nb_reads for apn_no in range(0, 3)) <= 3 * 256, "Only samples should be read"
+        assert lm.timestamps_read_stats()['nb_read'] == sum(lazy_ts.nb_reads for lazy_ts in lm.lazy_timestamps())
+
+    def test_estimate_reference_indexes_unrelated(self):
+        rand = random.Random(4)
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+        lm.fetchers = self.mock_fetchers([sorted(rand.sample(range(0, 100000), 100)), sorted(rand.sample(range(0, 100000), 100))])
+
+        assert lm.estimate_reference_indexes(start_indexes=[0, 0]) is None, "Unrelated cameras have no offset"
+
+    def test_reference_indexes_walk(self):
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+        with patch.object(LotMaker, "estimate_reference_indexes", side_effect=[[1, 2], [3, 3]]) as mock_estimate:
+            walk = lm._reference_indexes_walk(partition_start=[0, 0], cam_max_indexes=[5, 5])
+
+            assert next(walk) == [1, 2], "Estimated reference should be tried first"
+            assert next(walk) == [0, 0], "Then the indexes walk"
+            assert next(walk) == [1, 0]
+            assert walk.send([3, 2]) == [3, 2], "New start should be sent back, as indexes_walk does"
+            assert next(walk) == [3, 3], "Reference should be estimated from the new start"
+            mock_estimate.assert_called_with(start_indexes=[3, 2])
+
+    def test_generate_cam_partition_estimate_offsets(self):
+        rand = random.Random(5)
+        cams_ts = self.offset_cameras_ts(rand, nb_shots=300, offsets=[0, 47, 3601, -20])
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=4)
+        lm.fetchers = self.mock_fetchers(cams_ts)
+
+        with patch.object(LotMaker, "cam_set_generator", autospec=True, side_effect=LotMaker.cam_set_generator) as mock_gen:
+            partition = next(lm.generate_cam_partition([0] * 4, estimate_offsets=True))
+
+        assert mock_gen.call_count == 1, "Estimated reference shouldn't be rejected"
+        assert partition.ref_set is mock_gen.call_args[1]["reference_set"]
+        assert len(partition.images_sets) > 250
+        for img_set in partition.images_sets:
+            if img_set.is_complete():
+                ts = [img_set[apn_no].get_timestamp() for apn_no in range(0, 4)]
+                assert abs(ts[2] - ts[0] - 3601) <= 2 and abs(ts[3] - ts[0] + 20) <= 2, "Sets should be shots"
+
+    def test_generate_cam_partition_memoize_references(self):
+        rand = random.Random(6)
+        shots = [ts if ts < 50 else ts + rand.randint(0, 1) for ts in range(0, 400, 5)]  # regular, then jittered
+        cams_ts = [shots, [shot + 40 for shot in shots], [100, 105, 110] + [shot + 3600 for shot in shots]]  # camera 2 clock was changed
+        partitions, nb_trials = [], []
+        for memoize in [False, True]:
+            lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=3)
+            lm.fetchers = self.mock_fetchers(cams_ts)
+            with patch.object(LotMaker, "cam_set_generator", autospec=True, side_effect=LotMaker.cam_set_generator) as mock_gen:
+                partition = next(lm.generate_cam_partition([0] * 3, memoize_references=memoize))
+                partitions.append([dict(img_set) for img_set in partition.images_sets])
+                nb_trials.append(mock_gen.call_count)
+
+        assert partitions[1] == partitions[0], "Skipped candidates should have been rejected"
+        assert nb_trials[1] < nb_trials[0]
+        assert nb_trials[0] - nb_trials[1] == lm.reference_trials.stats()['hits'], "Hits shouldn't be tried"
+
+    def random_cameras_ts(self, rand: random.Random, jitter: int, drop_rate: float) -> List[List[int]]:
+        nb_cams = rand.randint(2, 3)
+        shots = np.cumsum([rand.randint(3, 8) for _ in range(0, rand.randint(30, 60))]).tolist()
+        cams_ts = []
+        for _ in range(0, nb_cams):
+            offset, cam_ts = rand.randint(-20, 20), []
+            for shot in shots:
+                if rand.random() < drop_rate:
+                    continue
+                cam_ts.append(shot + offset + rand.randint(0, jitter))
+                if rand.random() < 0.02:
+                    offset -= rand.randint(5, 60)  # back in time
+            cams_ts.append(cam_ts or [0])
+        return cams_ts
+
+    def list_partitions(self, lm: LotMaker, **kwargs) -> List[tuple]:
+        return [(p.start_indexes, p.fetcher_next_indexes, p.break_reason, [{k: str(v.path) for k, v in img_set.items()} for img_set in p.images_sets])
+                for p in lm.generate_cam_partition([0] * lm.nb_cams, **kwargs)]
+
+    @pytest.mark.parametrize("seed", [4, 55, 90])
+    def test_generate_cam_partition_memoize_references_random(self, seed):
+        cams_ts = self.random_cameras_ts(random.Random(seed), jitter=2, drop_rate=0.2)
+        partitions = []
+        for memoize in [False, True]:
+            lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=len(cams_ts))
+            lm.fetchers = self.mock_fetchers(cams_ts)
+            partitions.append(self.list_partitions(lm, memoize_references=memoize))
+
+        assert len(partitions[0]) > 0
+        assert partitions[1] == partitions[0], "Skipped candidates should have been rejected"
+
+    @pytest.mark.parametrize("memoize", [False, True])
+    def test_generate_cam_partition_workers(self, memoize):
+        rand = random.Random(7)
+        shots = [ts if ts < 50 else ts + rand.randint(0, 1) for ts in range(0, 300, 5)]
+        cams_ts = [shots, [shot + 40 for shot in shots], [100, 105, 110] + [shot + 3600 for shot in shots]]
+        cams_ts[1] = cams_ts[1][0:30] + [ts - 20 for ts in cams_ts[1][30:]]  # back in time
+        partitions = []
+        for number_of_workers in [1, 3]:
+            lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=3)
+            lm.fetchers = self.mock_fetchers(cams_ts)
+            partitions.append([
+                (p.start_indexes, p.fetcher_next_indexes, p.break_reason, dict(p.ref_set), [dict(img_set) for img_set in p.images_sets])
+                for p in lm.generate_cam_partition([0] * 3, memoize_references=memoize, number_of_workers=number_of_workers)])
+
+        assert len(partitions[0]) > 1
+        assert partitions[1] == partitions[0], "Partitions should be the serial ones"
+
+    @pytest.mark.parametrize("seed", [18, 32, 46])
+    def test_generate_cam_partition_workers_random(self, seed):
+        cams_ts = self.random_cameras_ts(random.Random(seed), jitter=1, drop_rate=0.1)
+        partitions = []
+        for number_of_workers in [1, 3]:
+            lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=len(cams_ts))
+            lm.fetchers = self.mock_fetchers(cams_ts)
+            partitions.append(self.list_partitions(lm, number_of_workers=number_of_workers))
+
+        assert len(partitions[0]) > 1
+        assert partitions[1] == partitions[0], "Partitions should be the serial ones, up to the last one"
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_generate_cam_partition_split_back_in_time(self, vectorized):
+        rand = random.Random(8)
+        cams_ts = self.offset_cameras_ts(rand, nb_shots=200, offsets=[0, 40, -300])
+        cams_ts[1] = cams_ts[1][0:60] + [ts - 20 for ts in cams_ts[1][60:]]  # back in time
+        cams_ts[2] = cams_ts[2][0:120] + [ts - 500 for ts in cams_ts[2][120:]]
+        partitions = []
+        for split in [False, True]:
+            lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=3)
+            lm.fetchers = self.mock_fetchers(cams_ts)
+            with patch.object(ImageSet, "get_pic_taken_before", autospec=True, side_effect=ImageSet.get_pic_taken_before) as mock_before:
+                partitions.append([
+                    (p.start_indexes, p.fetcher_next_indexes, p.break_reason, [{k: str(v.path) for k, v in img_set.items()} for img_set in p.images_sets])
+                    for p in lm.generate_cam_partition([0] * 3, vectorized_sets=vectorized, split_back_in_time=split)])
+
+        assert [p[2] for p in partitions[0]].count("BACK IN TIME") == 2
+        assert partitions[1] == partitions[0], "Partitions should end at the same breaks"
+        assert mock_before.call_count == 0, "Sets shouldn't be compared with the previous ones"
+        assert [breaks.tolist() for breaks in lm.back_in_time_breaks()] == [[], [60], [120]]
+
+    def test_segments_indexes_walk(self):
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+        lm.fetchers = self.mock_fetchers([[0, 5, 10, 15], [0, 5, 1, 6, 11]])
+        walk = lm._segments_indexes_walk(partition_start=[0, 0], estimate_offsets=False)
+
+        candidates = list(itertools.islice(walk, 8))
+        assert all(cam_indexes[1] < 2 for cam_indexes in candidates), "Candidates should be before the break"
+        assert next(walk) == [0, 2], "Then from the break"
+        assert walk.send([2, 3]) == [2, 3]
+        assert next(walk) == [2, 3]
+
     def test_is_equiv_ref(self, fetcher_test_env):
         lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
 
@@ -283,5 +791,45 @@ class TestLotMaker(object):
         assert mock_parser_metas.call_count == 2
         assert r == mock_parser_metas.return_value
 
+    def test_generate_meta_cam_partitions(self):
+        rand = random.Random(9)
+        shots = np.cumsum([rand.randint(5, 60) for _ in range(0, 60)]).tolist()  # irregular, only one association fits
+        img_sets = []
+        for id_set, shot in enumerate(shots):
+            img_sets.append(ImageSet(l={apn_no: cam_img("picPath/APN{}/{}.JPG".format(apn_no, id_set), shot + 100 * apn_no) for apn_no in range(0, 2)},
+                                     number_of_pictures=2))
+            img_sets[-1].id_set = id_set
+        metas_ts = [shot + 1000 for shot in shots[3:]]  # metas recorded after the first sets
+        lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+        lm.rederbrometa = MagicMock()
+        lm.rederbrometa.get_metas.return_value = [RederbroMeta(timestamp=ts) for ts in metas_ts]
+
+        partition = next(lm.generate_meta_cam_partitions(img_sets=img_sets))
+
+        lots = [(metas_ts.index(l.meta.get_timestamp()), l.cam_set.id_set) for l in partition.lots if l.meta and l.cam_set]
+        assert len(lots) > 50
+        assert all(id_set == meta_index + 3 for meta_index, id_set in lots), "Metas should be associated with their sets"
+
+    def test_generate_meta_cam_partitions_split_back_in_time(self):
+        shots = list(range(0, 500, 5))
+        img_sets = []
+        for id_set, shot in enumerate(shots):
+            img_sets.append(ImageSet(l={apn_no: cam_img("picPath/APN{}/{}.JPG".format(apn_no, id_set), shot + 100 * apn_no) for apn_no in range(0, 2)},
+                                     number_of_pictures=2))
+            img_sets[-1].id_set = id_set
+        metas_ts = [shot + 1000 for shot in shots]
+        metas_ts = metas_ts[0:40] + [ts - 300 for ts in metas_ts[40:]]  # meta clock went back in time
+        partitions = []
+        for split in [False, True]:
+            lm = LotMaker(pictures_path=Path("picPath/"), rederbro_csv_path=None, nb_cams=2)
+            lm.rederbrometa = MagicMock()
+            lm.rederbrometa.get_metas.return_value = [RederbroMeta(timestamp=ts) for ts in metas_ts]
+            partitions.append([
+                (p.start_meta_index, p.start_imgset_index, p.break_reason, [(metas_ts.index(l.meta.get_timestamp()) if l.meta else None, l.cam_set.id_set if l.cam_set else None) for l in p.lots])
+                for p in itertools.islice(lm.generate_meta_cam_partitions(img_sets=img_sets, split_back_in_time=split), 2)])
+
+        assert partitions[0][0][2] == "BACK IN TIME META"
+        assert partitions[1] == partitions[0], "Partitions should end at the same break"
+
     def test_inte_find_meta_ref(self):
         pass
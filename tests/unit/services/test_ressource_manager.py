@@ -16,12 +16,14 @@
 # Email: team@openpathview.fr
 # Description: Unit test for ressource-db service.
 
+import json
 import pytest
 from opv_import.services import RessourceManager
 from opv_import.model import RederbroMeta, OrientationAngle, GeoPoint, Lot, ImageSet, CameraImage
 from opv_api_client import ressources
 from unittest.mock import patch, call, MagicMock
 from path import Path
+from opv_import.config import EXIF_TAGS_FILE_NAME
 
 from typing import List
 
@@ -157,6 +159,52 @@ class TestRessourceManager(object):
         assert mock_os_link.call_count == 2, "Os.link should be called only in hardlink mode"
 
 
+    @patch("opv_directorymanagerclient.DirectoryManagerClient")
+    @patch("opv_api_client.RestClient")
+    @patch("os.link")
+    @patch("path.Path.copy")
+    def test_make_picture_path_archive(self, mock_path_copy, mock_os_link, mock_dbrest_client, mock_dm_client, tmpdir):
+        dm_ctx = MagicMock()
+        dm_ctx.__enter__ = MagicMock()
+        dm_ctx.__enter__.return_value = ("uuid-42", str(tmpdir))
+        dm_ctx.__exit__ = MagicMock()
+        mock_dm_client.Open.return_value = dm_ctx
+
+        photo = cam_img("picPath/APN0.tar/DCIM/100S3D_L/3D_L0001.JPG", 10)
+        photo.archive = MagicMock()
+        photo.archive.byte_range.return_value = (512, 2048)
+        img_set = ImageSet(l={0: photo})
+
+        ress_man = RessourceManager(opv_api_client=mock_dbrest_client, opv_dm_client=mock_dm_client,
+                                    id_malette=ID_MALETTE, use_hardlink=True)
+        ress_man.make_picture_path(img_set=img_set)
+
+        photo.archive.byte_range.assert_called_once_with(photo.path)
+        photo.archive.copy_range.assert_called_once_with(offset=512, size=2048, dest=Path(str(tmpdir)) / "APN0.JPG")
+        assert mock_path_copy.call_count == 0 and mock_os_link.call_count == 0, "Archive members should be copied from their byte range"
+
+    @patch("opv_directorymanagerclient.DirectoryManagerClient")
+    @patch("opv_api_client.RestClient")
+    @patch("path.Path.copy")
+    def test_make_picture_path_exif_tags(self, mock_path_copy, mock_dbrest_client, mock_dm_client, tmpdir):
+        dm_ctx = MagicMock()
+        dm_ctx.__enter__ = MagicMock()
+        dm_ctx.__enter__.return_value = ("uuid-42", str(tmpdir))
+        dm_ctx.__exit__ = MagicMock()
+        mock_dm_client.Open.return_value = dm_ctx
+
+        img_set = ImageSet(l={
+            0: cam_img("picPath/APN0/DCIM/100S3D_L/3D_L0001.JPG", 10),
+            1: cam_img("picPath/APN1/DCIM/100S3D_L/3D_L0000.JPG", 15)
+        })
+        img_set[0]._exif_tags = {"iso": "100"}
+
+        ress_man = RessourceManager(opv_api_client=mock_dbrest_client, opv_dm_client=mock_dm_client, id_malette=ID_MALETTE)
+        ress_man.make_picture_path(img_set=img_set)
+
+        with open(Path(str(tmpdir)) / EXIF_TAGS_FILE_NAME) as tags_file:
+            assert json.load(tags_file) == {"APN0": {"iso": "100"}}, "Known exif tags should be saved with the pictures"
+
     @patch("opv_directorymanagerclient.DirectoryManagerClient")
     @patch("opv_api_client.RestClient")
     def test_make_lot(self, mock_dbrest_client, mock_dm_client):
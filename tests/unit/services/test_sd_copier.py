@@ -24,7 +24,7 @@ from opv_import.services.sd_copier import COPY_NUMBER_OF_WORKERS
 from opv_import.helpers import RsyncWrapper
 from opv_import.model import ApnDevice
 from opv_import.model.apn_device import ApnDeviceNumberNotFoundError
-from opv_import.config import APN_NUM_TO_APN_OUTPUT_DIR
+from opv_import.config import APN_NUM_TO_APN_OUTPUT_DIR, EXIF_EXTRA_TAGS
 from path import Path
 
 class TestSdCopier(object):
@@ -53,6 +53,7 @@ class TestSdCopier(object):
 
         assert mock_rsync_construct.call_args_list == [call(source_path=Path("/mnt/SD/DCIM"), destination_path=Path("path") / APN_NUM_TO_APN_OUTPUT_DIR.format(0))]
         assert mock_rsync.on_progress.call_count == 1
+        assert mock_rsync.on_file_transferred.call_count == 1
         assert mock_rsync.on_terminate.call_count == 1
         assert mock_rsync.run.call_count == 1
 
@@ -78,6 +79,23 @@ class TestSdCopier(object):
         assert mock_rsync.on_terminate.call_count == 0
         assert mock_rsync.run.call_count == 0
 
+    @patch("opv_import.helpers.pictures_utils.read_exif")
+    @patch("opv_import.services.AbstractApnDeviceTasker.__init__")
+    def test_index_picture(self, mock_parent_init, mock_read_exif, tmpdir):
+        mock_read_exif.return_value = (1500000000, {"iso": "100"})
+        apn_path = Path(str(tmpdir)) / "APN0"
+        (apn_path / "DCIM/100GOPRO").makedirs_p()
+        (apn_path / "DCIM/100GOPRO/GOPR0001.JPG").write_bytes(b"jpeg")
+        (apn_path / "DCIM/100GOPRO/GOPR0001.LRV").write_bytes(b"video")
+        pictures_index = MagicMock()
+
+        sd_cp = SdCopier(number_of_devices=2, dest_path=Path(str(tmpdir)))
+        sd_cp._index_picture(pictures_index=pictures_index, apn_dest_path=apn_path, rel_path=Path("DCIM/100GOPRO/GOPR0001.JPG"))
+        sd_cp._index_picture(pictures_index=pictures_index, apn_dest_path=apn_path, rel_path=Path("DCIM/100GOPRO/GOPR0001.LRV"))
+
+        assert pictures_index.add.call_args_list == [call(rel_path=Path("DCIM/100GOPRO/GOPR0001.JPG"), size=4, ts=1500000000, tags={"iso": "100"})]
+        assert mock_read_exif.call_args_list == [call(apn_path / "DCIM/100GOPRO/GOPR0001.JPG", tags=EXIF_EXTRA_TAGS)]
+
     @patch("opv_import.services.AbstractApnDeviceTasker.__init__")
     def test_is_device_transfert_terminated(self, m_parent):
         sd_cp = SdCopier(number_of_devices=2, dest_path=Path("path"))
@@ -38,7 +38,9 @@ class TestTreatRederbroData(object):
         assert ressman.call_args_list == [call(opv_api_client=opv_api, opv_dm_client=opv_dm, id_malette=42)]
         assert lm.call_args_list == [call(pictures_path=Path("/tmp/toto"),
                                           rederbro_csv_path=Path("/tmp/toto.csv"),
-                                          nb_cams=6)]
+                                          nb_cams=6,
+                                          ts_cache=None,
+                                          use_manifest=False)]
 
     @patch("opv_directorymanagerclient.DirectoryManagerClient")
     @patch("opv_api_client.RestClient")
@@ -99,7 +101,7 @@ class TestTreatRederbroData(object):
 
         assert parse_meta.call_count == 1
         assert generate_cam_set.call_count == 1
-        assert mock_lm.generate_all_lot.call_args_list == [call(img_sets=None, threshold_incomplete_set_max_in_window=4, threshold_incomplete_set_window_size=10, threshold_max_consecutive_incomplete_sets=35),]
+        assert mock_lm.generate_all_lot.call_args_list == [call(img_sets=None, threshold_incomplete_set_max_in_window=4, threshold_incomplete_set_window_size=10, threshold_max_consecutive_incomplete_sets=35, split_back_in_time=False),]
 
     @patch("opv_directorymanagerclient.DirectoryManagerClient")
     @patch("opv_api_client.RestClient")
@@ -146,4 +148,32 @@ class TestTreatRederbroData(object):
         assert mock_ressman.make_lot.call_args_list == [
             call(lot=l1, campaign=trd._campaign),
             call(lot=l2, campaign=trd._campaign)]
-        assert progress_event.call_args_list == [call(0.5), call(1)]
\ No newline at end of file
+        assert progress_event.call_args_list == [call(0.5), call(1)]
+    @patch("opv_directorymanagerclient.DirectoryManagerClient")
+    @patch("opv_api_client.RestClient")
+    @patch("path.Path.exists")
+    @patch("opv_import.services.RessourceManager")
+    @patch("opv_import.services.LotMaker")
+    def test_close(self, lm, ressman, path_exists, opv_api, opv_dm):
+        path_exists.return_value = True
+
+        trd = TreatRederbroData(cam_pictures_dir=Path("/tmp/toto"), id_malette=42, opv_api_client=opv_api, opv_dm_client=opv_dm)
+        trd.close()
+
+        assert lm.return_value.close.call_count == 1, "Lot maker archives should be released"
+
+    @patch("opv_directorymanagerclient.DirectoryManagerClient")
+    @patch("opv_api_client.RestClient")
+    @patch("opv_import.services.treat_rederbro_data.TimestampCache")
+    @patch("path.Path.exists")
+    @patch("opv_import.services.RessourceManager")
+    @patch("opv_import.services.LotMaker")
+    def test_close_ts_cache(self, lm, ressman, path_exists, ts_cache, opv_api, opv_dm):
+        path_exists.return_value = True
+
+        trd = TreatRederbroData(cam_pictures_dir=Path("/tmp/toto"), id_malette=42, opv_api_client=opv_api, opv_dm_client=opv_dm,
+                                use_ts_cache=True)
+        trd.close()
+
+        assert ts_cache.return_value.close.call_count == 1, "Timestamps cache should be flushed and closed"
+        assert lm.return_value.close.call_count == 1